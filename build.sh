@@ -4,4 +4,5 @@ set -o errexit
 
 pip install -r requirements.txt
 
+python manage.py buildcss
 python manage.py collectstatic --no-input
@@ -0,0 +1,35 @@
+# This file registers the chat models with the Django admin interface.
+
+from django.contrib import admin
+from core.admin import LargeTableAdmin
+from .models import Conversation, Message, ArchivedMessage
+
+@admin.register(Conversation)
+class ConversationAdmin(LargeTableAdmin):
+    list_display = ('id', 'pitch_title', 'created_at')
+    list_select_related = ('offer__pitch',)
+    list_filter = ('created_at',)
+    raw_id_fields = ('offer',)
+    autocomplete_fields = ('participants',)
+    date_hierarchy = 'created_at'
+
+    @admin.display(description='Pitch', ordering='offer__pitch__title')
+    def pitch_title(self, obj):
+        return obj.offer.pitch.title
+
+@admin.register(Message)
+class MessageAdmin(LargeTableAdmin):
+    list_display = ('id', 'conversation_id', 'sender', 'short_content', 'timestamp')
+    list_select_related = ('sender',)
+    list_filter = ('timestamp',)
+    raw_id_fields = ('conversation',)
+    autocomplete_fields = ('sender',)
+    date_hierarchy = 'timestamp'
+
+    @admin.display(description='Content')
+    def short_content(self, obj):
+        return obj.content[:80]
+
+@admin.register(ArchivedMessage)
+class ArchivedMessageAdmin(MessageAdmin):
+    list_display = ('id', 'conversation_id', 'sender', 'short_content', 'timestamp', 'archived_at')
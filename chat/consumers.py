@@ -1,17 +1,44 @@
 # This is the core of the real-time functionality.
+import asyncio
 import json
+import time
+from urllib.parse import parse_qs
 from channels.generic.websocket import AsyncWebsocketConsumer
 from channels.db import database_sync_to_async
+from django.conf import settings
 from .models import Conversation, Message
-from django.contrib.auth import get_user_model
+from .history import serialize_message
+from .notifications import notification_group_name
+from core.ratelimit import RateLimitedConsumerMixin
+from core.profiling import ProfiledConsumerMixin
 
-User = get_user_model()
+# Application close codes (4000-4999) so clients can tell why a socket was closed
+FORBIDDEN_CLOSE_CODE = 4403
+IDLE_CLOSE_CODE = 4408
+
+class ChatConsumer(ProfiledConsumerMixin, RateLimitedConsumerMixin, AsyncWebsocketConsumer):
+    """
+    A conversation's live chat.
+
+    Every message frame carries the message's id, which only ever increases.
+    A client that lost its socket reconnects to /ws/chat/<id>/?since=<last_id>
+    and is sent just the messages it missed, as one 'history' frame.
+    Clients send a {'type': 'ping'} heartbeat (answered with a 'pong'); a socket
+    that stays silent for CHAT_IDLE_TIMEOUT seconds is closed, so dead
+    connections don't keep their group membership.
+    """
+    rate_limit_rule = 'chat_send'
 
-class ChatConsumer(AsyncWebsocketConsumer):
     async def connect(self):
         self.conversation_id = self.scope['url_route']['kwargs']['conversation_id']
         self.conversation_group_name = f'chat_{self.conversation_id}'
-        
+
+        # Security check: only the conversation's participants may join
+        user = self.scope['user']
+        if not user.is_authenticated or not await self.is_participant(user.id):
+            await self.close(code=FORBIDDEN_CLOSE_CODE)
+            return
+
         # Join room group
         await self.channel_layer.group_add(
             self.conversation_group_name,
@@ -19,31 +46,79 @@ class ChatConsumer(AsyncWebsocketConsumer):
         )
         await self.accept()
 
+        self.last_seen = time.monotonic()
+        self.reaper = asyncio.ensure_future(self.close_when_idle())
+
+        # Joining the group first means nothing sent during the gap-fill query is
+        # lost; messages that show up in both are de-duplicated by id on the client.
+        since = parse_qs(self.scope.get('query_string', b'').decode()).get('since', [''])[0]
+        if since.isdigit():
+            await self.send_missed_messages(int(since))
+
     async def disconnect(self, close_code):
+        if hasattr(self, 'reaper'):
+            self.reaper.cancel()
         # Leave room group
         await self.channel_layer.group_discard(
             self.conversation_group_name,
             self.channel_name
         )
 
+    async def close_when_idle(self):
+        """
+        Closes the socket once no frame (message or ping) has arrived for
+        CHAT_IDLE_TIMEOUT seconds.
+        """
+        while True:
+            idle = time.monotonic() - self.last_seen
+            if idle >= settings.CHAT_IDLE_TIMEOUT:
+                await self.close(code=IDLE_CLOSE_CODE)
+                return
+            await asyncio.sleep(settings.CHAT_IDLE_TIMEOUT - idle)
+
+    async def send_missed_messages(self, since_id):
+        messages, complete = await self.messages_since(since_id)
+        if not complete:
+            # Too far behind to catch up over the socket; the client reloads the page instead
+            await self.send(text_data=json.dumps({'type': 'resync'}))
+            return
+        await self.send(text_data=json.dumps({
+            'type': 'history',
+            'messages': messages,
+        }))
+
     # Receive message from WebSocket
     async def receive(self, text_data):
+        self.last_seen = time.monotonic()
         text_data_json = json.loads(text_data)
-        message_content = text_data_json['message']
-        sender_id = self.scope['user'].id
 
-        # Save message to database
-        message = await self.save_message(sender_id, message_content)
+        # Heartbeats are answered before rate limiting so they never use up the send budget
+        if text_data_json.get('type') == 'ping':
+            await self.send(text_data=json.dumps({'type': 'pong'}))
+            return
 
-        # Send message to room group
-        await self.channel_layer.group_send(
-            self.conversation_group_name,
-            {
-                'type': 'chat_message',
-                'message': message_content,
-                'sender_username': self.scope['user'].username
-            }
-        )
+        # Recorded by the profiler when it is on for this socket (see core/profiling.py)
+        async with self.profiled_message('receive'):
+            # Close the socket if the sender is flooding the room
+            if not await self.allow_rate_limited():
+                return
+
+            message_content = text_data_json['message']
+            sender_id = self.scope['user'].id
+
+            # Save message to database
+            message = await self.save_message(sender_id, message_content)
+
+            # Send message to room group
+            await self.channel_layer.group_send(
+                self.conversation_group_name,
+                {
+                    'type': 'chat_message',
+                    'id': message.id,
+                    'message': message_content,
+                    'sender_username': self.scope['user'].username
+                }
+            )
 
     # Receive message from room group
     async def chat_message(self, event):
@@ -52,13 +127,69 @@ class ChatConsumer(AsyncWebsocketConsumer):
 
         # Send message to WebSocket
         await self.send(text_data=json.dumps({
+            'type': 'message',
+            'id': event.get('id'),
             'message': message,
             'sender_username': sender_username
         }))
 
+    @database_sync_to_async
+    def is_participant(self, user_id):
+        return Conversation.participants.through.objects.filter(
+            conversation_id=self.conversation_id, user_id=user_id
+        ).exists()
+
+    @database_sync_to_async
+    def messages_since(self, since_id):
+        """
+        Returns (messages, complete) for the messages after `since_id`, read with
+        one range scan on the (conversation, id) index and capped at
+        CHAT_GAP_FILL_LIMIT rows. `complete` is False when more were missed.
+        """
+        limit = settings.CHAT_GAP_FILL_LIMIT
+        missed = list(
+            Message.objects.filter(conversation_id=self.conversation_id, id__gt=since_id)
+            .select_related('sender').order_by('id')[:limit + 1]
+        )
+        return [serialize_message(message) for message in missed[:limit]], len(missed) <= limit
+
     @database_sync_to_async
     def save_message(self, sender_id, content):
-        sender = User.objects.get(id=sender_id)
-        conversation = Conversation.objects.get(id=self.conversation_id)
-        message = Message.objects.create(conversation=conversation, sender=sender, content=content)
-        return message
+        return Message.objects.create(conversation_id=self.conversation_id, sender_id=sender_id, content=content)
+
+
+class NotificationConsumer(AsyncWebsocketConsumer):
+    """
+    A per-user channel that pushes dashboard events (new offers, offer status
+    changes, questions, answers and conversations) so dashboards can update
+    in place instead of reloading.
+    """
+    async def connect(self):
+        user = self.scope['user']
+        if not user.is_authenticated:
+            await self.close()
+            return
+
+        self.notification_group_name = notification_group_name(user.id)
+
+        # Join the user's notification group
+        await self.channel_layer.group_add(
+            self.notification_group_name,
+            self.channel_name
+        )
+        await self.accept()
+
+    async def disconnect(self, close_code):
+        # Leave the notification group (if we ever joined it)
+        if hasattr(self, 'notification_group_name'):
+            await self.channel_layer.group_discard(
+                self.notification_group_name,
+                self.channel_name
+            )
+
+    # Receive an event from the notification group
+    async def notify(self, event):
+        await self.send(text_data=json.dumps({
+            'event': event['event'],
+            'data': event['data']
+        }))
@@ -0,0 +1,72 @@
+# This file reads a conversation's history across the Message table and the
+# ArchivedMessage table (see core/archive.py), so callers never need to know
+# where a message currently lives.
+
+from .models import Message, ArchivedMessage
+
+PAGE_SIZE = 50
+
+def message_page(conversation_id, before_id=None, limit=PAGE_SIZE):
+    """
+    Returns (messages, has_more): up to `limit` messages of a conversation with
+    an id below `before_id` (the newest ones if None), oldest first.
+
+    Archived messages are always older than the ones still in Message, so the
+    archive is only queried once the hot table runs out. Each read is a single
+    range scan on the (conversation, id) index.
+    """
+    hot = Message.objects.filter(conversation_id=conversation_id).select_related('sender').order_by('-id')
+    if before_id is not None:
+        hot = hot.filter(id__lt=before_id)
+    messages = list(hot[:limit + 1])
+
+    if len(messages) <= limit:
+        oldest_id = messages[-1].id if messages else before_id
+        archived = ArchivedMessage.objects.filter(conversation_id=conversation_id).select_related('sender').order_by('-id')
+        if oldest_id is not None:
+            archived = archived.filter(id__lt=oldest_id)
+        messages += list(archived[:limit + 1 - len(messages)])
+
+    has_more = len(messages) > limit
+    messages = messages[:limit]
+    messages.reverse()
+    return messages, has_more
+
+def messages_after(conversation_id, after_id, limit=PAGE_SIZE):
+    """
+    Returns (messages, has_more): up to `limit` messages of a conversation with
+    an id above `after_id`, oldest first. The mirror image of message_page().
+    """
+    archived = (
+        ArchivedMessage.objects.filter(conversation_id=conversation_id, id__gt=after_id)
+        .select_related('sender').order_by('id')
+    )
+    messages = list(archived[:limit + 1])
+
+    if len(messages) <= limit:
+        newest_id = messages[-1].id if messages else after_id
+        hot = (
+            Message.objects.filter(conversation_id=conversation_id, id__gt=newest_id)
+            .select_related('sender').order_by('id')
+        )
+        messages += list(hot[:limit + 1 - len(messages)])
+
+    return messages[:limit], len(messages) > limit
+
+def message_window(conversation_id, message_id, radius=PAGE_SIZE // 2):
+    """
+    Returns (messages, has_older, has_newer): the message `message_id` with up
+    to `radius` messages on each side, for jumping to a search result without
+    loading the history in between.
+    """
+    older, has_older = message_page(conversation_id, before_id=message_id, limit=radius)
+    newer, has_newer = messages_after(conversation_id, message_id - 1, limit=radius + 1)
+    return older + newer, has_older, has_newer
+
+def serialize_message(message):
+    return {
+        'id': message.id,
+        'message': message.content,
+        'sender_username': message.sender.username,
+        'timestamp': message.timestamp.isoformat(),
+    }
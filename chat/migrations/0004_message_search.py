@@ -0,0 +1,60 @@
+# Full-text indexes over message content for in-conversation search (see chat/search.py).
+#
+# Postgres: GIN indexes on to_tsvector('english', content).
+# SQLite: external-content FTS5 tables kept in sync by triggers.
+#
+# Note that on SQLite any later migration that rebuilds chat_message or
+# chat_archivedmessage drops these triggers, and must recreate them.
+
+from django.db import migrations
+
+TABLES = ('chat_message', 'chat_archivedmessage')
+
+def sqlite_statements(table):
+    fts = f'{table}_fts'
+    return [
+        f"CREATE VIRTUAL TABLE {fts} USING fts5("
+        f"content, conversation_id UNINDEXED, content='{table}', content_rowid='id', "
+        f"tokenize='unicode61 remove_diacritics 2')",
+        f"CREATE TRIGGER {fts}_ai AFTER INSERT ON {table} BEGIN "
+        f"INSERT INTO {fts}(rowid, content, conversation_id) VALUES (new.id, new.content, new.conversation_id); END",
+        f"CREATE TRIGGER {fts}_ad AFTER DELETE ON {table} BEGIN "
+        f"INSERT INTO {fts}({fts}, rowid, content, conversation_id) VALUES ('delete', old.id, old.content, old.conversation_id); END",
+        f"CREATE TRIGGER {fts}_au AFTER UPDATE ON {table} BEGIN "
+        f"INSERT INTO {fts}({fts}, rowid, content, conversation_id) VALUES ('delete', old.id, old.content, old.conversation_id); "
+        f"INSERT INTO {fts}(rowid, content, conversation_id) VALUES (new.id, new.content, new.conversation_id); END",
+        # Index the rows that already exist
+        f"INSERT INTO {fts}({fts}) VALUES ('rebuild')",
+    ]
+
+def create_search_indexes(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    for table in TABLES:
+        if vendor == 'postgresql':
+            schema_editor.execute(
+                f"CREATE INDEX {table}_fts_idx ON {table} USING GIN (to_tsvector('english'::regconfig, content))"
+            )
+        elif vendor == 'sqlite':
+            for statement in sqlite_statements(table):
+                schema_editor.execute(statement)
+
+def drop_search_indexes(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    for table in TABLES:
+        if vendor == 'postgresql':
+            schema_editor.execute(f"DROP INDEX IF EXISTS {table}_fts_idx")
+        elif vendor == 'sqlite':
+            for suffix in ('ai', 'ad', 'au'):
+                schema_editor.execute(f"DROP TRIGGER IF EXISTS {table}_fts_{suffix}")
+            schema_editor.execute(f"DROP TABLE IF EXISTS {table}_fts")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chat', '0003_archive_tables'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_indexes, drop_search_indexes),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.2.4 on 2026-10-19 04:59
+#
+# Archived ids copy the originals, which are BigAutoFields. On SQLite the
+# AlterField rebuilds chat_archivedmessage, which drops the triggers that keep
+# its FTS5 table in sync (see 0004_message_search), so they are recreated.
+
+from importlib import import_module
+
+from django.db import migrations, models
+
+message_search = import_module('chat.migrations.0004_message_search')
+
+def recreate_archive_search_triggers(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    table = 'chat_archivedmessage'
+    for suffix in ('ai', 'ad', 'au'):
+        schema_editor.execute(f"DROP TRIGGER IF EXISTS {table}_fts_{suffix}")
+    schema_editor.execute(f"DROP TABLE IF EXISTS {table}_fts")
+    for statement in message_search.sqlite_statements(table):
+        schema_editor.execute(statement)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chat', '0004_message_search'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='archivedmessage',
+            name='id',
+            field=models.BigIntegerField(primary_key=True, serialize=False),
+        ),
+        migrations.RunPython(recreate_archive_search_triggers, recreate_archive_search_triggers),
+    ]
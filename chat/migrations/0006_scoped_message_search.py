@@ -0,0 +1,69 @@
+# Scopes the message full-text indexes to a conversation (see chat/search.py).
+#
+# Postgres: the GIN indexes become composite on (conversation_id, tsvector),
+# using btree_gin for the integer column, so a search only reads the posting
+# lists of its own conversation.
+# SQLite: conversation_id becomes an indexed FTS5 column, so the conversation
+# is part of the MATCH expression instead of a filter applied to every match
+# in every conversation.
+
+from django.db import migrations
+
+TABLES = ('chat_message', 'chat_archivedmessage')
+
+def sqlite_statements(table, conversation_column):
+    fts = f'{table}_fts'
+    return [
+        f"DROP TRIGGER IF EXISTS {fts}_ai",
+        f"DROP TRIGGER IF EXISTS {fts}_ad",
+        f"DROP TRIGGER IF EXISTS {fts}_au",
+        f"DROP TABLE IF EXISTS {fts}",
+        f"CREATE VIRTUAL TABLE {fts} USING fts5("
+        f"content, {conversation_column}, content='{table}', content_rowid='id', "
+        f"tokenize='unicode61 remove_diacritics 2')",
+        f"CREATE TRIGGER {fts}_ai AFTER INSERT ON {table} BEGIN "
+        f"INSERT INTO {fts}(rowid, content, conversation_id) VALUES (new.id, new.content, new.conversation_id); END",
+        f"CREATE TRIGGER {fts}_ad AFTER DELETE ON {table} BEGIN "
+        f"INSERT INTO {fts}({fts}, rowid, content, conversation_id) VALUES ('delete', old.id, old.content, old.conversation_id); END",
+        f"CREATE TRIGGER {fts}_au AFTER UPDATE ON {table} BEGIN "
+        f"INSERT INTO {fts}({fts}, rowid, content, conversation_id) VALUES ('delete', old.id, old.content, old.conversation_id); "
+        f"INSERT INTO {fts}(rowid, content, conversation_id) VALUES (new.id, new.content, new.conversation_id); END",
+        f"INSERT INTO {fts}({fts}) VALUES ('rebuild')",
+    ]
+
+def scope_search_indexes(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    for table in TABLES:
+        if vendor == 'postgresql':
+            schema_editor.execute("CREATE EXTENSION IF NOT EXISTS btree_gin")
+            schema_editor.execute(f"DROP INDEX IF EXISTS {table}_fts_idx")
+            schema_editor.execute(
+                f"CREATE INDEX {table}_fts_idx ON {table} "
+                f"USING GIN (conversation_id, to_tsvector('english'::regconfig, content))"
+            )
+        elif vendor == 'sqlite':
+            for statement in sqlite_statements(table, 'conversation_id'):
+                schema_editor.execute(statement)
+
+def unscope_search_indexes(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    for table in TABLES:
+        if vendor == 'postgresql':
+            schema_editor.execute(f"DROP INDEX IF EXISTS {table}_fts_idx")
+            schema_editor.execute(
+                f"CREATE INDEX {table}_fts_idx ON {table} USING GIN (to_tsvector('english'::regconfig, content))"
+            )
+        elif vendor == 'sqlite':
+            for statement in sqlite_statements(table, 'conversation_id UNINDEXED'):
+                schema_editor.execute(statement)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chat', '0005_archive_bigint_ids'),
+    ]
+
+    operations = [
+        migrations.RunPython(scope_search_indexes, unscope_search_indexes),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.4 on 2026-10-19 05:15
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chat', '0006_scoped_message_search'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='archivedmessage',
+            index=models.Index(fields=['timestamp'], name='chat_archmsg_timestamp_idx'),
+        ),
+    ]
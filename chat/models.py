@@ -8,7 +8,7 @@ class Conversation(models.Model):
     """
     offer = models.OneToOneField('core.Offer', on_delete=models.CASCADE, related_name='conversation')
     participants = models.ManyToManyField(settings.AUTH_USER_MODEL, related_name='conversations')
-    created_at = models.DateTimeField(auto_now_add=True)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
 
     def __str__(self):
         return f"Conversation for Offer on '{self.offer.pitch.title}'"
@@ -20,8 +20,37 @@ class Message(models.Model):
     conversation = models.ForeignKey(Conversation, on_delete=models.CASCADE, related_name='messages')
     sender = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='sent_messages')
     content = models.TextField()
-    timestamp = models.DateTimeField(auto_now_add=True)
+    timestamp = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    class Meta:
+        indexes = [
+            # A conversation's history, paged by id
+            models.Index(fields=['conversation', 'id'], name='chat_message_conv_id_idx'),
+        ]
 
     def __str__(self):
         return f"Message from {self.sender.username} at {self.timestamp}"
-    
\ No newline at end of file
+    
+class ArchivedMessage(models.Model):
+    """
+    A message older than the retention window, moved out of the Message table
+    by core.archive. It keeps its original id, so the history stays in order.
+    """
+    id = models.BigIntegerField(primary_key=True)
+    conversation = models.ForeignKey(Conversation, on_delete=models.CASCADE, related_name='archived_messages')
+    sender = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='archived_messages')
+    content = models.TextField()
+    timestamp = models.DateTimeField()
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            # "Load older" pages through a conversation by id
+            models.Index(fields=['conversation', 'id'], name='chat_archmsg_conv_id_idx'),
+            # The admin's date filter and date hierarchy (an index rather than db_index,
+            # which would rebuild the table and its search triggers on SQLite)
+            models.Index(fields=['timestamp'], name='chat_archmsg_timestamp_idx'),
+        ]
+
+    def __str__(self):
+        return f"Archived message from {self.sender.username} at {self.timestamp}"
@@ -0,0 +1,108 @@
+# This file publishes dashboard events to each user's notification websocket.
+# Signal handlers and services call these helpers; NotificationConsumer delivers them.
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.db import transaction
+from django.template.defaultfilters import floatformat
+from django.urls import reverse
+
+def notification_group_name(user_id):
+    """
+    The channel layer group that every open dashboard of a user joins.
+    """
+    return f'notifications_{user_id}'
+
+def publish(user_ids, event, data):
+    """
+    Sends an event to the notification group of every given user.
+    Delivery waits until the current transaction commits, so clients never
+    hear about rows they can't see yet.
+    """
+    channel_layer = get_channel_layer()
+    if channel_layer is None:
+        return
+
+    user_ids = {user_id for user_id in user_ids if user_id is not None}
+
+    message = {
+        'type': 'notify',
+        'event': event,
+        'data': data,
+    }
+
+    async def send_all():
+        for user_id in user_ids:
+            await channel_layer.group_send(notification_group_name(user_id), message)
+
+    def send():
+        # One trip into the event loop for all users, not one per user
+        async_to_sync(send_all)()
+
+    transaction.on_commit(send)
+
+# --- Event helpers ---
+
+def _full_name(user):
+    return f'{user.first_name} {user.last_name}'.strip() or user.username
+
+def offer_created(offer):
+    """
+    Tells the entrepreneur about a new offer on one of their pitches.
+    """
+    publish([offer.pitch.entrepreneur_id], 'offer_created', {
+        'id': offer.id,
+        'pitch_title': offer.pitch.title,
+        'investor_name': _full_name(offer.investor),
+        'amount': floatformat(offer.amount, 2),
+        'message': offer.message,
+        'status': offer.status,
+        'status_display': offer.get_status_display(),
+        'accept_url': reverse('respond_to_offer', args=[offer.id, 'accepted']),
+        'reject_url': reverse('respond_to_offer', args=[offer.id, 'rejected']),
+    })
+
+def offer_status_changed(offer):
+    """
+    Tells both sides of an offer that its status changed.
+    """
+    publish([offer.investor_id, offer.pitch.entrepreneur_id], 'offer_status', {
+        'id': offer.id,
+        'status': offer.status,
+        'status_display': offer.get_status_display(),
+    })
+
+def question_created(question):
+    """
+    Tells the entrepreneur about a new question on one of their pitches.
+    """
+    publish([question.pitch.entrepreneur_id], 'question_created', {
+        'id': question.id,
+        'pitch_title': question.pitch.title,
+        'text': question.text,
+        'answer_url': reverse('submit_answer', args=[question.id]),
+    })
+
+def question_answered(answer):
+    """
+    Tells the entrepreneur and the question's author that a question was answered.
+    """
+    question = answer.question
+    publish([answer.author_id, question.author_id], 'question_answered', {
+        'question_id': question.id,
+        'pitch_id': question.pitch_id,
+    })
+
+def conversation_created(conversation, offer):
+    """
+    Tells both participants about a new conversation. Each side gets the
+    other party's name, so the payload is built per user.
+    """
+    entrepreneur = offer.pitch.entrepreneur
+    data = {
+        'id': conversation.id,
+        'pitch_title': offer.pitch.title,
+        'url': reverse('chat:room', args=[conversation.id]),
+    }
+    publish([entrepreneur.id], 'conversation_created', dict(data, other_name=_full_name(offer.investor)))
+    publish([offer.investor_id], 'conversation_created', dict(data, other_name=_full_name(entrepreneur)))
@@ -0,0 +1,127 @@
+# This file searches the messages of one conversation using the full-text
+# indexes created in chat/migrations/0004_message_search.py and scoped to a
+# conversation in 0006_scoped_message_search.py: a GIN index on
+# (conversation_id, to_tsvector('english', content)) on Postgres, FTS5 tables
+# with an indexed conversation_id column on SQLite. Either way the
+# conversation is looked up in the index together with the terms, so a search
+# never reads other conversations' matches.
+#
+# Live and archived messages are both searched. Results come newest first and
+# are paginated by id (keyset), so every page is an indexed range read no
+# matter how deep the user scrolls.
+
+import re
+
+from django.db import connection
+from django.utils.html import escape
+
+from .models import Message, ArchivedMessage
+
+PAGE_SIZE = 20
+
+# Snippet highlight markers. They are control characters, so they can't clash
+# with (escaped) message text and are swapped for <mark> tags after escaping.
+HIGHLIGHT_START = '\x02'
+HIGHLIGHT_END = '\x03'
+
+class SearchNotSupported(Exception):
+    """
+    Raised when the database has no full-text index for messages.
+    """
+    pass
+
+def search_terms(query):
+    """
+    Splits a user's query into plain word tokens. Operators and punctuation are
+    dropped, so the query can never be a syntax error in the FTS engine.
+    """
+    return re.findall(r'\w+', query.lower())[:10]
+
+def highlight(snippet):
+    """
+    Escapes a snippet and turns the highlight markers into <mark> tags.
+    """
+    return (
+        escape(snippet)
+        .replace(HIGHLIGHT_START, '<mark>')
+        .replace(HIGHLIGHT_END, '</mark>')
+    )
+
+def _search_table(model, conversation_id, terms, before_id, limit):
+    """
+    Returns up to `limit` (id, snippet) rows from one message table, newest first.
+    """
+    table = model._meta.db_table
+    before_params = [before_id] if before_id is not None else []
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            # Every term must match; the last one may be a prefix (search-as-you-type)
+            tsquery = ' & '.join(terms[:-1] + [terms[-1] + ':*'])
+            cursor.execute(
+                f"""
+                SELECT id,
+                       ts_headline('english', content, to_tsquery('english', %s),
+                                   'StartSel={HIGHLIGHT_START}, StopSel={HIGHLIGHT_END}, MaxWords=20, MinWords=5, MaxFragments=2')
+                FROM {table}
+                WHERE conversation_id = %s
+                  AND to_tsvector('english'::regconfig, content) @@ to_tsquery('english', %s)
+                  {'AND id < %s' if before_params else ''}
+                ORDER BY id DESC
+                LIMIT %s
+                """,
+                [tsquery, conversation_id, tsquery, *before_params, limit],
+            )
+        elif connection.vendor == 'sqlite':
+            fts = f'{table}_fts'
+            # The terms only match message text; the conversation id is its own indexed token
+            phrases = ' '.join(f'"{term}"' for term in terms) + '*'
+            match = f'conversation_id : "{int(conversation_id)}" AND content : ({phrases})'
+            cursor.execute(
+                f"""
+                SELECT rowid, snippet({fts}, 0, %s, %s, '…', 16)
+                FROM {fts}
+                WHERE {fts} MATCH %s
+                  {'AND rowid < %s' if before_params else ''}
+                ORDER BY rowid DESC
+                LIMIT %s
+                """,
+                [HIGHLIGHT_START, HIGHLIGHT_END, match, *before_params, limit],
+            )
+        else:
+            raise SearchNotSupported(f"Message search isn't available on {connection.vendor}.")
+        return cursor.fetchall()
+
+def search_messages(conversation_id, query, before_id=None, limit=PAGE_SIZE):
+    """
+    Returns (results, next_before) for the messages of a conversation matching
+    `query`, newest first. Each result is a dict with the message id, sender,
+    timestamp and an HTML snippet with the matches in <mark> tags.
+    `next_before` is the cursor for the next page, or None on the last page.
+    """
+    terms = search_terms(query)
+    if not terms:
+        return [], None
+
+    rows = _search_table(Message, conversation_id, terms, before_id, limit + 1)
+    hot_count = len(rows)
+    if hot_count <= limit:
+        # Archived messages are all older than the live ones, so they continue the list
+        oldest_id = rows[-1][0] if rows else before_id
+        rows += _search_table(ArchivedMessage, conversation_id, terms, oldest_id, limit + 1 - hot_count)
+
+    next_before = rows[limit - 1][0] if len(rows) > limit else None
+    rows = rows[:limit]
+
+    # Load the matched messages themselves (with their senders) by primary key
+    messages = Message.objects.select_related('sender').in_bulk([message_id for message_id, _ in rows[:hot_count]])
+    messages.update(ArchivedMessage.objects.select_related('sender').in_bulk([message_id for message_id, _ in rows[hot_count:]]))
+    return [
+        {
+            'id': message_id,
+            'sender_username': messages[message_id].sender.username,
+            'timestamp': messages[message_id].timestamp.isoformat(),
+            'snippet': highlight(snippet),
+        }
+        for message_id, snippet in rows
+        if message_id in messages
+    ], next_before
@@ -0,0 +1,260 @@
+import asyncio
+import json
+
+from asgiref.sync import async_to_sync
+from asgiref.testing import ApplicationCommunicator
+from channels.db import database_sync_to_async
+from channels.routing import URLRouter
+from django.contrib.auth.models import AnonymousUser
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from core.models import User, Pitch, Offer, Question, Answer
+from core.paginators import EstimatedCountPaginator
+from core.tests import TEST_STORAGES
+from chat.consumers import FORBIDDEN_CLOSE_CODE, IDLE_CLOSE_CODE
+from chat.models import Conversation, Message, ArchivedMessage
+from chat.routing import websocket_urlpatterns
+from chat.search import search_messages
+
+try:
+    from channels.testing import WebsocketCommunicator
+except ImportError:
+    # channels.testing imports daphne (for its live server test case), which
+    # isn't a requirement here; this is the part of its communicator the tests use.
+    class WebsocketCommunicator(ApplicationCommunicator):
+        def __init__(self, application, path):
+            path, _, query = path.partition('?')
+            super().__init__(application, {
+                'type': 'websocket', 'path': path, 'query_string': query.encode(), 'headers': [], 'subprotocols': [],
+            })
+
+        async def connect(self, timeout=1):
+            await self.send_input({'type': 'websocket.connect'})
+            response = await self.receive_output(timeout)
+            if response['type'] == 'websocket.close':
+                return False, response.get('code', 1000)
+            return True, response.get('subprotocol')
+
+        async def send_json_to(self, data):
+            await self.send_input({'type': 'websocket.receive', 'text': json.dumps(data)})
+
+        async def receive_json_from(self, timeout=1):
+            response = await self.receive_output(timeout)
+            assert response['type'] == 'websocket.send', response
+            return json.loads(response['text'])
+
+        async def disconnect(self, code=1000, timeout=1):
+            await self.send_input({'type': 'websocket.disconnect', 'code': code})
+            await self.wait(timeout)
+
+# --- Message search tests ---
+
+class MessageSearchTests(TestCase):
+    def setUp(self):
+        self.entrepreneur = User.objects.create(username='founder', user_type=1)
+        self.investor = User.objects.create(username='investor', user_type=2)
+        pitch = Pitch.objects.create(entrepreneur=self.entrepreneur, title='Pitch', summary='Summary', funding_amount=1000)
+        self.conversation, self.other = [
+            self.open_conversation(Offer.objects.create(pitch=pitch, investor=self.investor, amount=500, status='accepted'))
+            for _ in range(2)
+        ]
+
+    def open_conversation(self, offer):
+        conversation = Conversation.objects.create(offer=offer)
+        conversation.participants.add(self.entrepreneur, self.investor)
+        return conversation
+
+    def say(self, conversation, content):
+        return Message.objects.create(conversation=conversation, sender=self.investor, content=content)
+
+    def test_finds_all_terms_with_a_prefix_last_term(self):
+        match = self.say(self.conversation, 'Term sheet attached')
+        self.say(self.conversation, 'Sheet music')
+        results, next_before = search_messages(self.conversation.id, 'sheet att')
+        self.assertEqual([result['id'] for result in results], [match.id])
+        self.assertIn('<mark>', results[0]['snippet'])
+        self.assertIsNone(next_before)
+
+    def test_other_conversations_never_leak(self):
+        mine = self.say(self.conversation, 'valuation question')
+        self.say(self.other, 'valuation secret')
+        ArchivedMessage.objects.create(
+            id=10_000, conversation=self.other, sender=self.investor, content='valuation archived', timestamp=mine.timestamp,
+        )
+        results, next_before = search_messages(self.conversation.id, 'valuation')
+        self.assertEqual([result['id'] for result in results], [mine.id])
+        self.assertEqual(search_messages(self.conversation.id, 'secret'), ([], None))
+
+    def test_conversation_id_is_not_matched_as_text(self):
+        self.say(self.conversation, 'nothing to see')
+        self.assertEqual(search_messages(self.conversation.id, str(self.conversation.id)), ([], None))
+
+    def test_pages_from_live_into_archived_messages(self):
+        archived = ArchivedMessage.objects.create(
+            id=1, conversation=self.conversation, sender=self.investor, content='runway plan', timestamp=self.say(self.other, 'x').timestamp,
+        )
+        live = [self.say(self.conversation, f'runway update {n}') for n in range(3)]
+
+        results, next_before = search_messages(self.conversation.id, 'runway', limit=2)
+        self.assertEqual([result['id'] for result in results], [live[2].id, live[1].id])
+        results, next_before = search_messages(self.conversation.id, 'runway', before_id=next_before, limit=2)
+        self.assertEqual([result['id'] for result in results], [live[0].id, archived.id])
+        self.assertIsNone(next_before)
+
+    def test_operators_in_the_query_are_plain_words(self):
+        self.say(self.conversation, 'near or not')
+        results, _ = search_messages(self.conversation.id, 'NEAR( "or" NOT*')
+        self.assertEqual(len(results), 1)
+
+
+# --- Admin changelist tests ---
+
+@override_settings(STORAGES=TEST_STORAGES)
+class AdminChangelistTests(TestCase):
+    def setUp(self):
+        self.client.force_login(User.objects.create_superuser(username='admin', password='x'))
+
+    def add_conversations(self, count):
+        # Separate pitches, offers and senders, so a missing select_related shows up
+        for _ in range(count):
+            n = Conversation.objects.count()
+            entrepreneur = User.objects.create(username=f'founder{n}', user_type=1)
+            investor = User.objects.create(username=f'investor{n}', user_type=2)
+            pitch = Pitch.objects.create(entrepreneur=entrepreneur, title=f'Pitch {n}', summary='Summary', funding_amount=1000)
+            conversation = Conversation.objects.create(offer=Offer.objects.create(pitch=pitch, investor=investor, amount=500, status='accepted'))
+            conversation.participants.add(entrepreneur, investor)
+            Message.objects.create(conversation=conversation, sender=investor, content='Hello')
+            Message.objects.create(conversation=conversation, sender=entrepreneur, content='Hi')
+
+    def assertChangelistScales(self, url, model):
+        # The page renders with the same number of queries for 3 conversations as for 9
+        self.add_conversations(3)
+        with CaptureQueriesContext(connection) as few:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertIsInstance(response.context['cl'].paginator, EstimatedCountPaginator)
+        self.add_conversations(6)
+        with CaptureQueriesContext(connection) as many:
+            response = self.client.get(url)
+        self.assertEqual(len(response.context['cl'].result_list), model.objects.count())
+        self.assertEqual(len(many), len(few), [query['sql'] for query in many])
+
+    def test_conversation_changelist(self):
+        self.assertChangelistScales('/admin/chat/conversation/?created_at__gte=2000-01-01+00:00:00%2B00:00', Conversation)
+
+    def test_message_changelist(self):
+        self.assertChangelistScales('/admin/chat/message/?timestamp__gte=2000-01-01+00:00:00%2B00:00', Message)
+
+
+# --- Websocket consumer tests ---
+
+def socket(user, path):
+    """
+    A communicator for `path`, connected as `user` (as AuthMiddlewareStack would set it).
+    """
+    router = URLRouter(websocket_urlpatterns)
+    async def application(scope, receive, send):
+        return await router(dict(scope, user=user), receive, send)
+    return WebsocketCommunicator(application, path)
+
+class ChatConsumerTests(TestCase):
+    def setUp(self):
+        self.entrepreneur = User.objects.create(username='founder', user_type=1)
+        self.investor = User.objects.create(username='investor', user_type=2)
+        pitch = Pitch.objects.create(entrepreneur=self.entrepreneur, title='Pitch', summary='Summary', funding_amount=1000)
+        self.conversation = Conversation.objects.create(offer=Offer.objects.create(pitch=pitch, investor=self.investor, amount=500, status='accepted'))
+        self.conversation.participants.add(self.entrepreneur, self.investor)
+        self.path = f'/ws/chat/{self.conversation.id}/'
+
+    def test_non_participants_are_refused(self):
+        outsider = User.objects.create(username='outsider', user_type=2)
+        async def run():
+            return await socket(outsider, self.path).connect()
+        self.assertEqual(async_to_sync(run)(), (False, FORBIDDEN_CLOSE_CODE))
+
+    @override_settings(CHAT_GAP_FILL_LIMIT=3)
+    def test_reconnect_gets_only_the_missed_messages(self):
+        messages = [
+            Message.objects.create(conversation=self.conversation, sender=self.investor, content=f'Message {n}') for n in range(5)
+        ]
+        async def reconnect(since):
+            communicator = socket(self.investor, f'{self.path}?since={since}')
+            connected, _ = await communicator.connect()
+            self.assertTrue(connected)
+            frame = await communicator.receive_json_from()
+            await communicator.disconnect()
+            return frame
+
+        frame = async_to_sync(reconnect)(messages[1].id)
+        self.assertEqual(frame['type'], 'history')
+        self.assertEqual([message['id'] for message in frame['messages']], [message.id for message in messages[2:]])
+        # More missed messages than CHAT_GAP_FILL_LIMIT: the client reloads instead
+        self.assertEqual(async_to_sync(reconnect)(messages[0].id), {'type': 'resync'})
+
+    def test_ping_gets_a_pong(self):
+        async def run():
+            communicator = socket(self.entrepreneur, self.path)
+            await communicator.connect()
+            await communicator.send_json_to({'type': 'ping'})
+            frame = await communicator.receive_json_from()
+            await communicator.disconnect()
+            return frame
+        self.assertEqual(async_to_sync(run)(), {'type': 'pong'})
+
+    @override_settings(CHAT_IDLE_TIMEOUT=0.4)
+    def test_idle_sockets_are_closed(self):
+        async def run():
+            communicator = socket(self.entrepreneur, self.path)
+            await communicator.connect()
+            # A ping keeps the socket open past the first timeout
+            await asyncio.sleep(0.25)
+            await communicator.send_json_to({'type': 'ping'})
+            await communicator.receive_json_from()
+            self.assertTrue(await communicator.receive_nothing(0.25))
+            return await communicator.receive_output(1)
+        self.assertEqual(async_to_sync(run)(), {'type': 'websocket.close', 'code': IDLE_CLOSE_CODE})
+
+class NotificationConsumerTests(TestCase):
+    def setUp(self):
+        self.entrepreneur = User.objects.create(username='founder', user_type=1)
+        self.investor = User.objects.create(username='investor', user_type=2)
+        self.pitch = Pitch.objects.create(entrepreneur=self.entrepreneur, title='Pitch', summary='Summary', funding_amount=1000)
+
+    def test_events_reach_the_right_users(self):
+        @database_sync_to_async
+        def save(model, **fields):
+            # Events are sent once the transaction commits
+            with self.captureOnCommitCallbacks(execute=True):
+                return model.objects.create(**fields)
+
+        async def run():
+            entrepreneur = socket(self.entrepreneur, '/ws/notifications/')
+            investor = socket(self.investor, '/ws/notifications/')
+            self.assertTrue((await entrepreneur.connect())[0])
+            self.assertTrue((await investor.connect())[0])
+
+            offer = await save(Offer, pitch=self.pitch, investor=self.investor, amount=500)
+            frame = await entrepreneur.receive_json_from()
+            self.assertEqual((frame['event'], frame['data']['id']), ('offer_created', offer.id))
+            self.assertTrue(await investor.receive_nothing())
+
+            question = await save(Question, pitch=self.pitch, author=self.investor, text='Revenue?')
+            frame = await entrepreneur.receive_json_from()
+            self.assertEqual((frame['event'], frame['data']['id']), ('question_created', question.id))
+            self.assertTrue(await investor.receive_nothing())
+
+            await save(Answer, question=question, author=self.entrepreneur, text='Growing')
+            for communicator in (entrepreneur, investor):
+                frame = await communicator.receive_json_from()
+                self.assertEqual((frame['event'], frame['data']['question_id']), ('question_answered', question.id))
+
+            await entrepreneur.disconnect()
+            await investor.disconnect()
+        async_to_sync(run)()
+
+    def test_anonymous_sockets_are_refused(self):
+        async def run():
+            return (await socket(AnonymousUser(), '/ws/notifications/').connect())[0]
+        self.assertFalse(async_to_sync(run)())
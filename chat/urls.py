@@ -4,4 +4,6 @@ from . import views
 app_name = 'chat'
 urlpatterns = [
     path('<int:conversation_id>/', views.chat_room_view, name='room'),
+    path('<int:conversation_id>/messages/', views.message_history_view, name='history'),
+    path('<int:conversation_id>/search/', views.message_search_view, name='search'),
 ]
@@ -1,14 +1,84 @@
+from django.conf import settings
 from django.shortcuts import render, get_object_or_404
 from django.contrib.auth.decorators import login_required
-from django.http import HttpResponseForbidden
+from django.http import HttpResponseForbidden, HttpResponseBadRequest, JsonResponse
 from .models import Conversation
+from .history import message_page, messages_after, message_window, serialize_message
+from .search import search_messages
+
+def get_conversation_for(request, conversation_id):
+    """
+    Returns the conversation if the user is a participant, else None.
+    """
+    conversation = get_object_or_404(Conversation.objects.select_related('offer__pitch'), id=conversation_id)
+    if not conversation.participants.filter(id=request.user.id).exists():
+        return None
+    return conversation
 
 @login_required
 def chat_room_view(request, conversation_id):
-    conversation = get_object_or_404(Conversation, id=conversation_id)
+    conversation = get_conversation_for(request, conversation_id)
     
     # Security check: ensure user is a participant
-    if request.user not in conversation.participants.all():
+    if conversation is None:
+        return HttpResponseForbidden("You are not part of this conversation.")
+
+    # Only one page is rendered; the rest of the history is fetched with "load older/newer".
+    # ?around=<id> (a search result) opens the history around that message.
+    around = request.GET.get('around', '')
+    if around.isdigit():
+        messages, has_more, has_newer = message_window(conversation.id, int(around))
+    else:
+        messages, has_more = message_page(conversation.id)
+        has_newer = False
+    context = {
+        'conversation': conversation,
+        'chat_messages': messages,
+        'has_more': has_more,
+        'has_newer': has_newer,
+        'target_id': int(around) if around.isdigit() else None,
+        'heartbeat_interval': settings.CHAT_HEARTBEAT_INTERVAL,
+    }
+    return render(request, 'chat/room.html', context)
+
+@login_required
+def message_history_view(request, conversation_id):
+    """
+    Returns a page of messages before (or after) a message id as JSON,
+    from the live or the archive table.
+    """
+    conversation = get_conversation_for(request, conversation_id)
+    if conversation is None:
         return HttpResponseForbidden("You are not part of this conversation.")
-        
-    return render(request, 'chat/room.html', {'conversation': conversation})
+
+    before = request.GET.get('before', '')
+    after = request.GET.get('after', '')
+    if before.isdigit():
+        messages, has_more = message_page(conversation.id, before_id=int(before))
+    elif after.isdigit():
+        messages, has_more = messages_after(conversation.id, int(after))
+    else:
+        return HttpResponseBadRequest("'before' or 'after' must be a message id.")
+
+    return JsonResponse({
+        'messages': [serialize_message(message) for message in messages],
+        'has_more': has_more,
+    })
+
+@login_required
+def message_search_view(request, conversation_id):
+    """
+    Full-text search within one conversation, newest matches first.
+    Pass the returned `next_before` back as `before` for the next page.
+    """
+    conversation = get_conversation_for(request, conversation_id)
+    if conversation is None:
+        return HttpResponseForbidden("You are not part of this conversation.")
+
+    before = request.GET.get('before', '')
+    results, next_before = search_messages(
+        conversation.id,
+        request.GET.get('q', ''),
+        before_id=int(before) if before.isdigit() else None,
+    )
+    return JsonResponse({'results': results, 'next_before': next_before})
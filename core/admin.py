@@ -1,13 +1,148 @@
 # This file registers our models with the Django admin interface,
 # so we can easily view and manage them.
+#
+# The changelists are tuned for large tables: related rows are joined with
+# list_select_related instead of loaded per row, foreign keys use autocomplete
+# or raw id widgets instead of <select>s with every user, the full result
+# count is skipped and the paginator uses the planner's row estimate. Filters
+# only use indexed columns.
 
 from django.contrib import admin
-from .models import User, EntrepreneurProfile, InvestorProfile, Pitch, Offer, Question, Answer
-
-admin.site.register(User)
-admin.site.register(EntrepreneurProfile)
-admin.site.register(InvestorProfile)
-admin.site.register(Pitch)
-admin.site.register(Offer)
-admin.site.register(Question) # Register Question
-admin.site.register(Answer)   # Register Answer
+from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
+from .models import User, EntrepreneurProfile, InvestorProfile, Pitch, Offer, Question, Answer, PitchViewStats, Job, ArchivedPitch, ArchivedOffer, PitchAttachment, AttachmentUpload
+from .paginators import EstimatedCountPaginator
+
+class LargeTableAdmin(admin.ModelAdmin):
+    """
+    Shared settings for changelists over tables that grow without bound.
+    """
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    list_per_page = 50
+
+class AnsweredFilter(admin.SimpleListFilter):
+    """
+    Answered/unanswered questions, through the unique index on Answer.question.
+    """
+    title = 'answered'
+    parameter_name = 'answered'
+
+    def lookups(self, request, model_admin):
+        return (('yes', 'Answered'), ('no', 'Unanswered'))
+
+    def queryset(self, request, queryset):
+        if self.value() in ('yes', 'no'):
+            return queryset.filter(answer__isnull=self.value() == 'no')
+        return queryset
+
+@admin.register(User)
+class UserAdmin(BaseUserAdmin):
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    list_display = ('username', 'email', 'first_name', 'last_name', 'user_type', 'is_staff')
+    list_filter = ('user_type', 'is_staff', 'is_active')
+    fieldsets = BaseUserAdmin.fieldsets + (
+        ('Account type', {'fields': ('user_type',)}),
+    )
+
+@admin.register(EntrepreneurProfile)
+class EntrepreneurProfileAdmin(LargeTableAdmin):
+    list_display = ('user', 'company_name', 'industry', 'funding_sought')
+    list_select_related = ('user',)
+    search_fields = ('company_name', 'user__username')
+    autocomplete_fields = ('user',)
+
+@admin.register(InvestorProfile)
+class InvestorProfileAdmin(LargeTableAdmin):
+    list_display = ('user', 'investment_interests', 'budget')
+    list_select_related = ('user',)
+    search_fields = ('user__username', 'investment_interests')
+    autocomplete_fields = ('user',)
+
+@admin.register(Pitch)
+class PitchAdmin(LargeTableAdmin):
+    list_display = ('title', 'entrepreneur', 'funding_amount', 'created_at')
+    list_select_related = ('entrepreneur',)
+    list_filter = ('created_at',)
+    search_fields = ('title',)
+    autocomplete_fields = ('entrepreneur',)
+    date_hierarchy = 'created_at'
+
+@admin.register(Offer)
+class OfferAdmin(LargeTableAdmin):
+    list_display = ('id', 'pitch_title', 'investor', 'amount', 'status', 'created_at')
+    list_select_related = ('pitch', 'investor')
+    list_filter = ('status',)
+    autocomplete_fields = ('pitch', 'investor')
+    date_hierarchy = 'created_at'
+
+    @admin.display(description='Pitch', ordering='pitch__title')
+    def pitch_title(self, obj):
+        return obj.pitch.title
+
+@admin.register(Question)
+class QuestionAdmin(LargeTableAdmin):
+    list_display = ('id', 'pitch_title', 'author', 'created_at')
+    list_select_related = ('pitch', 'author')
+    list_filter = (AnsweredFilter, 'created_at')
+    autocomplete_fields = ('pitch', 'author')
+    date_hierarchy = 'created_at'
+
+    @admin.display(description='Pitch', ordering='pitch__title')
+    def pitch_title(self, obj):
+        return obj.pitch.title
+
+@admin.register(Answer)
+class AnswerAdmin(LargeTableAdmin):
+    list_display = ('id', 'question_id', 'author', 'created_at')
+    list_select_related = ('author',)
+    list_filter = ('created_at',)
+    raw_id_fields = ('question',)
+    autocomplete_fields = ('author',)
+    date_hierarchy = 'created_at'
+
+@admin.register(PitchViewStats)
+class PitchViewStatsAdmin(LargeTableAdmin):
+    list_display = ('pitch_title', 'date', 'views', 'questions', 'offers')
+    list_select_related = ('pitch',)
+    raw_id_fields = ('pitch',)
+    date_hierarchy = 'date'
+
+    @admin.display(description='Pitch', ordering='pitch__title')
+    def pitch_title(self, obj):
+        return obj.pitch.title
+
+@admin.register(Job)
+class JobAdmin(LargeTableAdmin):
+    list_display = ('id', 'job_type', 'status', 'attempts', 'run_after', 'finished_at')
+    list_filter = ('status',)
+    readonly_fields = ('created_at', 'started_at', 'finished_at', 'last_error')
+
+@admin.register(ArchivedPitch)
+class ArchivedPitchAdmin(LargeTableAdmin):
+    list_display = ('title', 'entrepreneur', 'created_at', 'archived_at')
+    list_select_related = ('entrepreneur',)
+    search_fields = ('title',)
+    raw_id_fields = ('entrepreneur',)
+    date_hierarchy = 'created_at'
+
+@admin.register(ArchivedOffer)
+class ArchivedOfferAdmin(LargeTableAdmin):
+    list_display = ('id', 'pitch_title', 'investor', 'amount', 'status', 'created_at', 'archived_at')
+    list_select_related = ('investor',)
+    raw_id_fields = ('investor',)
+    date_hierarchy = 'created_at'
+
+@admin.register(PitchAttachment)
+class PitchAttachmentAdmin(LargeTableAdmin):
+    list_display = ('filename', 'pitch', 'content_type', 'size', 'created_at')
+    list_select_related = ('pitch',)
+    raw_id_fields = ('pitch', 'uploaded_by')
+    readonly_fields = ('file', 'size', 'sha256')
+    date_hierarchy = 'created_at'
+
+@admin.register(AttachmentUpload)
+class AttachmentUploadAdmin(LargeTableAdmin):
+    list_display = ('filename', 'uploaded_by', 'received', 'size', 'updated_at')
+    list_select_related = ('uploaded_by',)
+    raw_id_fields = ('pitch', 'uploaded_by')
@@ -0,0 +1,199 @@
+# This file tracks pitch views and engagement without writing on every page view.
+# Events are counted in a per-process buffer and flushed to the daily
+# PitchViewStats table as aggregated deltas: every PITCH_STATS_FLUSH_INTERVAL
+# seconds from a background thread, whenever PITCH_STATS_MAX_BUFFERED entries
+# are buffered, and when the process exits.
+
+import atexit
+import logging
+import os
+import threading
+import time
+from collections import Counter
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models import Case, F, Q, Sum, Value, When
+from django.utils import timezone
+
+from .models import PitchViewStats
+
+logger = logging.getLogger(__name__)
+
+# The counters that can be tracked; each is a column on PitchViewStats
+METRICS = ('views', 'questions', 'offers')
+
+# Rows per UPDATE: each row adds a branch to the WHERE and to every CASE, and
+# SQLite rejects expressions more than 1000 levels deep
+FLUSH_BATCH_SIZE = 200
+
+class EngagementBuffer:
+    """
+    Accumulates (pitch, day, metric) counts in memory and flushes them when the
+    buffer holds more than `max_keys` entries, and every `flush_interval`
+    seconds from a background thread. Safe to share between threads.
+
+    While the database is failing, flushes are retried every `flush_interval`
+    seconds and at most `max_pending` entries are kept; events beyond that are
+    dropped (and logged) rather than failing the requests that record them.
+    """
+    def __init__(self, flush_interval=30, max_keys=1000, max_pending=None):
+        self.flush_interval = flush_interval
+        self.max_keys = max_keys
+        self.max_pending = max_pending or max_keys * 10
+        self._lock = threading.Lock()
+        self._counts = Counter()
+        self._retry_after = 0
+        self._dropped = 0
+        self._timer_pid = None
+        self._exit_hook = False
+
+    def record(self, pitch_id, metric, amount=1):
+        if metric not in METRICS:
+            raise ValueError(f"Unknown engagement metric '{metric}'.")
+        self._ensure_timer()
+        key = (pitch_id, timezone.localdate(), metric)
+        with self._lock:
+            if key in self._counts or len(self._counts) < self.max_pending:
+                self._counts[key] += amount
+            else:
+                self._dropped += amount
+            due = len(self._counts) >= self.max_keys and time.monotonic() >= self._retry_after
+        if due:
+            self.flush_and_log()
+
+    def _ensure_timer(self):
+        # Started on first use in each process, so forked workers get their own
+        if not self.flush_interval or self._timer_pid == os.getpid():
+            return
+        with self._lock:
+            if self._timer_pid == os.getpid():
+                return
+            self._timer_pid = os.getpid()
+            register_exit_hook, self._exit_hook = not self._exit_hook, True
+        if register_exit_hook:
+            atexit.register(self._flush_on_exit)
+        threading.Thread(target=self._flush_periodically, name='engagement-flush', daemon=True).start()
+
+    def _flush_periodically(self):
+        while True:
+            time.sleep(self.flush_interval)
+            close_old_connections()
+            self.flush_and_log()
+
+    def _flush_on_exit(self):
+        try:
+            self.flush()
+        except Exception as error:
+            logger.warning("Could not flush pitch engagement counts at exit: %s", error)
+
+    def flush_and_log(self):
+        """
+        flush() for request and background paths: errors are logged, not raised.
+        """
+        try:
+            self.flush()
+        except Exception:
+            logger.exception("Flushing pitch engagement counts failed; will retry in %ss.", self.flush_interval)
+
+    def flush(self):
+        """
+        Writes the buffered deltas in batches of FLUSH_BATCH_SIZE rows, each in
+        two statements: one insert that makes sure a row exists for every
+        (pitch, day), and one UPDATE ... CASE that adds every delta atomically
+        (so concurrent flushes from other processes don't overwrite each other).
+        Batches that fail are put back in the buffer and the error is raised.
+        """
+        with self._lock:
+            counts, self._counts = self._counts, Counter()
+            dropped, self._dropped = self._dropped, 0
+        if dropped:
+            logger.warning("Dropped %s pitch engagement event(s) while the buffer was full.", dropped)
+        if not counts:
+            return
+
+        # Fold the (pitch, day, metric) counts into one delta dict per row
+        rows = {}
+        for (pitch_id, day, metric), amount in counts.items():
+            rows.setdefault((pitch_id, day), dict.fromkeys(METRICS, 0))[metric] += amount
+        rows = list(rows.items())
+
+        for start in range(0, len(rows), FLUSH_BATCH_SIZE):
+            try:
+                self._write(rows[start:start + FLUSH_BATCH_SIZE])
+            except Exception:
+                self._put_back(rows[start:])
+                raise
+
+    def _write(self, rows):
+        with transaction.atomic():
+            PitchViewStats.objects.bulk_create(
+                [PitchViewStats(pitch_id=pitch_id, date=day) for (pitch_id, day), _ in rows],
+                ignore_conflicts=True,
+            )
+            match_any = Q()
+            for (pitch_id, day), _ in rows:
+                match_any |= Q(pitch_id=pitch_id, date=day)
+            updates = {}
+            for metric in METRICS:
+                whens = [
+                    When(pitch_id=pitch_id, date=day, then=Value(deltas[metric]))
+                    for (pitch_id, day), deltas in rows if deltas[metric]
+                ]
+                if whens:
+                    updates[metric] = F(metric) + Case(*whens, default=Value(0))
+            PitchViewStats.objects.filter(match_any).update(**updates)
+
+    def _put_back(self, rows):
+        # Keep the counts so a transient database error doesn't lose them, up to max_pending
+        with self._lock:
+            self._retry_after = time.monotonic() + self.flush_interval
+            for (pitch_id, day), deltas in rows:
+                for metric, amount in deltas.items():
+                    key = (pitch_id, day, metric)
+                    if not amount:
+                        continue
+                    if key in self._counts or len(self._counts) < self.max_pending:
+                        self._counts[key] += amount
+                    else:
+                        self._dropped += amount
+
+engagement = EngagementBuffer(
+    flush_interval=getattr(settings, 'PITCH_STATS_FLUSH_INTERVAL', 30),
+    max_keys=getattr(settings, 'PITCH_STATS_MAX_BUFFERED', 1000),
+)
+
+def record_event(pitch_id, metric):
+    """
+    Counts one engagement event (a view, question or offer) for a pitch.
+    """
+    engagement.record(pitch_id, metric)
+
+# --- Reading the aggregates ---
+
+def pitch_stats_for(entrepreneur, recent_days=7):
+    """
+    Returns {pitch_id: {'views', 'questions', 'offers', 'recent_views'}} for all of
+    an entrepreneur's pitches, in a single aggregate query over PitchViewStats.
+    """
+    since = timezone.localdate() - timedelta(days=recent_days - 1)
+    rows = (
+        PitchViewStats.objects.filter(pitch__entrepreneur=entrepreneur)
+        .values('pitch_id')
+        .annotate(
+            total_views=Sum('views'),
+            total_questions=Sum('questions'),
+            total_offers=Sum('offers'),
+            recent_views=Sum('views', filter=Q(date__gte=since)),
+        )
+    )
+    return {
+        row['pitch_id']: {
+            'views': row['total_views'],
+            'questions': row['total_questions'],
+            'offers': row['total_offers'],
+            'recent_views': row['recent_views'] or 0,
+        }
+        for row in rows
+    }
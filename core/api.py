@@ -0,0 +1,396 @@
+# This file implements the read-only JSON API (v1) used by the mobile client:
+#
+#   GET /api/v1/                              the resources, their fields and filters
+#   GET /api/v1/<resource>/?fields=id,title&limit=50&before=<id>&<filter>=<value>
+#   GET /api/v1/<resource>/<id>/?fields=...
+#
+# for the pitches, offers, questions and conversations the user may see.
+#
+# Only the requested fields are loaded: each field names the columns it reads,
+# so ?fields= becomes the query's .only(), and the joins (select_related) and
+# prefetches are planned from the same list. Lists are paginated by id (keyset),
+# newest first; `next` is the url of the following page.
+#
+# Pages up to API_BUFFERED_PAGE_SIZE objects are encoded in full and get an ETag
+# (a hash of the body), so a client revalidating with If-None-Match gets a 304.
+# Larger pages are streamed: rows are read from the database in chunks and
+# written out as they are encoded, so memory stays flat however big the page.
+
+import hashlib
+import json
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.exceptions import ObjectDoesNotExist, ValidationError
+from django.core.handlers.asgi import ASGIRequest
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Prefetch
+from django.http import HttpResponse, HttpResponseNotModified, JsonResponse, StreamingHttpResponse
+from django.urls import reverse
+from django.utils.http import parse_etags
+
+from .models import User, Pitch, Offer, Question, PitchAttachment
+from chat.models import Conversation
+
+# Encoded bytes gathered before a streamed chunk is written out
+STREAM_CHUNK_BYTES = 64 * 1024
+
+encoder = DjangoJSONEncoder(ensure_ascii=False, separators=(',', ':'))
+
+class ApiError(Exception):
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+class ApiField:
+    """
+    One field of a resource.
+
+    `source` is a Django-style lookup ("entrepreneur__username"): the column is
+    loaded with .only(), the relations on the way are joined with select_related,
+    and the value is read by following the same attributes. A missing related
+    row (e.g. an unanswered question's answer) gives null.
+
+    A to-many field instead passes `prefetch`, a function returning the
+    Prefetch to run, and `value`, which builds the JSON value from an object.
+    """
+    def __init__(self, source=None, prefetch=None, value=None):
+        self.source = source
+        self.prefetch = prefetch
+        self._value = value
+
+    def columns(self):
+        return [self.source] if self.source else []
+
+    def select(self):
+        if self.source and '__' in self.source:
+            return self.source.rsplit('__', 1)[0]
+        return None
+
+    def value(self, obj):
+        if self._value is not None:
+            return self._value(obj)
+        for attr in self.source.split('__'):
+            try:
+                obj = getattr(obj, attr)
+            except ObjectDoesNotExist:
+                return None
+            if obj is None:
+                return None
+        return obj
+
+class Resource:
+    """
+    A collection exposed by the API. Subclasses declare the model, the fields,
+    the fields returned when ?fields= is absent, the query-string filters
+    (param -> lookup), and which rows a user may see.
+    """
+    name = None
+    model = None
+    fields = {}
+    default_fields = ()
+    filters = {}
+
+    def visible(self, user):
+        raise NotImplementedError
+
+    def field_names(self, requested):
+        """
+        Parses ?fields= into a list of known field names (id always first).
+        """
+        if not requested:
+            names = list(self.default_fields)
+        else:
+            names = [name.strip() for name in requested.split(',') if name.strip()]
+            unknown = [name for name in names if name not in self.fields]
+            if unknown:
+                raise ApiError(f"Unknown field(s) {', '.join(unknown)}; {self.name} has {', '.join(self.fields)}.")
+        return ['id'] + [name for name in dict.fromkeys(names) if name != 'id']
+
+    def queryset(self, user, names, params):
+        """
+        The rows the user may see, filtered by `params`, loading only the columns,
+        joins and prefetches that the fields in `names` need.
+        """
+        queryset = self.visible(user)
+        for param, lookup in self.filters.items():
+            if param in params:
+                try:
+                    queryset = queryset.filter(**{lookup: params[param]})
+                except (ValueError, ValidationError):
+                    raise ApiError(f"Invalid value for '{param}'.")
+
+        columns, selects, prefetches = {'id'}, set(), []
+        for name in names:
+            field = self.fields[name]
+            columns.update(field.columns())
+            if field.select():
+                selects.add(field.select())
+            if field.prefetch:
+                prefetches.append(field.prefetch())
+        queryset = queryset.only(*columns)
+        if selects:
+            queryset = queryset.select_related(*selects)
+        if prefetches:
+            queryset = queryset.prefetch_related(*prefetches)
+        return queryset
+
+    def serialize(self, obj, names):
+        return {name: self.fields[name].value(obj) for name in names}
+
+def is_investor(user):
+    return user.user_type == 2
+
+class PitchResource(Resource):
+    name = 'pitches'
+    model = Pitch
+    fields = {
+        'id': ApiField('id'),
+        'title': ApiField('title'),
+        'summary': ApiField('summary'),
+        'details': ApiField('content__details'),
+        'funding_amount': ApiField('funding_amount'),
+        'created_at': ApiField('created_at'),
+        'entrepreneur': ApiField('entrepreneur__username'),
+        'company_name': ApiField('entrepreneur__entrepreneur_profile__company_name'),
+        'industry': ApiField('entrepreneur__entrepreneur_profile__industry'),
+        'attachments': ApiField(
+            prefetch=lambda: Prefetch(
+                'attachments',
+                queryset=PitchAttachment.objects.only('id', 'pitch', 'filename', 'content_type', 'size').order_by('created_at'),
+            ),
+            value=lambda pitch: [
+                {
+                    'id': attachment.id,
+                    'filename': attachment.filename,
+                    'content_type': attachment.content_type,
+                    'size': attachment.size,
+                    'url': reverse('attachment_download', args=[attachment.id]),
+                }
+                for attachment in pitch.attachments.all()
+            ],
+        ),
+    }
+    # The long text (details) and the attachments are only sent when asked for
+    default_fields = ('title', 'summary', 'funding_amount', 'created_at', 'entrepreneur', 'company_name', 'industry')
+    filters = {'industry': 'entrepreneur__entrepreneur_profile__industry'}
+
+    def visible(self, user):
+        # Like the pitch page: investors see every pitch, entrepreneurs their own
+        if is_investor(user):
+            return Pitch.objects.all()
+        return Pitch.objects.filter(entrepreneur=user)
+
+class OfferResource(Resource):
+    name = 'offers'
+    model = Offer
+    fields = {
+        'id': ApiField('id'),
+        'pitch_id': ApiField('pitch_id'),
+        'pitch_title': ApiField('pitch__title'),
+        'investor': ApiField('investor__username'),
+        'amount': ApiField('amount'),
+        'message': ApiField('message'),
+        'status': ApiField('status'),
+        'created_at': ApiField('created_at'),
+    }
+    default_fields = ('pitch_id', 'pitch_title', 'investor', 'amount', 'status', 'created_at')
+    filters = {'status': 'status', 'pitch': 'pitch_id'}
+
+    def visible(self, user):
+        # Offers the investor made, or offers received on the entrepreneur's pitches
+        if is_investor(user):
+            return Offer.objects.filter(investor=user)
+        return Offer.objects.filter(pitch__entrepreneur=user)
+
+class QuestionResource(Resource):
+    name = 'questions'
+    model = Question
+    fields = {
+        'id': ApiField('id'),
+        'pitch_id': ApiField('pitch_id'),
+        'author': ApiField('author__username'),
+        'text': ApiField('text'),
+        'created_at': ApiField('created_at'),
+        'answer': ApiField('answer__text'),
+        'answered_at': ApiField('answer__created_at'),
+    }
+    default_fields = ('pitch_id', 'author', 'text', 'created_at', 'answer', 'answered_at')
+    filters = {'pitch': 'pitch_id'}
+
+    def visible(self, user):
+        # The Q&A is public to investors; entrepreneurs see the questions on their pitches
+        if is_investor(user):
+            return Question.objects.all()
+        return Question.objects.filter(pitch__entrepreneur=user)
+
+class ConversationResource(Resource):
+    name = 'conversations'
+    model = Conversation
+    fields = {
+        'id': ApiField('id'),
+        'offer_id': ApiField('offer_id'),
+        'pitch_title': ApiField('offer__pitch__title'),
+        'created_at': ApiField('created_at'),
+        'participants': ApiField(
+            prefetch=lambda: Prefetch('participants', queryset=User.objects.only('id', 'username')),
+            value=lambda conversation: [user.username for user in conversation.participants.all()],
+        ),
+    }
+    default_fields = ('offer_id', 'pitch_title', 'created_at', 'participants')
+
+    def visible(self, user):
+        return Conversation.objects.filter(participants=user)
+
+RESOURCES = {resource.name: resource for resource in (PitchResource(), OfferResource(), QuestionResource(), ConversationResource())}
+
+def get_resource(name):
+    if name not in RESOURCES:
+        raise ApiError(f"Unknown resource '{name}'.", status=404)
+    return RESOURCES[name]
+
+# --- Encoding ---
+
+def encode_list(resource, objects, names, get_next):
+    """
+    Yields the JSON body of a list page in pieces: {"results": [...], "next": ...}.
+    `get_next` is called once the objects have been consumed.
+    """
+    yield '{"results":['
+    for n, obj in enumerate(objects):
+        yield (',' if n else '') + encoder.encode(resource.serialize(obj, names))
+    yield '],"next":' + encoder.encode(get_next()) + '}'
+
+def chunked(pieces):
+    """
+    Joins small encoded pieces into chunks of about STREAM_CHUNK_BYTES.
+    """
+    buffer, size = [], 0
+    for piece in pieces:
+        piece = piece.encode()
+        buffer.append(piece)
+        size += len(piece)
+        if size >= STREAM_CHUNK_BYTES:
+            yield b''.join(buffer)
+            buffer, size = [], 0
+    if buffer:
+        yield b''.join(buffer)
+
+async def iterate_in_thread(iterator):
+    """
+    Serves a sync iterator to an ASGI server chunk by chunk. (Django would
+    otherwise read a sync StreamingHttpResponse to the end before sending it.)
+    The database work stays on the one thread that owns the connection.
+    """
+    step = sync_to_async(lambda: next(iterator, None), thread_sensitive=True)
+    while (chunk := await step()) is not None:
+        yield chunk
+
+def json_response(request, body, status=200):
+    """
+    A buffered JSON response with an ETag. Answers 304 when the client already has it.
+    """
+    body = body.encode() if isinstance(body, str) else body
+    etag = '"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+    if etag in parse_etags(request.headers.get('If-None-Match', '')):
+        response = HttpResponseNotModified()
+    else:
+        response = HttpResponse(body, status=status, content_type='application/json')
+    response['ETag'] = etag
+    response['Cache-Control'] = 'private, no-cache'
+    return response
+
+# --- Views ---
+
+def api_view(view):
+    """
+    Session-authenticated, GET-only API view that answers errors as JSON.
+    """
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if request.method not in ('GET', 'HEAD'):
+            return JsonResponse({'error': "The API is read-only."}, status=405, headers={'Allow': 'GET, HEAD'})
+        if not request.user.is_authenticated:
+            return JsonResponse({'error': "Authentication required."}, status=401)
+        try:
+            return view(request, *args, **kwargs)
+        except ApiError as e:
+            return JsonResponse({'error': str(e)}, status=e.status)
+    return wrapper
+
+@api_view
+def api_index_view(request):
+    """
+    Describes the resources: their fields, default fields and filters.
+    """
+    return json_response(request, json.dumps({
+        'resources': {
+            name: {
+                'url': reverse('api_list', args=[name]),
+                'fields': list(resource.fields),
+                'default_fields': ['id', *resource.default_fields],
+                'filters': list(resource.filters),
+            }
+            for name, resource in RESOURCES.items()
+        }
+    }))
+
+@api_view
+def api_list_view(request, resource_name):
+    """
+    A page of a resource, newest first. `before` is the id the page starts
+    below (from the previous page's `next`), `limit` the page size.
+    """
+    resource = get_resource(resource_name)
+    names = resource.field_names(request.GET.get('fields'))
+    try:
+        limit = min(int(request.GET.get('limit', settings.API_PAGE_SIZE)), settings.API_MAX_PAGE_SIZE)
+        before = int(request.GET['before']) if 'before' in request.GET else None
+    except ValueError:
+        raise ApiError("'limit' and 'before' must be integers.")
+    if limit < 1:
+        raise ApiError("'limit' must be positive.")
+
+    queryset = resource.queryset(request.user, names, request.GET).order_by('-id')
+    if before is not None:
+        queryset = queryset.filter(id__lt=before)
+
+    def next_url(last_id):
+        params = request.GET.copy()
+        params['before'] = last_id
+        return request.path + '?' + params.urlencode()
+
+    if limit <= settings.API_BUFFERED_PAGE_SIZE:
+        objects = list(queryset[:limit + 1])
+        has_more = len(objects) > limit
+        objects = objects[:limit]
+        body = ''.join(encode_list(resource, objects, names, lambda: next_url(objects[-1].id) if has_more else None))
+        return json_response(request, body)
+
+    # Large page: stream it. Reading one row past the page tells whether there
+    # is a next one, so the "next" url is only known at the end of the body.
+    cursor = {}
+    def page_rows():
+        for n, obj in enumerate(queryset[:limit + 1].iterator(chunk_size=min(limit + 1, 2000))):
+            if n == limit:
+                cursor['next'] = next_url(cursor['last_id'])
+                return
+            cursor['last_id'] = obj.id
+            yield obj
+
+    content = chunked(encode_list(resource, page_rows(), names, lambda: cursor.get('next')))
+    if isinstance(request, ASGIRequest):
+        content = iterate_in_thread(content)
+    response = StreamingHttpResponse(content, content_type='application/json')
+    response['Cache-Control'] = 'private, no-cache'
+    return response
+
+@api_view
+def api_detail_view(request, resource_name, pk):
+    resource = get_resource(resource_name)
+    names = resource.field_names(request.GET.get('fields'))
+    obj = resource.queryset(request.user, names, {}).filter(id=pk).first()
+    if obj is None:
+        raise ApiError("Not found.", status=404)
+    return json_response(request, encoder.encode(resource.serialize(obj, names)))
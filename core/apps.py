@@ -4,3 +4,16 @@ from django.apps import AppConfig
 class CoreConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'core'
+
+    def ready(self):
+        # Connect the cache invalidation and autocomplete index signal handlers
+        from . import signals, autocomplete  # noqa: F401
+
+        # Register every app's job handlers, so enqueue() sees their retry policy in web processes too
+        from . import jobs
+        jobs.autodiscover()
+
+        from django.conf import settings
+        if settings.PROFILING_ENABLED:
+            from . import profiling
+            profiling.install()
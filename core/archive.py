@@ -0,0 +1,228 @@
+# This file moves cold rows out of the hot tables into the archive tables.
+# Rejected offers, stale pitches and old chat messages are copied to
+# ArchivedOffer / ArchivedPitch / ArchivedMessage and deleted from the originals,
+# so the tables (and indexes) every request touches only hold live data.
+#
+# Rows are moved in batches, each in its own transaction: a batch is either
+# fully archived or left untouched. The source tables are the work queue, so an
+# interrupted run simply picks up the remaining rows the next time it runs.
+#
+#   python manage.py archivedata
+#   python manage.py archivedata --only messages --batch-size 5000
+
+import logging
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Exists, OuterRef, Sum
+from django.utils import timezone
+
+from .models import (
+    Pitch, PitchContent, Offer, Question, PitchViewStats, PitchAttachment, AttachmentUpload,
+    ArchivedPitch, ArchivedOffer,
+)
+from chat.models import Conversation, Message, ArchivedMessage
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_RETENTION_DAYS = {
+    'messages': 365,
+    'rejected_offers': 90,
+    'stale_pitches': 365,
+}
+
+def retention_days(kind):
+    return getattr(settings, 'ARCHIVE_RETENTION_DAYS', {}).get(kind, DEFAULT_RETENTION_DAYS[kind])
+
+class Archiver:
+    """
+    Moves the rows selected by candidates() from `model` to `archive_model`.
+    Subclasses say which rows are cold and how to copy them.
+    """
+    kind = None
+    model = None
+    archive_model = None
+
+    def __init__(self, now=None):
+        self.cutoff = (now or timezone.now()) - timedelta(days=retention_days(self.kind))
+
+    def candidates(self):
+        raise NotImplementedError
+
+    def to_archive(self, rows):
+        raise NotImplementedError
+
+    def count(self):
+        return self.candidates().count()
+
+    def archive_batch(self, after_id, batch_size):
+        """
+        Archives up to `batch_size` candidates with an id above `after_id` in one
+        transaction. Returns the ids that were moved (empty when there's nothing left).
+        """
+        with transaction.atomic():
+            rows = self.candidates().filter(id__gt=after_id).order_by('id')
+            if connection.features.has_select_for_update_skip_locked:
+                # Rows locked by a live request are left for the next run
+                rows = rows.select_for_update(skip_locked=True, of=('self',))
+            rows = list(rows[:batch_size])
+            if not rows:
+                return []
+            # ignore_conflicts makes a batch safe to repeat if a copy already exists
+            self.archive_model.objects.bulk_create(self.to_archive(rows), ignore_conflicts=True)
+            ids = [row.id for row in rows]
+            self.model.objects.filter(id__in=ids).delete()
+        return ids
+
+    def run(self, batch_size=1000, max_batches=None):
+        """
+        Archives candidates batch by batch until none are left (or `max_batches`
+        batches have run). Returns the number of rows moved.
+        """
+        moved, batches, last_id = 0, 0, 0
+        while max_batches is None or batches < max_batches:
+            ids = self.archive_batch(last_id, batch_size)
+            if not ids:
+                break
+            moved += len(ids)
+            batches += 1
+            last_id = ids[-1]
+            logger.info("Archived %s %s (up to id %s).", len(ids), self.kind, last_id)
+        return moved
+
+class MessageArchiver(Archiver):
+    """
+    Chat messages older than the retention window.
+    """
+    kind = 'messages'
+    model = Message
+    archive_model = ArchivedMessage
+
+    def candidates(self):
+        return Message.objects.filter(timestamp__lt=self.cutoff)
+
+    def to_archive(self, rows):
+        return [
+            ArchivedMessage(
+                id=message.id,
+                conversation_id=message.conversation_id,
+                sender_id=message.sender_id,
+                content=message.content,
+                timestamp=message.timestamp,
+            )
+            for message in rows
+        ]
+
+class RejectedOfferArchiver(Archiver):
+    """
+    Rejected offers older than the retention window that never led to a conversation.
+    """
+    kind = 'rejected_offers'
+    model = Offer
+    archive_model = ArchivedOffer
+
+    def candidates(self):
+        return Offer.objects.filter(status='rejected', created_at__lt=self.cutoff).exclude(
+            Exists(Conversation.objects.filter(offer=OuterRef('pk')))
+        )
+
+    def to_archive(self, rows):
+        titles = dict(Pitch.objects.filter(id__in={offer.pitch_id for offer in rows}).values_list('id', 'title'))
+        return [
+            ArchivedOffer(
+                id=offer.id,
+                pitch_id=offer.pitch_id,
+                pitch_title=titles.get(offer.pitch_id, ''),
+                investor_id=offer.investor_id,
+                amount=offer.amount,
+                message=offer.message,
+                status=offer.status,
+                created_at=offer.created_at,
+            )
+            for offer in rows
+        ]
+
+class StalePitchArchiver(Archiver):
+    """
+    Pitches older than the retention window with no offers left in the Offer
+    table, no questions or views since the cutoff and no attachments. (Deleting
+    a pitch would delete its attachments and their files, which the archive
+    has no place for.)
+    Deleting the pitch also removes its questions, answers and daily stats, so
+    the Q&A thread and the view total are copied onto the archived row first.
+    """
+    kind = 'stale_pitches'
+    model = Pitch
+    archive_model = ArchivedPitch
+
+    def candidates(self):
+        return Pitch.objects.filter(created_at__lt=self.cutoff).exclude(
+            Exists(Offer.objects.filter(pitch=OuterRef('pk')))
+        ).exclude(
+            Exists(Question.objects.filter(pitch=OuterRef('pk'), created_at__gte=self.cutoff))
+        ).exclude(
+            Exists(PitchViewStats.objects.filter(pitch=OuterRef('pk'), date__gte=self.cutoff.date(), views__gt=0))
+        ).exclude(
+            Exists(PitchAttachment.objects.filter(pitch=OuterRef('pk')))
+        ).exclude(
+            Exists(AttachmentUpload.objects.filter(pitch=OuterRef('pk')))
+        )
+
+    def to_archive(self, rows):
+        pitch_ids = [pitch.id for pitch in rows]
+        threads = defaultdict(list)
+        questions = (
+            Question.objects.filter(pitch_id__in=pitch_ids)
+            .select_related('author', 'answer__author')
+            .order_by('created_at')
+        )
+        for question in questions:
+            answer = getattr(question, 'answer', None)
+            threads[question.pitch_id].append({
+                'author': question.author.username,
+                'text': question.text,
+                'created_at': question.created_at.isoformat(),
+                'answer': answer and {
+                    'author': answer.author.username,
+                    'text': answer.text,
+                    'created_at': answer.created_at.isoformat(),
+                },
+            })
+        details = dict(PitchContent.objects.filter(pitch_id__in=pitch_ids).values_list('pitch_id', 'details'))
+        views = dict(
+            PitchViewStats.objects.filter(pitch_id__in=pitch_ids)
+            .values('pitch_id').annotate(total=Sum('views')).values_list('pitch_id', 'total')
+        )
+        return [
+            ArchivedPitch(
+                id=pitch.id,
+                entrepreneur_id=pitch.entrepreneur_id,
+                title=pitch.title,
+                summary=pitch.summary,
+                details=details.get(pitch.id, ''),
+                funding_amount=pitch.funding_amount,
+                created_at=pitch.created_at,
+                qa_thread=threads[pitch.id],
+                total_views=views.get(pitch.id) or 0,
+            )
+            for pitch in rows
+        ]
+
+# Offers go before pitches: a pitch only becomes stale once its offers are gone
+ARCHIVERS = {
+    archiver.kind: archiver
+    for archiver in (MessageArchiver, RejectedOfferArchiver, StalePitchArchiver)
+}
+
+def archive_cold_data(kinds=None, batch_size=1000, max_batches=None):
+    """
+    Runs the archivers for `kinds` (all of them by default) in order.
+    Returns {kind: rows moved}.
+    """
+    return {
+        kind: archiver().run(batch_size=batch_size, max_batches=max_batches)
+        for kind, archiver in ARCHIVERS.items()
+        if kinds is None or kind in kinds
+    }
@@ -0,0 +1,411 @@
+# This file handles pitch attachments (decks, demo videos): chunked, resumable
+# uploads and access-checked downloads with HTTP Range support.
+#
+# Uploading (pitch owner only):
+#   1. POST /pitch/<id>/attachments/ with JSON {"filename", "size", "sha256"?}
+#      creates an AttachmentUpload and returns its url, the offset to send from
+#      and the largest chunk accepted.
+#   2. PUT <upload url> with a chunk as the raw request body and an
+#      Upload-Offset header. The body is streamed straight into a partial file
+#      on disk, never held in memory as a whole. An optional
+#      "Upload-Checksum: sha256 <base64>" header is checked per chunk.
+#   3. GET <upload url> reports the current offset, so an interrupted upload
+#      resumes from there. DELETE cancels it.
+# When the last chunk arrives the file's SHA-256 is computed (and compared with
+# the declared one), a PitchAttachment is created and the partial file is
+# linked into place in the same transaction.
+#
+# Downloads are limited to investors and the pitch's owner, like the pitch page.
+# Single byte ranges are served as 206 responses, which is what lets browsers
+# seek in a video and resume a broken download.
+
+import base64
+import binascii
+import hashlib
+import json
+import os
+import re
+from datetime import timedelta
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.auth.decorators import login_required
+from django.db import transaction
+from django.http import (
+    FileResponse, HttpResponse, HttpResponseForbidden, HttpResponseNotModified, JsonResponse,
+)
+from django.shortcuts import get_object_or_404
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.http import content_disposition_header
+from django.views.decorators.http import require_http_methods, require_POST
+
+from .models import Pitch, PitchAttachment, AttachmentUpload
+
+try:
+    import fcntl
+except ImportError:  # Windows: concurrent chunks for one upload aren't locked out
+    fcntl = None
+
+# Bytes read from the request (or a file) at a time
+BLOCK_SIZE = 256 * 1024
+
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+class UploadError(Exception):
+    """
+    An upload request that can't be applied. `status` is the HTTP status to answer with.
+    """
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+def partial_path(upload):
+    """
+    Where the bytes of an upload in progress are written. The file is removed
+    when the upload is deleted (see core/signals.py).
+    """
+    return Path(settings.PITCH_ATTACHMENT_ROOT) / 'partial' / f'{upload.id}.part'
+
+def start_upload(pitch, user, filename, size, sha256=''):
+    """
+    Creates an AttachmentUpload after validating the declared file. Starting a
+    file with the same name, size and sha256 again returns its unfinished upload,
+    so a client that lost track of it can resume.
+    """
+    filename = os.path.basename(str(filename or '')).strip()[:255]
+    extension = os.path.splitext(filename)[1].lower()
+    if extension not in settings.PITCH_ATTACHMENT_TYPES:
+        raise UploadError(f"Only {', '.join(settings.PITCH_ATTACHMENT_TYPES)} files can be attached.")
+    if not isinstance(size, int) or size <= 0:
+        raise UploadError("'size' must be the file size in bytes.")
+    if size > settings.PITCH_ATTACHMENT_MAX_SIZE:
+        raise UploadError(f"Attachments can be at most {settings.PITCH_ATTACHMENT_MAX_SIZE} bytes.", status=413)
+    sha256 = str(sha256 or '').lower()
+    if sha256 and not re.fullmatch(r'[0-9a-f]{64}', sha256):
+        raise UploadError("'sha256' must be a hex SHA-256 digest.")
+
+    fields = {'pitch': pitch, 'uploaded_by': user, 'filename': filename, 'size': size, 'sha256': sha256}
+    content_type = settings.PITCH_ATTACHMENT_TYPES[extension]
+    if sha256:
+        upload, created = AttachmentUpload.objects.get_or_create(**fields, defaults={'content_type': content_type})
+    else:
+        # Without a checksum a different file could have the same name and size
+        upload, created = AttachmentUpload.objects.create(**fields, content_type=content_type), True
+    if created:
+        path = partial_path(upload)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.touch()
+    return upload
+
+def write_chunk(upload, offset, stream, length, checksum=None):
+    """
+    Streams `length` bytes from `stream` into the upload's partial file at `offset`,
+    which must be the number of bytes received so far. Returns the new offset.
+    """
+    if offset != upload.received:
+        raise UploadError(f"Expected Upload-Offset {upload.received}.", status=409)
+    if length <= 0 or length > settings.PITCH_ATTACHMENT_CHUNK_SIZE:
+        raise UploadError(f"Chunks must be between 1 and {settings.PITCH_ATTACHMENT_CHUNK_SIZE} bytes.", status=413)
+    if offset + length > upload.size:
+        raise UploadError("The chunk runs past the declared file size.")
+
+    digest = hashlib.sha256()
+    written = 0
+    # pwrite at an explicit position: a retried chunk simply overwrites its own bytes
+    try:
+        fd = os.open(partial_path(upload), os.O_WRONLY)
+    except FileNotFoundError:
+        raise UploadError("This upload has expired; please start again.", status=410)
+    try:
+        # One writer per upload: a second request for the same offset would
+        # otherwise overwrite bytes the first one has already been credited for
+        if fcntl is not None:
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                raise UploadError("Another chunk of this upload is being written; retry shortly.", status=409)
+            upload.refresh_from_db(fields=['received'])
+            if offset != upload.received:
+                raise UploadError(f"Expected Upload-Offset {upload.received}.", status=409)
+
+        while written < length:
+            block = stream.read(min(BLOCK_SIZE, length - written))
+            if not block:
+                break
+            os.pwrite(fd, block, offset + written)
+            digest.update(block)
+            written += len(block)
+
+        if written != length:
+            raise UploadError("The chunk ended before Content-Length bytes were received.")
+        if checksum is not None and digest.digest() != checksum:
+            raise UploadError("The chunk doesn't match its Upload-Checksum.")
+
+        # Advanced while the lock is held, so the next writer sees the new offset
+        advanced = AttachmentUpload.objects.filter(id=upload.id, received=offset).update(
+            received=offset + written, updated_at=timezone.now()
+        )
+    finally:
+        os.close(fd)  # Also releases the lock
+
+    if not advanced:
+        upload.refresh_from_db(fields=['received'])
+        raise UploadError(f"Expected Upload-Offset {upload.received}.", status=409)
+    upload.received = offset + written
+    return upload.received
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        while block := f.read(BLOCK_SIZE * 4):
+            digest.update(block)
+    return digest.hexdigest()
+
+def finish_upload(upload):
+    """
+    Verifies a fully received upload and turns it into a PitchAttachment.
+    A checksum mismatch discards the upload.
+    """
+    path = partial_path(upload)
+    sha256 = file_sha256(path)
+    if upload.sha256 and sha256 != upload.sha256:
+        upload.delete()
+        raise UploadError("The uploaded file doesn't match its sha256; please upload it again.", status=422)
+
+    storage = PitchAttachment._meta.get_field('file').storage
+    extension = os.path.splitext(upload.filename)[1].lower()
+    name = storage.get_available_name(f'{upload.pitch_id}/{upload.id}{extension}')
+    final_path = Path(storage.path(name))
+    final_path.parent.mkdir(parents=True, exist_ok=True)
+
+    # The row is written first and the file linked into place (same filesystem,
+    # so nothing is copied) before the transaction commits. If anything fails
+    # the link is removed and the upload, with its partial file, is left to be
+    # finished again; the partial file is only removed once the commit is done
+    # (see core/signals.py).
+    linked = False
+    try:
+        with transaction.atomic():
+            attachment = PitchAttachment.objects.create(
+                pitch_id=upload.pitch_id,
+                uploaded_by_id=upload.uploaded_by_id,
+                file=name,
+                filename=upload.filename,
+                content_type=upload.content_type,
+                size=upload.size,
+                sha256=sha256,
+            )
+            upload.delete()
+            os.link(path, final_path)
+            linked = True
+    except Exception:
+        if linked:
+            final_path.unlink(missing_ok=True)
+        raise
+    return attachment
+
+def purge_abandoned_uploads(max_age=None):
+    """
+    Removes uploads idle for longer than `max_age`, and partial files left
+    without an upload (e.g. after a crash). Returns how many were removed.
+    """
+    if max_age is None:
+        max_age = timedelta(hours=settings.PITCH_ATTACHMENT_UPLOAD_EXPIRY_HOURS)
+    cutoff = timezone.now() - max_age
+    removed = 0
+    for upload in AttachmentUpload.objects.filter(updated_at__lt=cutoff).iterator():
+        upload.delete()
+        removed += 1
+
+    partial_dir = Path(settings.PITCH_ATTACHMENT_ROOT) / 'partial'
+    if partial_dir.is_dir():
+        live = {str(upload_id) for upload_id in AttachmentUpload.objects.values_list('id', flat=True)}
+        for path in partial_dir.glob('*.part'):
+            if path.stem not in live and path.stat().st_mtime < cutoff.timestamp():
+                path.unlink(missing_ok=True)
+                removed += 1
+    return removed
+
+def upload_state(upload):
+    return {
+        'url': reverse('attachment_upload', args=[upload.id]),
+        'offset': upload.received,
+        'size': upload.size,
+        'chunk_size': settings.PITCH_ATTACHMENT_CHUNK_SIZE,
+    }
+
+def serialize_attachment(attachment):
+    return {
+        'id': attachment.id,
+        'filename': attachment.filename,
+        'content_type': attachment.content_type,
+        'size': attachment.size,
+        'sha256': attachment.sha256,
+        'url': reverse('attachment_download', args=[attachment.id]),
+    }
+
+def parse_range(header, size):
+    """
+    Parses a single "bytes=start-end" Range header into (start, length).
+    Returns None when the whole file should be sent (no header, several ranges
+    or a syntax we don't support). Raises ValueError if the range is unsatisfiable.
+    """
+    match = RANGE_RE.match(header.strip()) if header else None
+    if match is None:
+        return None
+    first, last = match.groups()
+    if first:
+        start = int(first)
+        end = min(int(last), size - 1) if last else size - 1
+        if last and int(last) < start:
+            return None  # Invalid, so ignored as the RFC asks
+    elif last:
+        # Suffix range: the last N bytes
+        start = max(size - int(last), 0)
+        end = size - 1
+    else:
+        return None
+    if start >= size or (not first and int(last) == 0):
+        raise ValueError("Unsatisfiable range")
+    return start, end - start + 1
+
+class FileRange:
+    """
+    The bytes [start, start + length) of an open file, for FileResponse.
+    It keeps fileno(), so gunicorn's sync and gthread workers send it with
+    sendfile(2) from the current offset for Content-Length bytes (no copy
+    through Python); other servers read it block by block.
+    """
+    def __init__(self, file, start, length):
+        file.seek(start)
+        self.file = file
+        self.remaining = length
+
+    def read(self, size=-1):
+        if size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.file.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def fileno(self):
+        return self.file.fileno()
+
+    def close(self):
+        self.file.close()
+
+# --- Views ---
+
+@login_required
+@require_POST
+def attachment_upload_start_view(request, pitch_id):
+    """
+    Starts (or resumes) an attachment upload for one of the user's pitches.
+    """
+    pitch = get_object_or_404(Pitch.objects.only('id', 'entrepreneur_id'), id=pitch_id)
+    if pitch.entrepreneur_id != request.user.id:
+        return HttpResponseForbidden("You can only add attachments to your own pitches.")
+    try:
+        data = json.loads(request.body)
+        upload = start_upload(pitch, request.user, data.get('filename'), data.get('size'), data.get('sha256'))
+    except (ValueError, AttributeError):
+        return JsonResponse({'error': "Send a JSON object with 'filename' and 'size'."}, status=400)
+    except UploadError as e:
+        return JsonResponse({'error': str(e)}, status=e.status)
+    return JsonResponse(upload_state(upload), status=201)
+
+@login_required
+@require_http_methods(['GET', 'HEAD', 'PUT', 'DELETE'])
+def attachment_upload_view(request, upload_id):
+    """
+    GET reports how far an upload has got, PUT appends a chunk, DELETE cancels it.
+    """
+    upload = get_object_or_404(AttachmentUpload, id=upload_id, uploaded_by=request.user)
+
+    if request.method == 'DELETE':
+        upload.delete()
+        return HttpResponse(status=204)
+
+    if request.method == 'PUT':
+        try:
+            offset = int(request.headers.get('Upload-Offset', ''))
+            length = int(request.headers.get('Content-Length', ''))
+        except ValueError:
+            return JsonResponse({'error': "Upload-Offset and Content-Length headers are required."}, status=400)
+        checksum = None
+        if 'Upload-Checksum' in request.headers:
+            algorithm, _, value = request.headers['Upload-Checksum'].partition(' ')
+            try:
+                checksum = base64.b64decode(value, validate=True)
+            except binascii.Error:
+                checksum = b''
+            if algorithm != 'sha256' or len(checksum) != 32:
+                return JsonResponse({'error': "Upload-Checksum must be 'sha256 <base64 digest>'."}, status=400)
+        try:
+            # `request` is read as a stream, so the chunk never sits in memory in full
+            write_chunk(upload, offset, request, length, checksum)
+            if upload.received == upload.size:
+                attachment = finish_upload(upload)
+                return JsonResponse({'attachment': serialize_attachment(attachment)}, status=201)
+        except UploadError as e:
+            response = JsonResponse({'error': str(e), 'offset': upload.received}, status=e.status)
+            response['Upload-Offset'] = upload.received
+            return response
+
+    response = JsonResponse(upload_state(upload))
+    response['Upload-Offset'] = upload.received
+    response['Cache-Control'] = 'no-store'
+    return response
+
+@login_required
+def attachment_download_view(request, attachment_id):
+    """
+    Serves an attachment to investors and the pitch's owner, honouring single byte ranges.
+    """
+    attachment = get_object_or_404(PitchAttachment.objects.select_related('pitch'), id=attachment_id)
+    if request.user.user_type != 2 and attachment.pitch.entrepreneur_id != request.user.id:
+        return HttpResponseForbidden("Only investors can download pitch attachments.")
+
+    etag = f'"{attachment.sha256}"'
+    if request.headers.get('If-None-Match') == etag:
+        return HttpResponseNotModified(headers={'ETag': etag})
+
+    disposition = content_disposition_header(
+        not attachment.content_type.startswith('video/') and attachment.content_type != 'application/pdf',
+        attachment.filename,
+    )
+
+    if settings.PITCH_ATTACHMENT_ACCEL_REDIRECT:
+        # The proxy does the Range handling and the zero-copy send
+        response = HttpResponse(content_type=attachment.content_type)
+        response['X-Accel-Redirect'] = settings.PITCH_ATTACHMENT_ACCEL_REDIRECT.rstrip('/') + '/' + attachment.file.name
+        response['Content-Disposition'] = disposition
+        response['ETag'] = etag
+        return response
+
+    byte_range = None
+    if request.headers.get('If-Range', etag) == etag:
+        try:
+            byte_range = parse_range(request.headers.get('Range'), attachment.size)
+        except ValueError:
+            return HttpResponse(status=416, headers={'Content-Range': f'bytes */{attachment.size}'})
+
+    try:
+        f = open(attachment.file.path, 'rb')
+    except FileNotFoundError:
+        return HttpResponse("The attachment file is missing.", status=410)
+
+    if byte_range is None:
+        response = FileResponse(f, content_type=attachment.content_type)
+    else:
+        start, length = byte_range
+        response = FileResponse(FileRange(f, start, length), status=206, content_type=attachment.content_type)
+        response['Content-Length'] = length
+        response['Content-Range'] = f'bytes {start}-{start + length - 1}/{attachment.size}'
+    response.block_size = BLOCK_SIZE
+    response['Content-Disposition'] = disposition
+    response['Accept-Ranges'] = 'bytes'
+    response['ETag'] = etag
+    response['Cache-Control'] = 'private, max-age=3600'
+    return response
@@ -0,0 +1,473 @@
+# This file powers search-box autocomplete over pitch titles, company names,
+# industries and investor names from an in-memory index, so suggestions never
+# hit the database while the user types.
+#
+# The index is built the first time it's used (gunicorn warms it when a worker
+# starts, see gunicorn.conf.py) and kept current by the model signals below.
+# Signals only reach the process that made the change, so each process also
+# rebuilds its index in the background every AUTOCOMPLETE_REBUILD_INTERVAL
+# seconds to pick up writes made by other workers. Builds read the database
+# without holding the index lock, so searches keep using the current index
+# until the new one is swapped in, and changes made during a build are
+# replayed onto the new index.
+
+import bisect
+import logging
+import re
+import sys
+import threading
+import time
+import unicodedata
+from collections import Counter
+
+from django.conf import settings
+from django.contrib.admin.views.decorators import staff_member_required
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from django.http import JsonResponse
+from django.urls import reverse
+from django.utils.http import urlencode
+
+from .models import User, EntrepreneurProfile, Pitch
+
+logger = logging.getLogger(__name__)
+
+# Result ordering between kinds when scores tie
+KIND_ORDER = {'pitch': 0, 'company': 1, 'industry': 2, 'investor': 3}
+
+MAX_LABEL_LENGTH = 100
+# How many indexed words a prefix lookup may look at (a one-letter prefix matches a lot)
+PREFIX_SCAN_LIMIT = 2000
+# Stop collecting matches after this many (enough to rank the top few)
+CANDIDATE_LIMIT = 200
+# Trigrams shared by more words than this are too common to help fuzzy matching
+MAX_TRIGRAM_POSTINGS = 5000
+# Minimum trigram similarity (0-1) for a word to count as a typo of the query
+FUZZY_THRESHOLD = 0.3
+
+def normalize(text):
+    """
+    Lowercases and strips accents, so "Café" and "cafe" index the same.
+    """
+    text = unicodedata.normalize('NFKD', text)
+    return ''.join(ch for ch in text if not unicodedata.combining(ch)).lower()
+
+def tokenize(text):
+    return re.findall(r'\w+', normalize(text))
+
+def trigrams(word):
+    padded = f'  {word} '
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+class PrefixIndex:
+    """
+    The index itself. Not thread-safe; Autocomplete guards it with a lock.
+
+    Every label is split into words. `sorted_words` is kept in order so all words
+    starting with a prefix form one contiguous slice found with bisect (a flat,
+    much smaller stand-in for a trie), `postings` maps each word to the entries
+    containing it, and `trigram_words` maps each trigram to the words containing
+    it, for typo-tolerant matching.
+
+    When full, adding an entry evicts the oldest one (entries are kept in
+    insertion order, and re-adding an entry makes it the newest).
+    """
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self.entries = {}        # key -> (kind, label, target)
+        self.entry_words = {}    # key -> words of the label
+        self.refcounts = Counter()  # shared entries (industries) -> number of owners
+        self.postings = {}       # word -> set of keys
+        self.sorted_words = []
+        self.trigram_words = {}  # trigram -> set of words
+        self.evicted = 0
+
+    def add(self, key, kind, label, target=None):
+        """
+        Adds or replaces an entry, evicting the oldest one if the index is full.
+        """
+        self.remove(key)
+        label = label.strip()[:MAX_LABEL_LENGTH]
+        words = tuple(dict.fromkeys(tokenize(label)))
+        if not words:
+            return
+        while len(self.entries) >= self.max_entries:
+            oldest = next(iter(self.entries))
+            self.refcounts.pop(oldest, None)
+            self.remove(oldest)
+            self.evicted += 1
+
+        self.entries[key] = (kind, label, target)
+        self.entry_words[key] = words
+        for word in words:
+            keys = self.postings.get(word)
+            if keys is None:
+                self.postings[word] = keys = set()
+                bisect.insort(self.sorted_words, word)
+                for trigram in trigrams(word):
+                    self.trigram_words.setdefault(trigram, set()).add(word)
+            keys.add(key)
+
+    def remove(self, key):
+        words = self.entry_words.pop(key, None)
+        if words is None:
+            return
+        del self.entries[key]
+        for word in words:
+            keys = self.postings[word]
+            keys.discard(key)
+            if not keys:
+                del self.postings[word]
+                del self.sorted_words[bisect.bisect_left(self.sorted_words, word)]
+                for trigram in trigrams(word):
+                    trigram_set = self.trigram_words[trigram]
+                    trigram_set.discard(word)
+                    if not trigram_set:
+                        del self.trigram_words[trigram]
+
+    def acquire(self, key, kind, label, target=None):
+        """
+        Adds a shared entry (e.g. an industry used by many companies) or counts one more owner.
+        """
+        if self.refcounts[key] == 0:
+            self.add(key, kind, label, target)
+        self.refcounts[key] += 1
+
+    def release(self, key):
+        if self.refcounts[key] <= 1:
+            del self.refcounts[key]
+            self.remove(key)
+        else:
+            self.refcounts[key] -= 1
+
+    def prefix_words(self, prefix):
+        start = bisect.bisect_left(self.sorted_words, prefix)
+        for word in self.sorted_words[start:start + PREFIX_SCAN_LIMIT]:
+            if not word.startswith(prefix):
+                break
+            yield word
+
+    def similar_words(self, word):
+        """
+        Yields (word, similarity) for indexed words whose trigram overlap with
+        `word` reaches FUZZY_THRESHOLD.
+        """
+        query_trigrams = trigrams(word)
+        shared = Counter()
+        for trigram in query_trigrams:
+            words = self.trigram_words.get(trigram)
+            if words and len(words) <= MAX_TRIGRAM_POSTINGS:
+                shared.update(words)
+        for candidate, overlap in shared.items():
+            # Jaccard similarity; every word of length n has n + 1 trigrams
+            similarity = overlap / (len(query_trigrams) + len(candidate) + 1 - overlap)
+            if similarity >= FUZZY_THRESHOLD:
+                yield candidate, similarity
+
+    def search(self, query, limit):
+        """
+        Returns up to `limit` (kind, label, target) entries whose words start
+        with every word of `query`. If that finds too little, words within a
+        small trigram distance of the query's longest word count as matches too.
+        """
+        tokens = tokenize(query)
+        if not tokens:
+            return []
+        # Look up the most selective (longest) word; check the rest against each candidate
+        others = sorted(tokens, key=len)
+        primary = others.pop()
+
+        def matches_others(key):
+            words = self.entry_words[key]
+            return all(any(word.startswith(token) for word in words) for token in others)
+
+        scored = {}
+
+        def collect(words_with_scores):
+            for word, score in words_with_scores:
+                for key in self.postings[word]:
+                    if key not in scored and matches_others(key):
+                        scored[key] = score
+                        if len(scored) >= CANDIDATE_LIMIT:
+                            return
+
+        # bisect puts an exact match first, then longer words with the prefix
+        collect((word, 1.0 if word == primary else 0.9) for word in self.prefix_words(primary))
+        if len(scored) < limit and len(primary) >= 3:
+            collect((word, similarity * 0.8) for word, similarity in self.similar_words(primary))
+
+        best = sorted(
+            scored.items(),
+            key=lambda item: (-item[1], KIND_ORDER[self.entries[item[0]][0]], len(self.entries[item[0]][1])),
+        )[:limit]
+        return [self.entries[key] for key, _ in best]
+
+    def memory_bytes(self):
+        """
+        Approximate memory held by the index's containers and strings.
+        """
+        total = sum(sys.getsizeof(container) for container in (
+            self.entries, self.entry_words, self.refcounts, self.postings, self.sorted_words, self.trigram_words
+        ))
+        total += sum(sys.getsizeof(entry) + sys.getsizeof(entry[1]) for entry in self.entries.values())
+        total += sum(sys.getsizeof(words) for words in self.entry_words.values())
+        total += sum(sys.getsizeof(word) + sys.getsizeof(keys) for word, keys in self.postings.items())
+        total += sum(sys.getsizeof(trigram) + sys.getsizeof(words) for trigram, words in self.trigram_words.items())
+        return total
+
+# --- Loading from the database ---
+
+def company_key(user_id):
+    return ('company', user_id)
+
+def industry_key(industry):
+    return ('industry', normalize(industry.strip()))
+
+def build_index(max_entries):
+    """
+    Reads every indexed label from the database into a new PrefixIndex.
+    Pitches are loaded oldest first, so a full index evicts the oldest ones.
+    """
+    index = PrefixIndex(max_entries)
+    pitches = Pitch.objects.order_by('id').values_list('id', 'title')
+    for pitch_id, title in pitches.iterator(chunk_size=2000):
+        index.add(('pitch', pitch_id), 'pitch', title, pitch_id)
+
+    profiles = EntrepreneurProfile.objects.values_list('user_id', 'company_name', 'industry')
+    for user_id, company_name, industry in profiles.iterator(chunk_size=2000):
+        index.add(company_key(user_id), 'company', company_name)
+        if industry.strip():
+            index.acquire(industry_key(industry), 'industry', industry)
+
+    investors = User.objects.filter(user_type=2).values_list('id', 'first_name', 'last_name')
+    for user_id, first_name, last_name in investors.iterator(chunk_size=2000):
+        index.add(('investor', user_id), 'investor', f'{first_name} {last_name}')
+    return index
+
+class Autocomplete:
+    """
+    Owns the process's PrefixIndex: builds it on first use, applies model
+    changes to it and periodically rebuilds it in a background thread.
+    """
+    def __init__(self):
+        self._lock = threading.RLock()
+        # Held while building, so only one thread reads the database for the first index
+        self._build_lock = threading.Lock()
+        self._index = None
+        # Changes made while a build is running, replayed onto the new index
+        self._pending = None
+        self._built_at = 0.0
+        self._rebuilding = False
+        # user_id -> industry key, so a profile's old industry can be released
+        self._profile_industries = {}
+        self.build_seconds = None
+        self.searches = 0
+        self.search_seconds_total = 0.0
+        self.search_seconds_max = 0.0
+
+    @property
+    def max_entries(self):
+        return getattr(settings, 'AUTOCOMPLETE_MAX_ENTRIES', 100000)
+
+    def ensure_built(self):
+        if self._index is not None:
+            return
+        with self._build_lock:
+            if self._index is None:
+                self._swap_in(*self._build())
+
+    def _build(self):
+        """
+        Reads a new index from the database, without holding the lock.
+        Returns the arguments for _swap_in().
+        """
+        with self._lock:
+            self._pending = []
+        started = time.monotonic()
+        try:
+            index = build_index(self.max_entries)
+            profile_industries = {
+                user_id: industry_key(industry)
+                for user_id, industry in EntrepreneurProfile.objects.exclude(industry='').values_list('user_id', 'industry')
+                if industry.strip()
+            }
+        except Exception:
+            with self._lock:
+                self._pending = None
+            raise
+        self.build_seconds = time.monotonic() - started
+        if index.evicted:
+            logger.warning("Autocomplete index is full; %s older labels were evicted.", index.evicted)
+        return index, profile_industries
+
+    def _swap_in(self, index, profile_industries):
+        with self._lock:
+            self._index = index
+            self._profile_industries = profile_industries
+            for apply in self._pending or ():
+                apply(index)
+            self._pending = None
+            self._built_at = time.monotonic()
+            self._rebuilding = False
+
+    def _maybe_rebuild(self):
+        interval = getattr(settings, 'AUTOCOMPLETE_REBUILD_INTERVAL', 600)
+        with self._lock:
+            if not interval or self._rebuilding or time.monotonic() - self._built_at < interval:
+                return
+            self._rebuilding = True
+        threading.Thread(target=self._rebuild, name='autocomplete-rebuild', daemon=True).start()
+
+    def _rebuild(self):
+        from django.db import connection
+        try:
+            self._swap_in(*self._build())
+        except Exception:
+            logger.exception("Rebuilding the autocomplete index failed.")
+            with self._lock:
+                self._rebuilding = False
+                self._built_at = time.monotonic()
+        finally:
+            connection.close()
+
+    def search(self, query, limit=8):
+        self.ensure_built()
+        self._maybe_rebuild()
+        started = time.monotonic()
+        with self._lock:
+            results = self._index.search(query, limit)
+            elapsed = time.monotonic() - started
+            self.searches += 1
+            self.search_seconds_total += elapsed
+            self.search_seconds_max = max(self.search_seconds_max, elapsed)
+        return results
+
+    # --- Updates from signals (no-ops until the index has been built) ---
+
+    def update(self, apply):
+        with self._lock:
+            if self._index is not None:
+                apply(self._index)
+            if self._pending is not None:
+                self._pending.append(apply)
+
+    def pitch_saved(self, pitch):
+        self.update(lambda index: index.add(('pitch', pitch.id), 'pitch', pitch.title, pitch.id))
+
+    def pitch_deleted(self, pitch_id):
+        self.update(lambda index: index.remove(('pitch', pitch_id)))
+
+    def profile_saved(self, user_id, company_name, industry):
+        def apply(index):
+            index.add(company_key(user_id), 'company', company_name)
+            new_key = industry_key(industry) if industry.strip() else None
+            old_key = self._profile_industries.get(user_id)
+            if new_key != old_key:
+                if old_key:
+                    index.release(old_key)
+                    del self._profile_industries[user_id]
+                if new_key:
+                    index.acquire(new_key, 'industry', industry)
+                    self._profile_industries[user_id] = new_key
+        self.update(apply)
+
+    def profile_deleted(self, user_id):
+        def apply(index):
+            index.remove(company_key(user_id))
+            old_key = self._profile_industries.pop(user_id, None)
+            if old_key:
+                index.release(old_key)
+        self.update(apply)
+
+    def investor_saved(self, user):
+        def apply(index):
+            if user.user_type == 2:
+                index.add(('investor', user.id), 'investor', f'{user.first_name} {user.last_name}')
+            else:
+                index.remove(('investor', user.id))
+        self.update(apply)
+
+    def investor_deleted(self, user_id):
+        self.update(lambda index: index.remove(('investor', user_id)))
+
+    def stats(self):
+        with self._lock:
+            index = self._index
+            if index is None:
+                return {'built': False}
+            return {
+                'built': True,
+                'entries': len(index.entries),
+                'max_entries': index.max_entries,
+                'evicted': index.evicted,
+                'words': len(index.postings),
+                'trigrams': len(index.trigram_words),
+                'memory_bytes': index.memory_bytes(),
+                'build_seconds': self.build_seconds,
+                'age_seconds': time.monotonic() - self._built_at,
+                'searches': self.searches,
+                'search_ms_avg': self.search_seconds_total / self.searches * 1000 if self.searches else None,
+                'search_ms_max': self.search_seconds_max * 1000,
+            }
+
+autocomplete = Autocomplete()
+
+# --- Signal handlers ---
+# Applied on commit, so a rolled back change never reaches the index.
+
+@receiver(post_save, sender=Pitch)
+def pitch_saved(sender, instance, **kwargs):
+    transaction.on_commit(lambda: autocomplete.pitch_saved(instance))
+
+# Deleting clears instance.pk before on_commit runs, so the ids are read right away
+
+@receiver(post_delete, sender=Pitch)
+def pitch_deleted(sender, instance, **kwargs):
+    pitch_id = instance.id
+    transaction.on_commit(lambda: autocomplete.pitch_deleted(pitch_id))
+
+@receiver(post_save, sender=EntrepreneurProfile)
+def profile_saved(sender, instance, **kwargs):
+    user_id, company_name, industry = instance.user_id, instance.company_name, instance.industry
+    transaction.on_commit(lambda: autocomplete.profile_saved(user_id, company_name, industry))
+
+@receiver(post_delete, sender=EntrepreneurProfile)
+def profile_deleted(sender, instance, **kwargs):
+    user_id = instance.user_id
+    transaction.on_commit(lambda: autocomplete.profile_deleted(user_id))
+
+@receiver(post_save, sender=User)
+def user_saved(sender, instance, **kwargs):
+    transaction.on_commit(lambda: autocomplete.investor_saved(instance))
+
+@receiver(post_delete, sender=User)
+def user_deleted(sender, instance, **kwargs):
+    user_id = instance.id
+    transaction.on_commit(lambda: autocomplete.investor_deleted(user_id))
+
+# --- Views ---
+
+def result_url(kind, label, target):
+    if kind == 'pitch':
+        return reverse('pitch_detail', args=[target])
+    return reverse('search_results') + '?' + urlencode({'q': label})
+
+def autocomplete_view(request):
+    """
+    Suggestions for the search box as JSON: {'results': [{'kind', 'label', 'url'}]}.
+    """
+    results = autocomplete.search(request.GET.get('q', '')[:100])
+    return JsonResponse({
+        'results': [
+            {'kind': kind, 'label': label, 'url': result_url(kind, label, target)}
+            for kind, label, target in results
+        ]
+    })
+
+@staff_member_required
+def autocomplete_stats_view(request):
+    """
+    Index size, memory use and search latency, for monitoring.
+    """
+    return JsonResponse(autocomplete.stats())
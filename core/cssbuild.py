@@ -0,0 +1,444 @@
+# This file generates the site's utility stylesheet at build time.
+#
+# It replaces the in-browser Tailwind CDN compiler: the templates and scripts
+# are scanned for the Tailwind-style utility classes they actually use, and
+# only those rules (plus a small base reset and the self-hosted font faces)
+# are written to one static CSS file. Nothing is fetched from the network.
+#
+# Only the subset of Tailwind the project uses is implemented. Unknown class
+# names are skipped (most are our own classes from custom.css).
+
+import re
+from pathlib import Path
+
+# --- Theme (Tailwind v3 defaults) ---
+
+COLORS = {
+    'white': '#ffffff',
+    'black': '#000000',
+    'transparent': 'transparent',
+    'current': 'currentColor',
+}
+
+PALETTE = {
+    'slate': ['#f8fafc', '#f1f5f9', '#e2e8f0', '#cbd5e1', '#94a3b8', '#64748b', '#475569', '#334155', '#1e293b', '#0f172a'],
+    'gray': ['#f9fafb', '#f3f4f6', '#e5e7eb', '#d1d5db', '#9ca3af', '#6b7280', '#4b5563', '#374151', '#1f2937', '#111827'],
+    'red': ['#fef2f2', '#fee2e2', '#fecaca', '#fca5a5', '#f87171', '#ef4444', '#dc2626', '#b91c1c', '#991b1b', '#7f1d1d'],
+    'yellow': ['#fefce8', '#fef9c3', '#fef08a', '#fde047', '#facc15', '#eab308', '#ca8a04', '#a16207', '#854d0e', '#713f12'],
+    'green': ['#f0fdf4', '#dcfce7', '#bbf7d0', '#86efac', '#4ade80', '#22c55e', '#16a34a', '#15803d', '#166534', '#14532d'],
+    'blue': ['#eff6ff', '#dbeafe', '#bfdbfe', '#93c5fd', '#60a5fa', '#3b82f6', '#2563eb', '#1d4ed8', '#1e40af', '#1e3a8a'],
+    'indigo': ['#eef2ff', '#e0e7ff', '#c7d2fe', '#a5b4fc', '#818cf8', '#6366f1', '#4f46e5', '#4338ca', '#3730a3', '#312e81'],
+}
+for _name, _shades in PALETTE.items():
+    for _shade, _hex in zip([50, 100, 200, 300, 400, 500, 600, 700, 800, 900], _shades):
+        COLORS[f'{_name}-{_shade}'] = _hex
+
+FONT_SIZES = {
+    'xs': ('0.75rem', '1rem'),
+    'sm': ('0.875rem', '1.25rem'),
+    'base': ('1rem', '1.5rem'),
+    'lg': ('1.125rem', '1.75rem'),
+    'xl': ('1.25rem', '1.75rem'),
+    '2xl': ('1.5rem', '2rem'),
+    '3xl': ('1.875rem', '2.25rem'),
+    '4xl': ('2.25rem', '2.5rem'),
+    '5xl': ('3rem', '1'),
+    '6xl': ('3.75rem', '1'),
+}
+
+FONT_WEIGHTS = {'normal': '400', 'medium': '500', 'semibold': '600', 'bold': '700', 'extrabold': '800'}
+
+# The site font (see custom.css), self-hosted from static/fonts/
+WEB_FONT_FAMILY = 'Poppins'
+WEB_FONT_WEIGHTS = (400, 600, 700)
+
+SANS_STACK = 'ui-sans-serif, system-ui, sans-serif, "Apple Color Emoji", "Segoe UI Emoji", "Segoe UI Symbol", "Noto Color Emoji"'
+
+MAX_WIDTHS = {
+    'xs': '20rem', 'sm': '24rem', 'md': '28rem', 'lg': '32rem', 'xl': '36rem', '2xl': '42rem',
+    '3xl': '48rem', '4xl': '56rem', '5xl': '64rem', '6xl': '72rem', '7xl': '80rem', 'none': 'none', 'full': '100%',
+}
+
+SHADOWS = {
+    '': '0 1px 3px 0 rgb(0 0 0 / 0.1), 0 1px 2px -1px rgb(0 0 0 / 0.1)',
+    'sm': '0 1px 2px 0 rgb(0 0 0 / 0.05)',
+    'md': '0 4px 6px -1px rgb(0 0 0 / 0.1), 0 2px 4px -2px rgb(0 0 0 / 0.1)',
+    'lg': '0 10px 15px -3px rgb(0 0 0 / 0.1), 0 4px 6px -4px rgb(0 0 0 / 0.1)',
+    'xl': '0 20px 25px -5px rgb(0 0 0 / 0.1), 0 8px 10px -6px rgb(0 0 0 / 0.1)',
+    'none': '0 0 #0000',
+}
+
+RADII = {'': '0.25rem', 'none': '0px', 'sm': '0.125rem', 'md': '0.375rem', 'lg': '0.5rem', 'xl': '0.75rem', 'full': '9999px'}
+
+TRANSITIONS = {
+    '': 'color, background-color, border-color, text-decoration-color, fill, stroke, opacity, box-shadow, transform, filter',
+    'all': 'all',
+    'colors': 'color, background-color, border-color, text-decoration-color, fill, stroke',
+    'opacity': 'opacity',
+    'shadow': 'box-shadow',
+    'transform': 'transform',
+}
+
+# Breakpoints in the order their media queries must appear
+SCREENS = {'sm': '640px', 'md': '768px', 'lg': '1024px', 'xl': '1280px'}
+STATES = {'hover': ':hover', 'focus': ':focus'}
+
+TRANSFORM = (
+    'translate(var(--tw-translate-x, 0), var(--tw-translate-y, 0)) '
+    'scale(var(--tw-scale-x, 1), var(--tw-scale-y, 1))'
+)
+
+# --- Utilities ---
+
+def spacing(value):
+    """
+    Tailwind's spacing scale: 1 unit = 0.25rem.
+    """
+    if value == 'px':
+        return '1px'
+    if value == '0':
+        return '0px'
+    if re.fullmatch(r'\d+(\.5)?', value):
+        return f'{float(value) * 0.25:g}rem'
+    return None
+
+def fraction(value):
+    if value == 'full':
+        return '100%'
+    match = re.fullmatch(r'(\d+)/(\d+)', value)
+    if match:
+        return f'{int(match.group(1)) / int(match.group(2)) * 100:g}%'
+    return None
+
+# Static utilities: class name -> declarations
+STATIC = {
+    'sr-only': 'position: absolute; width: 1px; height: 1px; padding: 0; margin: -1px; overflow: hidden; clip: rect(0, 0, 0, 0); white-space: nowrap; border-width: 0',
+    'static': 'position: static', 'fixed': 'position: fixed', 'absolute': 'position: absolute',
+    'relative': 'position: relative', 'sticky': 'position: sticky',
+    'block': 'display: block', 'inline-block': 'display: inline-block', 'inline': 'display: inline',
+    'flex': 'display: flex', 'inline-flex': 'display: inline-flex', 'grid': 'display: grid', 'hidden': 'display: none',
+    'flex-row': 'flex-direction: row', 'flex-row-reverse': 'flex-direction: row-reverse',
+    'flex-col': 'flex-direction: column', 'flex-wrap': 'flex-wrap: wrap',
+    'flex-grow': 'flex-grow: 1', 'grow': 'flex-grow: 1', 'flex-shrink-0': 'flex-shrink: 0', 'shrink-0': 'flex-shrink: 0',
+    'items-start': 'align-items: flex-start', 'items-end': 'align-items: flex-end',
+    'items-center': 'align-items: center', 'items-stretch': 'align-items: stretch',
+    'justify-start': 'justify-content: flex-start', 'justify-end': 'justify-content: flex-end',
+    'justify-center': 'justify-content: center', 'justify-between': 'justify-content: space-between',
+    'overflow-hidden': 'overflow: hidden', 'overflow-auto': 'overflow: auto', 'overflow-y-auto': 'overflow-y: auto',
+    'object-cover': 'object-fit: cover', 'object-contain': 'object-fit: contain',
+    'appearance-none': 'appearance: none',
+    'list-decimal': 'list-style-type: decimal', 'list-disc': 'list-style-type: disc',
+    'w-full': 'width: 100%', 'w-auto': 'width: auto', 'h-full': 'height: 100%', 'h-auto': 'height: auto',
+    'min-h-screen': 'min-height: 100vh',
+    'mx-auto': 'margin-left: auto; margin-right: auto', 'mt-auto': 'margin-top: auto',
+    'italic': 'font-style: italic', 'uppercase': 'text-transform: uppercase',
+    'underline': 'text-decoration-line: underline',
+    'text-left': 'text-align: left', 'text-center': 'text-align: center', 'text-right': 'text-align: right',
+    'font-sans': f'font-family: {SANS_STACK}',
+    'leading-tight': 'line-height: 1.25', 'leading-normal': 'line-height: 1.5', 'leading-relaxed': 'line-height: 1.625',
+    'tracking-wide': 'letter-spacing: 0.025em', 'tracking-wider': 'letter-spacing: 0.05em',
+    'border': 'border-width: 1px', 'border-0': 'border-width: 0px',
+    'border-t': 'border-top-width: 1px', 'border-b': 'border-bottom-width: 1px',
+    'border-l': 'border-left-width: 1px', 'border-r': 'border-right-width: 1px',
+    'rounded-l-full': 'border-top-left-radius: 9999px; border-bottom-left-radius: 9999px',
+    'rounded-r-full': 'border-top-right-radius: 9999px; border-bottom-right-radius: 9999px',
+    'outline-none': 'outline: 2px solid transparent; outline-offset: 2px',
+    'transform': f'transform: {TRANSFORM}',
+}
+
+# Order of utility groups in the output, so later groups win ties the way they do in Tailwind
+GROUPS = [
+    'layout', 'position', 'spacing', 'display', 'sizing', 'flex', 'grid', 'space',
+    'overflow', 'border', 'background', 'typography', 'effects', 'transform', 'transition',
+]
+
+STATIC_GROUPS = {
+    'sr-only': 'layout',
+    'static': 'position', 'fixed': 'position', 'absolute': 'position', 'relative': 'position', 'sticky': 'position',
+    'mx-auto': 'spacing', 'mt-auto': 'spacing',
+    'w-full': 'sizing', 'w-auto': 'sizing', 'h-full': 'sizing', 'h-auto': 'sizing', 'min-h-screen': 'sizing',
+    'overflow-hidden': 'overflow', 'overflow-auto': 'overflow', 'overflow-y-auto': 'overflow',
+    'object-cover': 'layout', 'object-contain': 'layout', 'appearance-none': 'layout',
+    'transform': 'transform', 'outline-none': 'effects',
+}
+
+def _static_group(name):
+    if name in STATIC_GROUPS:
+        return STATIC_GROUPS[name]
+    if STATIC[name].startswith('display'):
+        return 'display'
+    if name.startswith(('flex', 'grow', 'shrink', 'items-', 'justify-')):
+        return 'flex'
+    if name.startswith(('border', 'rounded')):
+        return 'border'
+    return 'typography'
+
+def utility(name):
+    """
+    Returns (group, declarations, selector_suffix) for a utility class name without
+    variants, or None if it isn't a utility we support.
+    """
+    if name in STATIC:
+        return _static_group(name), STATIC[name], ''
+
+    negative = name.startswith('-')
+    base = name[1:] if negative else name
+    sign = '-' if negative else ''
+
+    # Spacing: margin, padding, gap, space-between
+    match = re.fullmatch(r'(m|mx|my|mt|mb|ml|mr|p|px|py|pt|pb|pl|pr)-(.+)', base)
+    if match and spacing(match.group(2)):
+        value = sign + spacing(match.group(2))
+        prop = 'margin' if match.group(1)[0] == 'm' else 'padding'
+        sides = {
+            '': [''], 'x': ['-left', '-right'], 'y': ['-top', '-bottom'],
+            't': ['-top'], 'b': ['-bottom'], 'l': ['-left'], 'r': ['-right'],
+        }[match.group(1)[1:]]
+        return 'spacing', '; '.join(f'{prop}{side}: {value}' for side in sides), ''
+
+    match = re.fullmatch(r'gap-(.+)', base)
+    if match and spacing(match.group(1)):
+        return 'flex', f'gap: {spacing(match.group(1))}', ''
+
+    match = re.fullmatch(r'space-(x|y)-(.+)', base)
+    if match and spacing(match.group(2)):
+        side = 'left' if match.group(1) == 'x' else 'top'
+        return 'space', f'margin-{side}: {sign}{spacing(match.group(2))}', ' > :not([hidden]) ~ :not([hidden])'
+
+    # Positioning
+    match = re.fullmatch(r'(top|right|bottom|left)-(.+)', base)
+    if match and (spacing(match.group(2)) or fraction(match.group(2))):
+        return 'position', f'{match.group(1)}: {sign}{spacing(match.group(2)) or fraction(match.group(2))}', ''
+
+    match = re.fullmatch(r'z-(\d+)', base)
+    if match:
+        return 'position', f'z-index: {match.group(1)}', ''
+
+    # Sizing
+    match = re.fullmatch(r'(w|h)-(.+)', base)
+    if match:
+        value = spacing(match.group(2)) or fraction(match.group(2))
+        if value:
+            return 'sizing', f"{'width' if match.group(1) == 'w' else 'height'}: {value}", ''
+
+    match = re.fullmatch(r'max-h-(.+)', base)
+    if match and spacing(match.group(1)):
+        return 'sizing', f'max-height: {spacing(match.group(1))}', ''
+
+    match = re.fullmatch(r'max-w-(.+)', base)
+    if match and match.group(1) in MAX_WIDTHS:
+        return 'sizing', f'max-width: {MAX_WIDTHS[match.group(1)]}', ''
+
+    # Grid
+    match = re.fullmatch(r'grid-cols-(\d+)', base)
+    if match:
+        return 'grid', f'grid-template-columns: repeat({match.group(1)}, minmax(0, 1fr))', ''
+
+    match = re.fullmatch(r'col-span-(\d+)', base)
+    if match:
+        return 'grid', f'grid-column: span {match.group(1)} / span {match.group(1)}', ''
+
+    # Borders
+    match = re.fullmatch(r'border-(t|b|l|r)-(\d+)', base)
+    if match:
+        side = {'t': 'top', 'b': 'bottom', 'l': 'left', 'r': 'right'}[match.group(1)]
+        return 'border', f'border-{side}-width: {match.group(2)}px', ''
+
+    match = re.fullmatch(r'border-(\d+)', base)
+    if match:
+        return 'border', f'border-width: {match.group(1)}px', ''
+
+    match = re.fullmatch(r'rounded(?:-(.+))?', base)
+    if match and (match.group(1) or '') in RADII:
+        return 'border', f"border-radius: {RADII[match.group(1) or '']}", ''
+
+    # Colors
+    for prefix, prop, group in (('bg-', 'background-color', 'background'), ('text-', 'color', 'typography'),
+                                ('border-', 'border-color', 'border'), ('ring-', '--tw-ring-color', 'effects')):
+        if base.startswith(prefix) and base[len(prefix):] in COLORS:
+            return group, f'{prop}: {COLORS[base[len(prefix):]]}', ''
+
+    # Typography
+    match = re.fullmatch(r'text-(.+)', base)
+    if match and match.group(1) in FONT_SIZES:
+        size, line_height = FONT_SIZES[match.group(1)]
+        return 'typography', f'font-size: {size}; line-height: {line_height}', ''
+
+    match = re.fullmatch(r'font-(.+)', base)
+    if match and match.group(1) in FONT_WEIGHTS:
+        return 'typography', f'font-weight: {FONT_WEIGHTS[match.group(1)]}', ''
+
+    # Effects
+    match = re.fullmatch(r'shadow(?:-(.+))?', base)
+    if match and (match.group(1) or '') in SHADOWS:
+        return 'effects', (
+            f"--tw-shadow: {SHADOWS[match.group(1) or '']}; "
+            'box-shadow: var(--tw-ring-shadow, 0 0 #0000), var(--tw-shadow)'
+        ), ''
+
+    match = re.fullmatch(r'ring(?:-(\d+))?', base)
+    if match:
+        width = match.group(1) or '3'
+        return 'effects', (
+            f'--tw-ring-shadow: 0 0 0 {width}px var(--tw-ring-color, rgb(59 130 246 / 0.5)); '
+            'box-shadow: var(--tw-ring-shadow), var(--tw-shadow, 0 0 #0000)'
+        ), ''
+
+    match = re.fullmatch(r'opacity-(\d+)', base)
+    if match:
+        return 'effects', f'opacity: {int(match.group(1)) / 100:g}', ''
+
+    # Transforms
+    match = re.fullmatch(r'translate-(x|y)-(.+)', base)
+    if match and spacing(match.group(2)):
+        return 'transform', f'--tw-translate-{match.group(1)}: {sign}{spacing(match.group(2))}; transform: {TRANSFORM}', ''
+
+    match = re.fullmatch(r'scale-(\d+)', base)
+    if match:
+        scale = f'{int(match.group(1)) / 100:g}'
+        return 'transform', f'--tw-scale-x: {scale}; --tw-scale-y: {scale}; transform: {TRANSFORM}', ''
+
+    # Transitions
+    match = re.fullmatch(r'transition(?:-(.+))?', base)
+    if match and (match.group(1) or '') in TRANSITIONS:
+        return 'transition', (
+            f"transition-property: {TRANSITIONS[match.group(1) or '']}; "
+            'transition-timing-function: cubic-bezier(0.4, 0, 0.2, 1); transition-duration: 150ms'
+        ), ''
+
+    match = re.fullmatch(r'duration-(\d+)', base)
+    if match:
+        return 'transition', f'transition-duration: {match.group(1)}ms', ''
+
+    return None
+
+# --- Class scanning ---
+
+# Anything that could be a class name, including variant prefixes and fractions
+CANDIDATE = re.compile(r'[A-Za-z0-9:_\-/.]+')
+
+def scan(paths):
+    """
+    Returns every token in the given files that might be a class name. Like
+    Tailwind's content scanner this over-collects; unknown tokens are dropped later.
+    """
+    candidates = set()
+    for path in paths:
+        candidates.update(CANDIDATE.findall(Path(path).read_text(encoding='utf-8')))
+    return candidates
+
+def escape(class_name):
+    return re.sub(r'([:/.])', r'\\\1', class_name)
+
+def build_rule(class_name):
+    """
+    Returns (screen, group_index, css) for a class name with optional variants
+    (e.g. 'md:hover:bg-blue-600'), or None.
+    """
+    *variants, name = class_name.split(':')
+    screen = None
+    states = ''
+    for variant in variants:
+        if variant in SCREENS and screen is None:
+            screen = variant
+        elif variant in STATES:
+            states += STATES[variant]
+        else:
+            return None
+
+    result = utility(name)
+    if result is None:
+        return None
+    group, declarations, suffix = result
+    selector = f'.{escape(class_name)}{states}{suffix}'
+    return screen, GROUPS.index(group), f'{selector} {{ {declarations} }}'
+
+def generate(paths, preflight='', font_faces=''):
+    """
+    Builds the stylesheet for the utilities used in `paths`.
+    Returns (css, used_class_names).
+    """
+    rules = {}
+    for candidate in scan(paths):
+        rule = build_rule(candidate)
+        if rule:
+            rules[candidate] = rule
+
+    sections = [font_faces, preflight]
+    base = sorted((r for r in rules.items() if r[1][0] is None), key=lambda item: (item[1][1], item[0]))
+    sections.append('\n'.join(css for _, (_, _, css) in base))
+    for screen, width in SCREENS.items():
+        responsive = sorted((r for r in rules.items() if r[1][0] == screen), key=lambda item: (item[1][1], item[0]))
+        if responsive:
+            body = '\n'.join(f'  {css}' for _, (_, _, css) in responsive)
+            sections.append(f'@media (min-width: {width}) {{\n{body}\n}}')
+
+    css = '\n\n'.join(section for section in sections if section) + '\n'
+    return css, sorted(rules)
+
+# --- Base styles ---
+
+# A condensed version of Tailwind's Preflight reset, which the CDN build injected
+PREFLIGHT = f"""*, ::before, ::after {{ box-sizing: border-box; border-width: 0; border-style: solid; border-color: #e5e7eb; }}
+html {{ line-height: 1.5; -webkit-text-size-adjust: 100%; tab-size: 4; font-family: {SANS_STACK}; }}
+body {{ margin: 0; line-height: inherit; }}
+hr {{ height: 0; color: inherit; border-top-width: 1px; }}
+h1, h2, h3, h4, h5, h6 {{ font-size: inherit; font-weight: inherit; }}
+a {{ color: inherit; text-decoration: inherit; }}
+b, strong {{ font-weight: bolder; }}
+small {{ font-size: 80%; }}
+table {{ text-indent: 0; border-color: inherit; border-collapse: collapse; }}
+button, input, optgroup, select, textarea {{ font-family: inherit; font-size: 100%; font-weight: inherit; line-height: inherit; color: inherit; margin: 0; padding: 0; }}
+button, select {{ text-transform: none; }}
+button, [type='button'], [type='reset'], [type='submit'] {{ -webkit-appearance: button; background-color: transparent; background-image: none; }}
+blockquote, dl, dd, h1, h2, h3, h4, h5, h6, hr, figure, p, pre {{ margin: 0; }}
+fieldset {{ margin: 0; padding: 0; }}
+ol, ul, menu {{ list-style: none; margin: 0; padding: 0; }}
+textarea {{ resize: vertical; }}
+input::placeholder, textarea::placeholder {{ opacity: 1; color: #9ca3af; }}
+button, [role="button"] {{ cursor: pointer; }}
+:disabled {{ cursor: default; }}
+img, svg, video, canvas, audio, iframe, embed, object {{ display: block; vertical-align: middle; }}
+img, video {{ max-width: 100%; height: auto; }}
+[hidden] {{ display: none; }}"""
+
+def font_files(family, weights):
+    """
+    {weight: woff2 filename} for the self-hosted faces of `family`.
+    """
+    slug = family.lower().replace(' ', '-')
+    return {weight: f'{slug}-latin-{weight}-normal.woff2' for weight in weights}
+
+def missing_font_weights(family, weights, font_dir):
+    return [weight for weight, filename in font_files(family, weights).items() if not (Path(font_dir) / filename).exists()]
+
+def font_faces(family, weights, font_dir, url_prefix):
+    """
+    @font-face rules for a self-hosted font. Each face prefers a locally
+    installed copy and otherwise loads the woff2 file from our static files.
+    Weights whose file is missing get no rule, so that the Google Fonts
+    stylesheet base.html links for them (see google_fonts_url) is not
+    overridden by a face that can only be found locally.
+    Returns (css, missing_files).
+    """
+    rules = []
+    missing = []
+    for weight, filename in font_files(family, weights).items():
+        if not (Path(font_dir) / filename).exists():
+            missing.append(filename)
+            continue
+        rules.append(
+            f"@font-face {{ font-family: '{family}'; font-style: normal; font-weight: {weight}; "
+            f"font-display: swap; src: local('{family}'), url('{url_prefix}{filename}') format('woff2'); }}"
+        )
+    return '\n'.join(rules), missing
+
+def google_fonts_url(family, weights):
+    """
+    The Google Fonts stylesheet for the given weights of `family`, used until
+    their woff2 files are added to static/fonts/.
+    """
+    return (
+        f"https://fonts.googleapis.com/css2?family={family.replace(' ', '+')}"
+        f":wght@{';'.join(str(weight) for weight in sorted(weights))}&display=swap"
+    )
@@ -0,0 +1,141 @@
+# This file builds and sends the daily activity digest e-mails.
+#
+# A user's digest covers what happened since their last one (User.last_digest_at,
+# or the last DIGEST_FIRST_DAYS days for a first digest): offers, questions and
+# pitch views for entrepreneurs; answers, accepted offers and matching pitches
+# for investors; new chat messages for both. Users without activity get no
+# e-mail.
+#
+# Users are taken in chunks of DIGEST_CHUNK_SIZE consecutive ids. For a chunk,
+# each kind of activity is counted for all of its users by one grouped query,
+# which compares every row's time with its recipient's last_digest_at in SQL.
+# A run therefore costs a fixed number of queries per chunk and never one per
+# user. The chunk's e-mails are rendered and handed to the e-mail backend (a
+# file by default, see EMAIL_BACKEND) and the users marked as sent before the
+# next chunk is read, so memory stays flat however many users there are. An
+# interrupted run resends at most the chunk it was working on.
+#
+#   python manage.py senddigest
+
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db.models import Count, F, Q, Sum, Value
+from django.db.models.functions import Coalesce, TruncDate
+from django.template.loader import get_template
+from django.urls import reverse
+from django.utils import timezone
+
+from .models import User, Offer, Question, Answer, PitchViewStats, PitchMatch
+from chat.models import Conversation
+
+logger = logging.getLogger(__name__)
+
+# name: (rows, path to the recipient, time field, aggregates besides the count)
+ACTIVITIES = {
+    'offers': (Offer.objects.all(), 'pitch__entrepreneur', 'created_at', {'amount': Sum('amount')}),
+    'questions': (Question.objects.all(), 'pitch__entrepreneur', 'created_at', {}),
+    'answers': (Answer.objects.all(), 'question__author', 'created_at', {}),
+    # A conversation is opened when an offer is accepted
+    'accepted_offers': (Conversation.objects.all(), 'offer__investor', 'created_at', {}),
+    'matches': (PitchMatch.objects.all(), 'investor', 'created_at', {}),
+}
+
+def recipients():
+    return User.objects.filter(is_active=True).exclude(email='')
+
+def _since(recipient, first_since):
+    return Coalesce(F(f'{recipient}__last_digest_at'), Value(first_since))
+
+def count_activity(lo, hi, earliest, first_since, until):
+    """
+    Returns {user_id: {activity: counts}} for the users with ids in [lo, hi].
+    `earliest` is the oldest start among them; it bounds every query so the
+    time indexes can be used before the per-user comparison.
+    """
+    activity = {}
+
+    def add(name, rows, recipient_key):
+        for row in rows:
+            activity.setdefault(row.pop(recipient_key), {})[name] = row
+
+    for name, (rows, recipient, time_field, aggregates) in ACTIVITIES.items():
+        add(name, rows.filter(**{
+            f'{recipient}__id__range': (lo, hi),
+            f'{time_field}__gt': earliest,
+            f'{time_field}__lte': until,
+        }).filter(**{
+            f'{time_field}__gt': _since(recipient, first_since),
+        }).values(recipient).annotate(count=Count('pk'), **aggregates).order_by(), recipient)
+
+    # Views are kept per day: whole days from the last digest's day up to yesterday
+    add('views', PitchViewStats.objects.filter(
+        pitch__entrepreneur__id__range=(lo, hi),
+        date__gte=earliest.date(),
+        date__lt=until.date(),
+    ).filter(
+        date__gte=TruncDate(_since('pitch__entrepreneur', first_since)),
+    ).values('pitch__entrepreneur').annotate(count=Sum('views')).order_by(), 'pitch__entrepreneur')
+
+    # Messages from the other side of each of the user's conversations
+    Participant = Conversation.participants.through
+    add('messages', Participant.objects.filter(
+        user__id__range=(lo, hi),
+        conversation__messages__timestamp__gt=earliest,
+        conversation__messages__timestamp__lte=until,
+    ).values('user').annotate(count=Count('conversation__messages', filter=Q(
+        conversation__messages__timestamp__gt=_since('user', first_since),
+    ) & ~Q(conversation__messages__sender=F('user')))).order_by(), 'user')
+
+    return activity
+
+def build_digest(user, activity, template):
+    """
+    The digest e-mail for `user`, or None if nothing happened for them.
+    """
+    if not any(counts['count'] for counts in activity.values()):
+        return None
+    body = template.render({
+        'user': user,
+        'activity': activity,
+        'dashboard_url': settings.SITE_URL + reverse('dashboard'),
+    })
+    return EmailMessage("Your InvEnt activity digest", body, settings.DEFAULT_FROM_EMAIL, [user.email])
+
+def send_digests(chunk_size=None, until=None):
+    """
+    Sends every active user with an e-mail address their digest of activity up
+    to `until` (default: now) and returns (users processed, e-mails sent).
+    """
+    chunk_size = chunk_size or settings.DIGEST_CHUNK_SIZE
+    until = until or timezone.now()
+    first_since = until - timedelta(days=settings.DIGEST_FIRST_DAYS)
+    template = get_template('emails/digest.txt')
+    processed = sent = 0
+    last_id = 0
+    with get_connection() as mail:
+        while True:
+            users = list(
+                recipients().filter(id__gt=last_id).order_by('id')
+                .only('id', 'username', 'first_name', 'email', 'user_type', 'last_digest_at')[:chunk_size]
+            )
+            if not users:
+                break
+            lo, hi = users[0].id, users[-1].id
+            earliest = min(user.last_digest_at or first_since for user in users)
+            activity = count_activity(lo, hi, earliest, first_since, until)
+            messages = [
+                message for user in users
+                if (message := build_digest(user, activity.get(user.id, {}), template)) is not None
+            ]
+            if messages:
+                mail.send_messages(messages)
+            # The chunk is done: its next digests start here, whether or not they got one now
+            User.objects.filter(id__in=[user.id for user in users]).update(last_digest_at=until)
+            processed += len(users)
+            sent += len(messages)
+            last_id = hi
+    logger.info("Sent %s digest(s) to %s user(s).", sent, processed)
+    return processed, sent
@@ -2,9 +2,10 @@
 # Django forms handle rendering HTML form elements and validating user input.
 
 from django import forms
+from django.db import transaction
 from django.contrib.auth.forms import UserCreationForm
 from .models import User, EntrepreneurProfile, InvestorProfile
-from .models import Pitch
+from .models import Pitch, PitchContent
 from .models import Offer
 from .models import Question, Answer
 
@@ -84,15 +85,26 @@ class InvestorProfileForm(forms.ModelForm):
 class PitchForm(forms.ModelForm):
     """
     A form for entrepreneurs to create and submit a new pitch.
+    The details are saved to the pitch's PitchContent row.
     """
+    details = forms.CharField(widget=forms.Textarea(attrs={'rows': 8}), help_text="Full details of your business pitch.")
+    field_order = ('title', 'summary', 'details', 'funding_amount')
+
     class Meta:
         model = Pitch
-        fields = ('title', 'summary', 'details', 'funding_amount')
+        fields = ('title', 'summary', 'funding_amount')
         widgets = {
             'summary': forms.Textarea(attrs={'rows': 3}),
-            'details': forms.Textarea(attrs={'rows': 8}),
         }
 
+    def save(self, commit=True):
+        pitch = super().save(commit=False)
+        if commit:
+            with transaction.atomic():
+                pitch.save()
+                PitchContent.objects.update_or_create(pitch=pitch, defaults={'details': self.cleaned_data['details']})
+        return pitch
+
 # --- Offer Form ---
 class OfferForm(forms.ModelForm):
     """
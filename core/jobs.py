@@ -0,0 +1,310 @@
+# This file implements a small database-backed job queue.
+# Request handlers enqueue work with enqueue(); `manage.py runjobs` claims and runs it.
+#
+# Handlers are registered with the @job decorator in an app's tasks.py module.
+# Every app's tasks.py is imported when Django starts (see CoreConfig.ready), so
+# web processes see each handler's retry policy when they enqueue:
+#
+#     from core.jobs import job
+#
+#     @job('send_digest', max_attempts=3)
+#     def send_digest(user_id):
+#         ...
+#
+#     enqueue('send_digest', {'user_id': user.id}, dedupe_key=f'digest:{user.id}')
+#
+# A handler registered with daily_at=<hour> is also queued by the runjobs workers
+# to run once a day at that hour (see schedule_daily_jobs).
+
+import logging
+import random
+import threading
+import time
+import traceback
+from datetime import timedelta
+
+from django.db import IntegrityError, connection, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+from django.utils.module_loading import autodiscover_modules
+
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+# Retry delays grow as BACKOFF_BASE * 2 ** (attempt - 1), capped at BACKOFF_MAX (seconds)
+BACKOFF_BASE = 5
+BACKOFF_MAX = 60 * 60
+
+# --- Handler Registry ---
+
+_registry = {}
+
+class JobHandler:
+    """
+    A registered job type: the function to call, its retry policy and the hour
+    it runs at every day, if any.
+    """
+    def __init__(self, job_type, func, max_attempts, daily_at=None):
+        self.job_type = job_type
+        self.func = func
+        self.max_attempts = max_attempts
+        self.daily_at = daily_at
+
+def job(job_type, max_attempts=5, daily_at=None):
+    """
+    Decorator that registers a function as the handler for `job_type`.
+    The job's payload is passed to it as keyword arguments. With `daily_at`
+    (an hour, 0-23, in TIME_ZONE) the job is also run once a day at that hour.
+    """
+    def decorator(func):
+        _registry[job_type] = JobHandler(job_type, func, max_attempts, daily_at)
+        return func
+    return decorator
+
+def get_handler(job_type):
+    return _registry.get(job_type)
+
+def autodiscover():
+    """
+    Imports every installed app's tasks.py so their handlers get registered.
+    """
+    autodiscover_modules('tasks')
+
+# --- Enqueueing ---
+
+def enqueue(job_type, payload=None, dedupe_key=None, delay=None, max_attempts=None):
+    """
+    Adds a job to the queue and returns it.
+
+    If `dedupe_key` is given and a queued or running job already holds that key,
+    no new job is created and the existing one is returned instead.
+    The job is written in the caller's transaction, so it only becomes visible
+    to workers if that transaction commits.
+    """
+    handler = get_handler(job_type)
+    if max_attempts is None:
+        max_attempts = handler.max_attempts if handler else 5
+
+    new_job = Job(
+        job_type=job_type,
+        payload=payload or {},
+        dedupe_key=dedupe_key,
+        max_attempts=max_attempts,
+        run_after=timezone.now() + (delay or timedelta(0)),
+    )
+    if dedupe_key is None:
+        new_job.save()
+        return new_job
+
+    try:
+        # The savepoint keeps a duplicate from breaking the caller's transaction
+        with transaction.atomic():
+            new_job.save()
+        return new_job
+    except IntegrityError:
+        existing = Job.objects.filter(dedupe_key=dedupe_key, status__in=['queued', 'running']).first()
+        if existing is None:
+            raise
+        return existing
+
+# --- Daily Schedule ---
+
+def next_daily_run(hour, now):
+    """
+    The first time after `now` that it is `hour` o'clock in the current time zone.
+    """
+    now = timezone.localtime(now)
+    run_at = now.replace(hour=hour, minute=0, second=0, microsecond=0)
+    if run_at <= now:
+        run_at += timedelta(days=1)
+    return run_at
+
+def schedule_daily_jobs():
+    """
+    Queues the next run of every job registered with `daily_at`, delayed until
+    its hour. The dedupe key names the day of the run, so however many workers
+    call this (runjobs does on every sweep), each day's run is queued once.
+    Returns the queued jobs.
+    """
+    now = timezone.now()
+    scheduled = []
+    for handler in _registry.values():
+        if handler.daily_at is None:
+            continue
+        run_at = next_daily_run(handler.daily_at, now)
+        scheduled.append(enqueue(
+            handler.job_type,
+            dedupe_key=f'daily:{handler.job_type}:{run_at.date().isoformat()}',
+            delay=run_at - now,
+        ))
+    return scheduled
+
+# --- Claiming and Running ---
+
+def claim_jobs(limit=1, job_types=None):
+    """
+    Marks up to `limit` due jobs as running and returns them.
+
+    On databases with SKIP LOCKED (Postgres) concurrent workers lock disjoint
+    rows and never wait on each other. Elsewhere (SQLite) each candidate is
+    claimed with a conditional UPDATE, so a row another worker already took is
+    simply skipped.
+    """
+    now = timezone.now()
+    candidates = Job.objects.filter(status='queued', run_after__lte=now).order_by('run_after', 'id')
+    if job_types:
+        candidates = candidates.filter(job_type__in=job_types)
+
+    claimed = []
+    if connection.features.has_select_for_update_skip_locked:
+        with transaction.atomic():
+            jobs = list(candidates.select_for_update(skip_locked=True)[:limit])
+            if jobs:
+                Job.objects.filter(id__in=[j.id for j in jobs]).update(
+                    status='running', started_at=now, heartbeat_at=now, attempts=F('attempts') + 1
+                )
+            claimed = jobs
+    else:
+        for candidate in candidates[:limit]:
+            updated = Job.objects.filter(id=candidate.id, status='queued').update(
+                status='running', started_at=now, heartbeat_at=now, attempts=F('attempts') + 1
+            )
+            if updated:
+                claimed.append(candidate)
+
+    for claimed_job in claimed:
+        claimed_job.status = 'running'
+        claimed_job.started_at = now
+        claimed_job.attempts += 1
+    return claimed
+
+def retry_delay(attempts):
+    """
+    Exponential backoff with jitter for a job that has failed `attempts` times.
+    """
+    delay = min(BACKOFF_BASE * 2 ** (attempts - 1), BACKOFF_MAX)
+    return timedelta(seconds=delay * random.uniform(0.8, 1.2))
+
+def run_job(claimed_job, metrics=None):
+    """
+    Runs one claimed job and records the outcome.
+    Failed jobs are re-queued with backoff until they run out of attempts.
+    Returns True if the job succeeded.
+    """
+    handler = get_handler(claimed_job.job_type)
+    started = time.monotonic()
+    try:
+        if handler is None:
+            raise LookupError(f"No handler registered for job type '{claimed_job.job_type}'.")
+        handler.func(**claimed_job.payload)
+    except Exception:
+        error = traceback.format_exc()
+        duration = time.monotonic() - started
+        if claimed_job.attempts < claimed_job.max_attempts and handler is not None:
+            Job.objects.filter(id=claimed_job.id).update(
+                status='queued',
+                run_after=timezone.now() + retry_delay(claimed_job.attempts),
+                last_error=error,
+            )
+            logger.warning("Job %s failed (attempt %s/%s), will retry.", claimed_job, claimed_job.attempts, claimed_job.max_attempts)
+        else:
+            Job.objects.filter(id=claimed_job.id).update(
+                status='failed', finished_at=timezone.now(), last_error=error
+            )
+            logger.error("Job %s failed permanently:\n%s", claimed_job, error)
+        if metrics:
+            metrics.record(claimed_job, duration, succeeded=False)
+        return False
+
+    duration = time.monotonic() - started
+    Job.objects.filter(id=claimed_job.id).update(status='done', finished_at=timezone.now(), last_error='')
+    if metrics:
+        metrics.record(claimed_job, duration, succeeded=True)
+    return True
+
+def heartbeat(job_ids):
+    """
+    Records that the jobs in `job_ids` are still being worked on. Workers call
+    this more often than the stale timeout, so requeue_stale_jobs() leaves them
+    alone however long they run.
+    """
+    if job_ids:
+        Job.objects.filter(id__in=job_ids, status='running').update(heartbeat_at=timezone.now())
+
+def requeue_stale_jobs(timeout):
+    """
+    Recovers jobs whose worker died: 'running' jobs without a heartbeat for
+    longer than `timeout` (a timedelta). Jobs with attempts left are re-queued
+    with backoff like any failure; the others are marked failed.
+    Returns (re-queued, failed).
+    """
+    now = timezone.now()
+    cutoff = now - timeout
+    # Jobs claimed by workers from before heartbeats count from when they started
+    stale = Job.objects.filter(
+        Q(heartbeat_at__lt=cutoff) | Q(heartbeat_at__isnull=True, started_at__lt=cutoff), status='running'
+    )
+    error = f"The worker stopped responding (no heartbeat for {timeout})."
+    requeued = failed = 0
+    for stale_job in stale.only('id', 'attempts', 'max_attempts'):
+        # Conditional updates, so a job that just finished or was recovered by another worker is left alone
+        rows = stale.filter(id=stale_job.id)
+        if stale_job.attempts < stale_job.max_attempts:
+            requeued += rows.update(status='queued', run_after=now + retry_delay(stale_job.attempts), last_error=error)
+        else:
+            failed += rows.update(status='failed', finished_at=now, last_error=error)
+    if requeued or failed:
+        logger.warning("Recovered stale jobs: %s re-queued, %s failed.", requeued, failed)
+    return requeued, failed
+
+# --- Metrics ---
+
+class JobMetrics:
+    """
+    Thread-safe per-job-type counters and latencies for a worker process.
+    `run_seconds` is how long the handler took; `wait_seconds` is how long the
+    job sat in the queue after it became due.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats = {}
+
+    def record(self, claimed_job, duration, succeeded):
+        wait = max((claimed_job.started_at - claimed_job.run_after).total_seconds(), 0)
+        with self._lock:
+            stats = self._stats.setdefault(claimed_job.job_type, {
+                'succeeded': 0, 'failed': 0,
+                'run_seconds_total': 0.0, 'run_seconds_max': 0.0,
+                'wait_seconds_total': 0.0, 'wait_seconds_max': 0.0,
+            })
+            stats['succeeded' if succeeded else 'failed'] += 1
+            stats['run_seconds_total'] += duration
+            stats['run_seconds_max'] = max(stats['run_seconds_max'], duration)
+            stats['wait_seconds_total'] += wait
+            stats['wait_seconds_max'] = max(stats['wait_seconds_max'], wait)
+
+    def snapshot(self):
+        """
+        Returns {job_type: stats} including average run and wait times.
+        """
+        with self._lock:
+            result = {}
+            for job_type, stats in self._stats.items():
+                count = stats['succeeded'] + stats['failed']
+                result[job_type] = dict(
+                    stats,
+                    run_seconds_avg=stats['run_seconds_total'] / count,
+                    wait_seconds_avg=stats['wait_seconds_total'] / count,
+                )
+            return result
+
+# --- Built-in jobs ---
+
+@job('purge_finished_jobs', max_attempts=1)
+def purge_finished_jobs(days=7):
+    """
+    Deletes finished and failed jobs older than `days` days.
+    """
+    cutoff = timezone.now() - timedelta(days=days)
+    Job.objects.filter(status__in=['done', 'failed'], finished_at__lt=cutoff).delete()
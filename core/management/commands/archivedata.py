@@ -0,0 +1,31 @@
+# Moves rejected offers, stale pitches and old chat messages to the archive
+# tables (see core/archive.py). Meant to run from cron; safe to interrupt.
+#
+#   python manage.py archivedata
+#   python manage.py archivedata --only messages --batch-size 5000 --max-batches 20
+#   python manage.py archivedata --dry-run
+
+from django.core.management.base import BaseCommand
+
+from core import archive
+
+
+class Command(BaseCommand):
+    help = "Moves cold rows from the hot tables to the archive tables."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--only', action='append', dest='kinds', choices=list(archive.ARCHIVERS), help="Only archive this kind of row (repeatable).")
+        parser.add_argument('--batch-size', type=int, default=1000, help="Rows moved per transaction.")
+        parser.add_argument('--max-batches', type=int, help="Stop after this many batches per kind.")
+        parser.add_argument('--dry-run', action='store_true', help="Only count the rows that would be archived.")
+
+    def handle(self, *args, **options):
+        for kind, archiver_class in archive.ARCHIVERS.items():
+            if options['kinds'] and kind not in options['kinds']:
+                continue
+            archiver = archiver_class()
+            if options['dry_run']:
+                self.stdout.write(f"{kind}: {archiver.count()} row(s) older than {archiver.cutoff:%Y-%m-%d} would be archived.")
+                continue
+            moved = archiver.run(batch_size=max(options['batch_size'], 1), max_batches=options['max_batches'])
+            self.stdout.write(self.style.SUCCESS(f"{kind}: archived {moved} row(s)."))
@@ -0,0 +1,109 @@
+# Benchmarks JSON API serialization (see core/api.py) on synthetic pitches.
+# Everything runs in one transaction that is rolled back at the end, so the
+# database is left as it was.
+#
+#   python manage.py benchapi --pitches 10000
+
+import json
+import time
+import tracemalloc
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.forms.models import model_to_dict
+from django.core.serializers.json import DjangoJSONEncoder
+from django.test import RequestFactory, override_settings
+
+from core.api import api_list_view
+from core.models import User, EntrepreneurProfile, Pitch, PitchContent
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = "Measures API serialization throughput and memory against loading and encoding whole rows."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--pitches', type=int, default=10000, help="Number of synthetic pitches.")
+        parser.add_argument('--details-size', type=int, default=4000, help="Characters in each pitch's details.")
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                self.run(options)
+                raise Rollback
+        except Rollback:
+            self.stdout.write("Rolled back the benchmark data.")
+
+    def measure(self, label, count, func):
+        # One untraced run for the timing, one traced run for peak memory
+        started = time.perf_counter()
+        size = func()
+        elapsed = time.perf_counter() - started
+        tracemalloc.start()
+        func()
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        self.stdout.write(
+            f"  {label:<34} {count / elapsed:10.0f} objects/s {size / elapsed / 2**20:8.1f} MB/s "
+            f"{size / 2**20:8.1f} MB body {peak / 2**20:8.1f} MB peak"
+        )
+
+    def run(self, options):
+        count = options['pitches']
+        self.stdout.write(f"Creating {count} pitches...")
+        entrepreneur = User.objects.create(username='bench-entrepreneur', user_type=1)
+        EntrepreneurProfile.objects.create(user=entrepreneur, company_name='Bench', industry='Fintech')
+        investor = User.objects.create(username='bench-investor', user_type=2)
+        pitches = Pitch.objects.bulk_create(
+            [
+                Pitch(
+                    entrepreneur=entrepreneur,
+                    title=f'Pitch #{n}',
+                    summary='We build tools for small businesses across India.',
+                    funding_amount=1000000,
+                )
+                for n in range(count)
+            ],
+            batch_size=2000,
+        )
+        PitchContent.objects.bulk_create(
+            [PitchContent(pitch=pitch, details='x' * options['details_size']) for pitch in pitches], batch_size=2000
+        )
+
+        def whole_rows():
+            # Every column of the pitch, its details, the entrepreneur and the profile
+            pitches = Pitch.objects.select_related('content', 'entrepreneur__entrepreneur_profile').order_by('-id')
+            data = [
+                {
+                    **model_to_dict(pitch),
+                    'details': pitch.content.details,
+                    'entrepreneur': model_to_dict(pitch.entrepreneur, exclude=['groups', 'user_permissions']),
+                    'profile': model_to_dict(pitch.entrepreneur.entrepreneur_profile, exclude=['company_logo']),
+                }
+                for pitch in pitches
+            ]
+            return len(json.dumps({'results': data}, cls=DjangoJSONEncoder))
+
+        factory = RequestFactory()
+
+        def api(query):
+            def call():
+                request = factory.get('/api/v1/pitches/', {'limit': count, **query})
+                request.user = investor
+                response = api_list_view(request, 'pitches')
+                if response.streaming:
+                    return sum(len(chunk) for chunk in response.streaming_content)
+                return len(response.content)
+            return call
+
+        self.stdout.write(f"Serializing {count} pitches:")
+        self.measure("whole rows, json.dumps", count, whole_rows)
+        with override_settings(API_MAX_PAGE_SIZE=count, API_BUFFERED_PAGE_SIZE=count):
+            self.measure("API default fields, buffered", count, api({}))
+        with override_settings(API_MAX_PAGE_SIZE=count, API_BUFFERED_PAGE_SIZE=0):
+            self.measure("API default fields, streamed", count, api({}))
+            self.measure("API ?fields=title, streamed", count, api({'fields': 'title'}))
+            self.measure("API with details, streamed", count, api({'fields': 'title,summary,details'}))
@@ -0,0 +1,96 @@
+# Measures what the pitch list pages read from the database (see pitch_cards()
+# in core/views.py) against loading whole rows, on synthetic data. Everything
+# runs in one transaction that is rolled back at the end.
+#
+#   python manage.py benchlistpages --pitches 10000
+
+import time
+import tracemalloc
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from core.models import User, EntrepreneurProfile, Pitch, PitchContent
+from core.views import pitch_cards
+
+
+class Rollback(Exception):
+    pass
+
+
+def value_size(value):
+    if isinstance(value, str):
+        return len(value.encode())
+    if isinstance(value, (bytes, memoryview)):
+        return len(value)
+    return 8 if value is not None else 0
+
+
+class Command(BaseCommand):
+    help = "Measures bytes read and memory used by the pitch list querysets."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--pitches', type=int, default=10000, help="Number of synthetic pitches.")
+        parser.add_argument('--entrepreneurs', type=int, default=1000, help="Number of synthetic entrepreneurs.")
+        parser.add_argument('--text-size', type=int, default=4000, help="Characters in each long text field.")
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                self.run(options)
+                raise Rollback
+        except Rollback:
+            self.stdout.write("Rolled back the benchmark data.")
+
+    def measure(self, label, queryset):
+        # Bytes the database returns for the query
+        sql, params = queryset.query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            transferred = sum(value_size(value) for row in cursor.fetchall() for value in row)
+
+        timings = []
+        for _ in range(3):
+            started = time.perf_counter()
+            list(queryset.all())
+            timings.append(time.perf_counter() - started)
+        elapsed = min(timings)
+
+        tracemalloc.start()
+        rows = list(queryset.all())
+        memory = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        del rows
+        self.stdout.write(
+            f"  {label:<36} {transferred / 2**20:8.1f} MB read {memory / 2**20:8.1f} MB held {elapsed * 1000:8.0f} ms"
+        )
+
+    def run(self, options):
+        text = 'x' * options['text_size']
+        self.stdout.write(f"Creating {options['pitches']} pitches by {options['entrepreneurs']} entrepreneurs...")
+        entrepreneurs = User.objects.bulk_create(
+            [User(username=f'bench-founder-{n}', first_name='Bench', last_name=f'Founder {n}', user_type=1) for n in range(options['entrepreneurs'])]
+        )
+        EntrepreneurProfile.objects.bulk_create([
+            EntrepreneurProfile(user=user, company_name=f'Company {n}', industry='Fintech', business_plan=text, company_details=text)
+            for n, user in enumerate(entrepreneurs)
+        ])
+        pitches = Pitch.objects.bulk_create(
+            [
+                Pitch(entrepreneur=entrepreneurs[n % len(entrepreneurs)], title=f'Pitch #{n}', summary='We build tools for small businesses.', funding_amount=1000000)
+                for n in range(options['pitches'])
+            ],
+            batch_size=2000,
+        )
+        PitchContent.objects.bulk_create([PitchContent(pitch=pitch, details=text) for pitch in pitches], batch_size=2000)
+
+        self.stdout.write("Investor dashboard pitch list:")
+        self.measure(
+            "whole rows (details inline)",
+            Pitch.objects.select_related('content', 'entrepreneur__entrepreneur_profile').order_by('-created_at'),
+        )
+        self.measure(
+            "whole rows, details in PitchContent",
+            Pitch.objects.select_related('entrepreneur__entrepreneur_profile').order_by('-created_at'),
+        )
+        self.measure("pitch_cards()", pitch_cards().order_by('-created_at'))
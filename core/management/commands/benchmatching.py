@@ -0,0 +1,129 @@
+# Benchmarks pitch-to-investor matching (see core/matching.py) on synthetic data.
+# Everything runs in one transaction that is rolled back at the end, so the
+# database is left as it was.
+#
+#   python manage.py benchmatching --investors 100000
+
+import random
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from core.matching import fan_out_pitch, interest_keywords, matching_investor_ids, pitch_keywords, sync_investor_keywords
+from core.models import User, EntrepreneurProfile, InvestorProfile, Pitch, InterestKeyword, PitchMatch
+
+INDUSTRIES = [
+    'Fintech', 'Healthcare', 'Clean Energy', 'AI', 'Machine Learning', 'SaaS', 'E-commerce', 'Edtech',
+    'Agritech', 'Logistics', 'Biotech', 'Gaming', 'Cybersecurity', 'Real Estate', 'Food and Beverage',
+    'Travel', 'Media', 'Robotics', 'Insurance', 'Manufacturing', 'Retail', 'Mobility', 'Blockchain',
+    'Consumer Electronics', 'Fashion', 'Space', 'Telecom', 'HR Tech', 'Legal Tech', 'Climate',
+]
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = "Measures reverse-index matching and fan-out against a full scan of investor interests."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--investors', type=int, default=100000, help="Number of synthetic investors.")
+        parser.add_argument('--pitches', type=int, default=20, help="Number of pitches to match.")
+        parser.add_argument('--seed', type=int, default=1)
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                self.run(options)
+                raise Rollback
+        except Rollback:
+            self.stdout.write("Rolled back the benchmark data.")
+
+    def timed(self, label, func, *args):
+        started = time.perf_counter()
+        result = func(*args)
+        elapsed = time.perf_counter() - started
+        self.stdout.write(f"  {label:<44} {elapsed * 1000:10.1f} ms")
+        return result, elapsed
+
+    def run(self, options):
+        rnd = random.Random(options['seed'])
+        count = options['investors']
+        self.stdout.write(f"Creating {count} investors...")
+
+        # bulk_create skips the signals; the keyword rows are written in bulk below
+        users = User.objects.bulk_create(
+            [User(username=f'bench-investor-{n}', user_type=2) for n in range(count)], batch_size=5000
+        )
+        profiles = [
+            InvestorProfile(user=user, investment_interests=', '.join(rnd.sample(INDUSTRIES, rnd.randint(1, 4))))
+            for user in users
+        ]
+        InvestorProfile.objects.bulk_create(profiles, batch_size=5000)
+
+        def build_index():
+            InterestKeyword.objects.bulk_create(
+                [
+                    InterestKeyword(investor_id=profile.user_id, keyword=keyword)
+                    for profile in profiles for keyword in interest_keywords(profile.investment_interests)
+                ],
+                batch_size=5000,
+            )
+        self.stdout.write("Reverse index:")
+        self.timed(f"build for {count} investors", build_index)
+        self.stdout.write(f"  {'keyword rows':<44} {InterestKeyword.objects.count():10d}")
+
+        sample = rnd.sample(profiles, min(200, count))
+        durations = []
+        for profile in sample:
+            profile.investment_interests = ', '.join(rnd.sample(INDUSTRIES, rnd.randint(1, 4)))
+            started = time.perf_counter()
+            sync_investor_keywords(profile.user_id, profile.investment_interests)
+            durations.append(time.perf_counter() - started)
+            InvestorProfile.objects.filter(user_id=profile.user_id).update(investment_interests=profile.investment_interests)
+        self.stdout.write(f"  {'profile save (sync keywords), median':<44} {statistics.median(durations) * 1000:10.2f} ms")
+
+        entrepreneur = User.objects.create(username='bench-entrepreneur', user_type=1)
+        EntrepreneurProfile.objects.create(user=entrepreneur, company_name='Bench', industry=rnd.choice(INDUSTRIES))
+        pitches = Pitch.objects.bulk_create([
+            Pitch(
+                entrepreneur=entrepreneur,
+                title=f'{rnd.choice(INDUSTRIES)} platform #{n}',
+                summary=f'We build {rnd.choice(INDUSTRIES).lower()} tools for small businesses across India.',
+                funding_amount=1000000,
+            )
+            for n in range(options['pitches'])
+        ])
+        for pitch in pitches:
+            pitch.entrepreneur = entrepreneur
+
+        self.stdout.write(f"Matching {len(pitches)} pitches:")
+        lookup, scan, fan_out, matched = [], [], [], []
+        for pitch in pitches:
+            started = time.perf_counter()
+            ids = matching_investor_ids(pitch)
+            lookup.append(time.perf_counter() - started)
+            matched.append(len(ids))
+
+            # What it replaces: reading and parsing every investor's interests
+            started = time.perf_counter()
+            wanted = pitch_keywords(pitch.title, pitch.summary, entrepreneur.entrepreneur_profile.industry)
+            scanned = [
+                user_id for user_id, interests in InvestorProfile.objects.values_list('user_id', 'investment_interests').iterator(chunk_size=5000)
+                if interest_keywords(interests) & wanted
+            ]
+            scan.append(time.perf_counter() - started)
+            assert set(scanned) == set(ids), "The reverse index and the scan disagree."
+
+            started = time.perf_counter()
+            fan_out_pitch(pitch)
+            fan_out.append(time.perf_counter() - started)
+
+        self.stdout.write(f"  {'investors matched per pitch, median':<44} {statistics.median(matched):10.0f}")
+        self.stdout.write(f"  {'reverse index lookup, median':<44} {statistics.median(lookup) * 1000:10.1f} ms")
+        self.stdout.write(f"  {'full scan of interests, median':<44} {statistics.median(scan) * 1000:10.1f} ms")
+        self.stdout.write(f"  {'fan-out (matches + live events), median':<44} {statistics.median(fan_out) * 1000:10.1f} ms")
+        self.stdout.write(f"  {'PitchMatch rows written':<44} {PitchMatch.objects.count():10d}")
@@ -0,0 +1,149 @@
+# Benchmarks concurrent reads and writes against a SQLite database (see
+# core/sqlite/base.py). The workers commit real rows, so point DATABASE_URL at
+# a scratch copy; the benchmark rows are deleted at the end. Compare the stock
+# backend with the concurrent mode by running it once with each setting:
+#
+#   DATABASE_URL=sqlite:////tmp/bench.sqlite3 SQLITE_CONCURRENT_MODE=False python manage.py benchsqlite
+#   DATABASE_URL=sqlite:////tmp/bench.sqlite3 SQLITE_CONCURRENT_MODE=True python manage.py benchsqlite
+
+import multiprocessing
+import random
+import statistics
+import threading
+import time
+from collections import defaultdict
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, connection, connections, transaction
+
+from chat.models import Conversation, Message
+from core.models import User, EntrepreneurProfile, Pitch, Offer
+
+
+def percentile(values, share):
+    return sorted(values)[min(len(values) - 1, int(len(values) * share))] if values else 0
+
+
+class Command(BaseCommand):
+    help = "Measures read and write throughput and latency of SQLite under concurrent threads and processes."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', default='1,4,16', help="Comma-separated thread counts per process to run.")
+        parser.add_argument('--processes', type=int, default=1, help="Worker processes, each running --threads threads.")
+        parser.add_argument('--seconds', type=float, default=3, help="Duration of each run.")
+        parser.add_argument('--write-share', type=float, default=0.2, help="Share of operations that write (0-1).")
+        parser.add_argument('--conversations', type=int, default=50)
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError("benchsqlite needs a SQLite database (set DATABASE_URL=sqlite:///...).")
+        with connection.cursor() as cursor:
+            journal_mode = cursor.execute('PRAGMA journal_mode').fetchone()[0]
+        self.stdout.write(f"Backend {connection.settings_dict['ENGINE']}, journal_mode={journal_mode}")
+
+        conversations = self.create_data(options['conversations'])
+        try:
+            self.stdout.write(
+                f"  {'workers':>7} {'reads/s':>9} {'writes/s':>9} {'read p50':>9} {'read p99':>9} "
+                f"{'write p50':>9} {'write p99':>9} {'locked':>7}"
+            )
+            for threads in [int(count) for count in options['threads'].split(',')]:
+                self.run(conversations, threads, options)
+        finally:
+            User.objects.filter(username__startswith='bench-sqlite-').delete()
+            self.stdout.write("Deleted the benchmark data.")
+
+    def create_data(self, count):
+        entrepreneur = User.objects.create(username='bench-sqlite-entrepreneur', user_type=1)
+        EntrepreneurProfile.objects.create(user=entrepreneur, company_name='Bench', industry='Fintech')
+        investor = User.objects.create(username='bench-sqlite-investor', user_type=2)
+        conversations = []
+        for n in range(count):
+            pitch = Pitch.objects.create(entrepreneur=entrepreneur, title=f'Bench pitch {n}', summary='Bench', funding_amount=1000000)
+            offer = Offer.objects.create(pitch=pitch, investor=investor, amount=50000, status='accepted')
+            conversation = Conversation.objects.create(offer=offer)
+            conversation.participants.add(entrepreneur, investor)
+            Message.objects.bulk_create(
+                [Message(conversation=conversation, sender=investor, content=f'Message {i}') for i in range(100)]
+            )
+            conversations.append((conversation.pk, offer.pk, investor.pk))
+        return conversations
+
+    def run(self, conversations, threads, options):
+        processes = options['processes']
+        # Connections must not be shared with forked workers
+        connections.close_all()
+        context = multiprocessing.get_context('fork')
+        results = context.Queue()
+        start = context.Event()
+        workers = [
+            context.Process(target=work_process, args=(conversations, threads, options, seed, start, results))
+            for seed in range(processes)
+        ]
+        for worker in workers:
+            worker.start()
+        start.set()
+        latencies, locked = defaultdict(list), 0
+        for _ in workers:
+            process_latencies, process_locked = results.get()
+            for kind, values in process_latencies.items():
+                latencies[kind].extend(values)
+            locked += process_locked
+        for worker in workers:
+            worker.join()
+
+        seconds = options['seconds']
+        reads, writes = latencies['read'], latencies['write']
+        self.stdout.write(
+            f"  {processes * threads:>7} {len(reads) / seconds:9.0f} {len(writes) / seconds:9.0f} "
+            f"{statistics.median(reads or [0]) * 1000:7.1f}ms {percentile(reads, 0.99) * 1000:7.1f}ms "
+            f"{statistics.median(writes or [0]) * 1000:7.1f}ms {percentile(writes, 0.99) * 1000:7.1f}ms {locked:7d}"
+        )
+
+
+def work_process(conversations, threads, options, seed, start, results):
+    latencies, locked = defaultdict(list), [0]
+    lock = threading.Lock()
+    start.wait()
+    deadline = time.monotonic() + options['seconds']
+    workers = [
+        threading.Thread(target=work_thread, args=(conversations, options, random.Random(seed * 1000 + n), deadline, latencies, locked, lock))
+        for n in range(threads)
+    ]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    results.put((dict(latencies), locked[0]))
+
+
+def work_thread(conversations, options, rnd, deadline, latencies, locked, lock):
+    mine = defaultdict(list)
+    errors = 0
+    while time.monotonic() < deadline:
+        conversation_id, offer_id, investor_id = rnd.choice(conversations)
+        kind = 'write' if rnd.random() < options['write_share'] else 'read'
+        started = time.perf_counter()
+        try:
+            if kind == 'read':
+                # A conversation's latest messages, as the chat page loads them
+                list(Message.objects.filter(conversation_id=conversation_id).order_by('-id')[:50])
+                Offer.objects.select_related('pitch').get(pk=offer_id)
+            elif rnd.random() < 0.5:
+                # A chat message saved in autocommit, as the consumer does
+                Message.objects.create(conversation_id=conversation_id, sender_id=investor_id, content='Bench')
+            else:
+                # A read-then-write transaction, as the offer and answer views do
+                with transaction.atomic():
+                    Offer.objects.get(pk=offer_id)
+                    Offer.objects.filter(pk=offer_id).update(message='Bench')
+                    Message.objects.create(conversation_id=conversation_id, sender_id=investor_id, content='Bench')
+        except OperationalError:
+            errors += 1
+            continue
+        mine[kind].append(time.perf_counter() - started)
+    connection.close()
+    with lock:
+        for kind, values in mine.items():
+            latencies[kind].extend(values)
+        locked[0] += errors
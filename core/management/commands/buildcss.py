@@ -0,0 +1,48 @@
+# Builds static/css/utilities.css from the utility classes used in our templates
+# and scripts (see core/cssbuild.py). Run it before collectstatic:
+#
+#   python manage.py buildcss
+#   python manage.py buildcss --check   # fail if the committed file is stale
+
+import hashlib
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from core import cssbuild
+
+
+class Command(BaseCommand):
+    help = "Generates the minimal utility stylesheet used by the templates (no network access)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--check', action='store_true', help="Exit with an error if the stylesheet is out of date instead of writing it.")
+
+    def handle(self, *args, **options):
+        base_dir = Path(settings.BASE_DIR)
+        static_dir = base_dir / 'static'
+        output = static_dir / 'css' / 'utilities.css'
+
+        sources = sorted(base_dir.glob('templates/**/*.html')) + sorted(static_dir.glob('js/**/*.js'))
+        faces, missing_fonts = cssbuild.font_faces(cssbuild.WEB_FONT_FAMILY, cssbuild.WEB_FONT_WEIGHTS, static_dir / 'fonts', '../fonts/')
+        css, used = cssbuild.generate(sources, preflight=cssbuild.PREFLIGHT, font_faces=faces)
+        css = "/* Generated by `manage.py buildcss` from templates/ and static/js/. Do not edit. */\n\n" + css
+
+        for filename in missing_fonts:
+            self.stderr.write(self.style.WARNING(
+                f"static/fonts/{filename} not found; pages use the system font for this weight "
+                f"(or Google Fonts, with WEB_FONTS_CDN_FALLBACK) until it is added."
+            ))
+
+        digest = hashlib.sha256(css.encode()).hexdigest()[:12]
+        if options['check']:
+            if not output.exists() or output.read_text(encoding='utf-8') != css:
+                raise CommandError(f"{output.relative_to(base_dir)} is out of date; run `manage.py buildcss`.")
+            self.stdout.write(f"{output.relative_to(base_dir)} is up to date ({digest}).")
+            return
+
+        output.write_text(css, encoding='utf-8')
+        self.stdout.write(self.style.SUCCESS(
+            f"Wrote {output.relative_to(base_dir)}: {len(used)} utilities, {len(css.encode())} bytes, sha256 {digest}."
+        ))
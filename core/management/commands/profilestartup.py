@@ -0,0 +1,102 @@
+# Measures how long a fresh process takes to boot Django and load the app,
+# and which packages the import time goes to.
+#
+#   python manage.py profilestartup --repeat 5 --target asgi
+
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+# Runs in the child process; prints its own phase timings as JSON
+BOOT_SCRIPT = """
+import json, time
+t0 = time.perf_counter()
+import django
+django.setup()
+t1 = time.perf_counter()
+import {module}
+t2 = time.perf_counter()
+print(json.dumps({{'setup': t1 - t0, 'app': t2 - t1}}))
+"""
+
+TARGETS = {
+    'wsgi': 'invent.wsgi',
+    'asgi': 'invent.asgi',
+}
+
+
+class Command(BaseCommand):
+    help = "Measures cold start time and per-app import time in fresh interpreter processes."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=3, help="Number of cold starts to measure (the median is reported).")
+        parser.add_argument('--target', choices=sorted(TARGETS), default='asgi', help="Which application module to load.")
+        parser.add_argument('--top', type=int, default=15, help="How many of the slowest modules to list.")
+
+    def handle(self, *args, **options):
+        runs = [self.cold_start(TARGETS[options['target']]) for _ in range(max(options['repeat'], 1))]
+
+        self.stdout.write(f"Cold start ({options['target']}, median of {len(runs)}):")
+        for phase in ('total', 'interpreter', 'setup', 'app'):
+            self.stdout.write(f"  {phase:<12} {statistics.median(run[phase] for run in runs) * 1000:8.1f} ms")
+
+        # Import breakdown from the last run
+        per_package, modules = runs[-1]['imports']
+        apps = {app.split('.')[0] for app in settings.INSTALLED_APPS}
+
+        self.stdout.write("\nImport time by installed app (self time of all its modules):")
+        for package in sorted(apps, key=lambda name: -per_package.get(name, 0)):
+            self.stdout.write(f"  {package:<24} {per_package.get(package, 0) / 1000:8.1f} ms")
+
+        self.stdout.write("\nImport time by package:")
+        for package, micros in sorted(per_package.items(), key=lambda item: -item[1])[:options['top']]:
+            self.stdout.write(f"  {package:<24} {micros / 1000:8.1f} ms")
+
+        self.stdout.write(f"\nSlowest {options['top']} modules (cumulative):")
+        for module, micros in sorted(modules.items(), key=lambda item: -item[1])[:options['top']]:
+            self.stdout.write(f"  {module:<48} {micros / 1000:8.1f} ms")
+
+    def cold_start(self, module):
+        """
+        Boots Django in a new interpreter with -X importtime and returns the
+        phase timings (seconds) and the parsed import breakdown.
+        """
+        env = dict(os.environ, DJANGO_SETTINGS_MODULE=os.environ.get('DJANGO_SETTINGS_MODULE', 'invent.settings'))
+        started = time.perf_counter()
+        result = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', BOOT_SCRIPT.format(module=module)],
+            capture_output=True, text=True, env=env, cwd=settings.BASE_DIR, check=True,
+        )
+        total = time.perf_counter() - started
+
+        phases = json.loads(result.stdout.strip().splitlines()[-1])
+        return {
+            'total': total,
+            'setup': phases['setup'],
+            'app': phases['app'],
+            'interpreter': total - phases['setup'] - phases['app'],
+            'imports': parse_importtime(result.stderr),
+        }
+
+def parse_importtime(output):
+    """
+    Parses `python -X importtime` output into ({top-level package: self µs},
+    {module: cumulative µs}).
+    """
+    per_package = defaultdict(int)
+    modules = {}
+    for line in output.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|', 2)
+        name = name.strip()
+        per_package[name.split('.')[0]] += int(self_us)
+        modules[name] = int(cumulative_us)
+    return dict(per_package), modules
@@ -0,0 +1,26 @@
+# Removes pitch attachment uploads that were started but never finished
+# (see core/attachments.py). Meant to run from cron.
+#
+#   python manage.py purgeuploads
+#   python manage.py purgeuploads --hours 6
+
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from core.attachments import purge_abandoned_uploads
+
+
+class Command(BaseCommand):
+    help = "Deletes abandoned attachment uploads and their partial files."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--hours', type=int, default=settings.PITCH_ATTACHMENT_UPLOAD_EXPIRY_HOURS,
+            help="Remove uploads idle for longer than this many hours.",
+        )
+
+    def handle(self, *args, **options):
+        removed = purge_abandoned_uploads(timedelta(hours=options['hours']))
+        self.stdout.write(self.style.SUCCESS(f"Removed {removed} abandoned upload(s)."))
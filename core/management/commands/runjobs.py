@@ -0,0 +1,122 @@
+# Runs background jobs from the database queue (see core/jobs.py). Deployed as
+# the Procfile's worker process; any number of them can run side by side.
+#
+# Besides running jobs, each worker keeps a heartbeat on the jobs it is running,
+# periodically recovers jobs whose worker died (see requeue_stale_jobs) and
+# queues the next run of the daily jobs, such as the digest e-mails (see
+# schedule_daily_jobs).
+#
+#   python manage.py runjobs --concurrency 4
+#   python manage.py runjobs --queue send_digest --once
+
+import signal
+import threading
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections, connection
+
+from core import jobs
+
+
+class Command(BaseCommand):
+    help = "Claims and runs queued background jobs until stopped."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', type=int, default=1, help="Number of worker threads.")
+        parser.add_argument('--queue', action='append', dest='job_types', help="Only run jobs of this type (repeatable).")
+        parser.add_argument('--poll-interval', type=float, default=1.0, help="Seconds to sleep when the queue is empty.")
+        parser.add_argument('--stale-after', type=int, default=600, help="Recover running jobs without a heartbeat for this many seconds.")
+        parser.add_argument('--heartbeat-interval', type=int, default=60, help="Seconds between heartbeats on running jobs.")
+        parser.add_argument('--sweep-interval', type=int, default=60, help="Seconds between checks for stale jobs.")
+        parser.add_argument('--metrics-interval', type=int, default=60, help="Seconds between metric log lines (0 disables).")
+        parser.add_argument('--once', action='store_true', help="Exit once the queue is drained.")
+
+    def handle(self, *args, **options):
+        if options['heartbeat_interval'] >= options['stale_after']:
+            raise CommandError("--heartbeat-interval must be shorter than --stale-after.")
+        self.stop = threading.Event()
+        self.metrics = jobs.JobMetrics()
+        # Ids of the jobs this process is running, kept alive by the heartbeat
+        self.running = set()
+        self.running_lock = threading.Lock()
+
+        signal.signal(signal.SIGINT, self.request_stop)
+        signal.signal(signal.SIGTERM, self.request_stop)
+
+        self.sweep(options)
+
+        concurrency = max(options['concurrency'], 1)
+        self.stdout.write(f"Starting {concurrency} job worker thread(s)...")
+        workers = [
+            threading.Thread(target=self.work, args=(options,), name=f'job-worker-{n}', daemon=True)
+            for n in range(concurrency)
+        ]
+        for worker in workers:
+            worker.start()
+
+        last_report = last_heartbeat = last_sweep = time.monotonic()
+        try:
+            while any(worker.is_alive() for worker in workers):
+                for worker in workers:
+                    worker.join(timeout=1)
+                now = time.monotonic()
+                if now - last_heartbeat >= options['heartbeat_interval']:
+                    with self.running_lock:
+                        running = list(self.running)
+                    jobs.heartbeat(running)
+                    last_heartbeat = now
+                if now - last_sweep >= options['sweep_interval']:
+                    self.sweep(options)
+                    last_sweep = now
+                if options['metrics_interval'] and now - last_report >= options['metrics_interval']:
+                    self.report()
+                    last_report = now
+        finally:
+            connection.close()
+
+        self.report()
+
+    def sweep(self, options):
+        requeued, failed = jobs.requeue_stale_jobs(timedelta(seconds=options['stale_after']))
+        if requeued or failed:
+            self.stdout.write(f"Recovered stale jobs: {requeued} re-queued, {failed} failed.")
+        jobs.schedule_daily_jobs()
+
+    def request_stop(self, signum, frame):
+        self.stdout.write("Stopping after the current jobs finish...")
+        self.stop.set()
+
+    def work(self, options):
+        """
+        One worker thread: claim a job, run it, repeat. Each thread uses its own
+        database connection, which is closed when the thread exits.
+        """
+        try:
+            while not self.stop.is_set():
+                close_old_connections()
+                claimed = jobs.claim_jobs(limit=1, job_types=options['job_types'])
+                if not claimed:
+                    if options['once']:
+                        return
+                    self.stop.wait(options['poll_interval'])
+                    continue
+                for claimed_job in claimed:
+                    with self.running_lock:
+                        self.running.add(claimed_job.id)
+                    try:
+                        jobs.run_job(claimed_job, metrics=self.metrics)
+                    finally:
+                        with self.running_lock:
+                            self.running.discard(claimed_job.id)
+        finally:
+            connection.close()
+
+    def report(self):
+        for job_type, stats in sorted(self.metrics.snapshot().items()):
+            self.stdout.write(
+                f"{job_type}: {stats['succeeded']} ok, {stats['failed']} failed, "
+                f"run avg {stats['run_seconds_avg'] * 1000:.1f}ms max {stats['run_seconds_max'] * 1000:.1f}ms, "
+                f"wait avg {stats['wait_seconds_avg'] * 1000:.1f}ms max {stats['wait_seconds_max'] * 1000:.1f}ms"
+            )
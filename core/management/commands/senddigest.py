@@ -0,0 +1,22 @@
+# Sends the daily activity digest e-mails (see core/digest.py). The runjobs
+# workers already run it every day as the 'send_daily_digest' job at
+# DIGEST_HOUR; this command is for sending by hand, or from cron when
+# DIGEST_HOUR is unset.
+#
+#   python manage.py senddigest
+#   python manage.py senddigest --chunk-size 5000
+
+from django.core.management.base import BaseCommand
+
+from core import digest
+
+
+class Command(BaseCommand):
+    help = "E-mails every user a digest of their activity since their last digest."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, help="Users per batch of queries (default: DIGEST_CHUNK_SIZE).")
+
+    def handle(self, *args, **options):
+        processed, sent = digest.send_digests(chunk_size=options['chunk_size'])
+        self.stdout.write(self.style.SUCCESS(f"Sent {sent} digest(s) to {processed} user(s)."))
@@ -0,0 +1,123 @@
+# This file matches new pitches to the investors interested in them.
+#
+# Each investor's free-text investment_interests ("Fintech, Clean Energy") are
+# normalized into keywords and stored in InterestKeyword, a reverse index from
+# keyword to investor. A new pitch is turned into candidate keywords (its
+# industry plus the words and short phrases of its title and summary), and the
+# interested investors are found with a single indexed keyword__in lookup.
+#
+# Fan-out happens in the 'match_pitch_to_investors' background job (core/tasks.py),
+# never in the request that created the pitch.
+
+import re
+
+from django.db import transaction
+from django.urls import reverse
+
+from .autocomplete import normalize
+from .models import InterestKeyword, PitchMatch
+from chat import notifications
+
+# Filler words that never make a useful interest on their own
+STOP_WORDS = {'a', 'an', 'and', 'any', 'as', 'at', 'e', 'eg', 'etc', 'for', 'g', 'in', 'of', 'on', 'or', 'the', 'to', 'with'}
+
+# Longest phrase (in words) looked up from a pitch's text
+MAX_PHRASE_WORDS = 3
+
+FAN_OUT_BATCH_SIZE = 1000
+
+def _words(text):
+    words = []
+    for word in re.findall(r'[a-z0-9]+', normalize(text)):
+        if word in STOP_WORDS:
+            continue
+        # Light stemming so "startups" matches "startup"
+        if len(word) > 4 and word.endswith('s') and not word.endswith('ss'):
+            word = word[:-1]
+        words.append(word)
+    return words
+
+def interest_keywords(interests):
+    """
+    Splits an investment_interests string into normalized keywords:
+    "Fintech, Clean Energy and AI" -> {'fintech', 'clean energy', 'ai'}.
+    """
+    keywords = set()
+    for phrase in re.split(r'[,;/|\n]|\band\b|&', interests or ''):
+        keyword = ' '.join(_words(phrase)[:MAX_PHRASE_WORDS])
+        if keyword:
+            keywords.add(keyword[:100])
+    return keywords
+
+def pitch_keywords(title, summary, industry):
+    """
+    Every keyword an interested investor might have used for this pitch:
+    the industry as a whole, and each run of up to MAX_PHRASE_WORDS words
+    in the title and summary.
+    """
+    keywords = interest_keywords(industry)
+    for text in (title, summary):
+        words = _words(text)
+        for size in range(1, MAX_PHRASE_WORDS + 1):
+            for start in range(len(words) - size + 1):
+                keywords.add(' '.join(words[start:start + size])[:100])
+    return keywords
+
+def sync_investor_keywords(investor_id, interests):
+    """
+    Replaces an investor's rows in the reverse index with the keywords of `interests`.
+    Only the keywords that changed are written.
+    """
+    wanted = interest_keywords(interests)
+    with transaction.atomic():
+        current = set(InterestKeyword.objects.filter(investor_id=investor_id).values_list('keyword', flat=True))
+        stale = current - wanted
+        if stale:
+            InterestKeyword.objects.filter(investor_id=investor_id, keyword__in=stale).delete()
+        InterestKeyword.objects.bulk_create(
+            [InterestKeyword(investor_id=investor_id, keyword=keyword) for keyword in wanted - current],
+            ignore_conflicts=True,
+        )
+
+def matching_investor_ids(pitch):
+    """
+    The ids of every investor with an interest matching the pitch, in one query.
+    """
+    profile = getattr(pitch.entrepreneur, 'entrepreneur_profile', None)
+    keywords = pitch_keywords(pitch.title, pitch.summary, profile.industry if profile else '')
+    if not keywords:
+        return []
+    return list(
+        InterestKeyword.objects.filter(keyword__in=keywords)
+        .exclude(investor_id=pitch.entrepreneur_id)
+        .values_list('investor_id', flat=True)
+        .distinct()
+    )
+
+def fan_out_pitch(pitch):
+    """
+    Records a PitchMatch for every interested investor and pushes a live
+    'pitch_matched' event to their dashboards, in batches of FAN_OUT_BATCH_SIZE.
+    Safe to run twice: investors who already have the match are neither
+    recorded nor notified again. Returns the number of investors matched.
+    """
+    investor_ids = matching_investor_ids(pitch)
+    data = {
+        'id': pitch.id,
+        'title': pitch.title,
+        'summary': pitch.summary,
+        'url': reverse('pitch_detail', args=[pitch.id]),
+    }
+    for start in range(0, len(investor_ids), FAN_OUT_BATCH_SIZE):
+        batch = investor_ids[start:start + FAN_OUT_BATCH_SIZE]
+        with transaction.atomic():
+            matched = set(
+                PitchMatch.objects.filter(pitch_id=pitch.id, investor_id__in=batch).values_list('investor_id', flat=True)
+            )
+            new = [investor_id for investor_id in batch if investor_id not in matched]
+            PitchMatch.objects.bulk_create(
+                [PitchMatch(pitch_id=pitch.id, investor_id=investor_id) for investor_id in new],
+                ignore_conflicts=True,
+            )
+            notifications.publish(new, 'pitch_matched', data)
+    return len(investor_ids)
@@ -0,0 +1,43 @@
+# Generated by Django 5.2.4 on 2026-10-19 03:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_pitchviewstats'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='answer',
+            name='created_at',
+            field=models.DateTimeField(auto_now_add=True, db_index=True),
+        ),
+        migrations.AlterField(
+            model_name='offer',
+            name='created_at',
+            field=models.DateTimeField(auto_now_add=True, db_index=True),
+        ),
+        migrations.AlterField(
+            model_name='offer',
+            name='status',
+            field=models.CharField(choices=[('pending', 'Pending'), ('accepted', 'Accepted'), ('rejected', 'Rejected')], db_index=True, default='pending', max_length=10),
+        ),
+        migrations.AlterField(
+            model_name='pitch',
+            name='created_at',
+            field=models.DateTimeField(auto_now_add=True, db_index=True),
+        ),
+        migrations.AlterField(
+            model_name='question',
+            name='created_at',
+            field=models.DateTimeField(auto_now_add=True, db_index=True),
+        ),
+        migrations.AlterField(
+            model_name='user',
+            name='user_type',
+            field=models.PositiveSmallIntegerField(blank=True, choices=[(1, 'entrepreneur'), (2, 'investor')], db_index=True, null=True),
+        ),
+    ]
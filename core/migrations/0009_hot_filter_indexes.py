@@ -0,0 +1,42 @@
+# Generated by Django 5.2.4 on 2026-10-19 04:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_admin_filter_indexes'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='entrepreneurprofile',
+            name='industry',
+            field=models.CharField(blank=True, db_index=True, max_length=100),
+        ),
+        migrations.AddIndex(
+            model_name='offer',
+            index=models.Index(fields=['investor', '-created_at'], name='core_offer_inv_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='offer',
+            index=models.Index(fields=['pitch', '-created_at'], name='core_offer_pitch_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='offer',
+            index=models.Index(fields=['pitch', 'investor'], name='core_offer_pitch_investor_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='offer',
+            index=models.Index(condition=models.Q(('status', 'pending')), fields=['pitch'], name='core_offer_pending_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='pitch',
+            index=models.Index(fields=['entrepreneur', '-created_at'], name='core_pitch_entrep_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='question',
+            index=models.Index(fields=['pitch', '-created_at'], name='core_question_pitch_idx'),
+        ),
+    ]
@@ -0,0 +1,50 @@
+# Generated by Django 5.2.4 on 2026-10-19 04:06
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0009_hot_filter_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedOffer',
+            fields=[
+                ('id', models.IntegerField(primary_key=True, serialize=False)),
+                ('pitch_id', models.IntegerField(db_index=True)),
+                ('pitch_title', models.CharField(max_length=200)),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('message', models.TextField(blank=True)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('accepted', 'Accepted'), ('rejected', 'Rejected')], max_length=10)),
+                ('created_at', models.DateTimeField()),
+                ('archived_at', models.DateTimeField(auto_now_add=True)),
+                ('investor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_offers', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['investor', '-created_at'], name='core_archoffer_inv_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='ArchivedPitch',
+            fields=[
+                ('id', models.IntegerField(primary_key=True, serialize=False)),
+                ('title', models.CharField(max_length=200)),
+                ('summary', models.CharField(max_length=500)),
+                ('details', models.TextField()),
+                ('funding_amount', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('created_at', models.DateTimeField()),
+                ('qa_thread', models.JSONField(blank=True, default=list, help_text='The questions and answers at archive time.')),
+                ('total_views', models.PositiveIntegerField(default=0)),
+                ('archived_at', models.DateTimeField(auto_now_add=True)),
+                ('entrepreneur', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_pitches', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['entrepreneur', '-created_at'], name='core_archpitch_entrep_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,77 @@
+# Generated by Django 5.2.4 on 2026-10-19 04:13
+
+import re
+import unicodedata
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+# A frozen copy of core.matching.interest_keywords as it was when this
+# migration was written, so later changes to matching don't change its result.
+STOP_WORDS = {'a', 'an', 'and', 'any', 'as', 'at', 'e', 'eg', 'etc', 'for', 'g', 'in', 'of', 'on', 'or', 'the', 'to', 'with'}
+MAX_PHRASE_WORDS = 3
+
+def words(text):
+    text = unicodedata.normalize('NFKD', text)
+    text = ''.join(ch for ch in text if not unicodedata.combining(ch)).lower()
+    result = []
+    for word in re.findall(r'[a-z0-9]+', text):
+        if word in STOP_WORDS:
+            continue
+        if len(word) > 4 and word.endswith('s') and not word.endswith('ss'):
+            word = word[:-1]
+        result.append(word)
+    return result
+
+def interest_keywords(interests):
+    keywords = set()
+    for phrase in re.split(r'[,;/|\n]|\band\b|&', interests or ''):
+        keyword = ' '.join(words(phrase)[:MAX_PHRASE_WORDS])
+        if keyword:
+            keywords.add(keyword[:100])
+    return keywords
+
+
+def index_existing_interests(apps, schema_editor):
+    InvestorProfile = apps.get_model('core', 'InvestorProfile')
+    InterestKeyword = apps.get_model('core', 'InterestKeyword')
+    rows = []
+    for user_id, interests in InvestorProfile.objects.values_list('user_id', 'investment_interests').iterator():
+        rows.extend(InterestKeyword(investor_id=user_id, keyword=keyword) for keyword in interest_keywords(interests))
+    InterestKeyword.objects.bulk_create(rows, batch_size=1000, ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0010_archive_tables'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='InterestKeyword',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('keyword', models.CharField(max_length=100)),
+                ('investor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='interest_keywords', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('keyword', 'investor'), name='core_interestkeyword_unique')],
+            },
+        ),
+        migrations.CreateModel(
+            name='PitchMatch',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('investor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='pitch_matches', to=settings.AUTH_USER_MODEL)),
+                ('pitch', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='matches', to='core.pitch')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['investor', '-created_at'], name='core_pitchmatch_inv_idx')],
+                'constraints': [models.UniqueConstraint(fields=('pitch', 'investor'), name='core_pitchmatch_unique')],
+            },
+        ),
+        migrations.RunPython(index_existing_interests, migrations.RunPython.noop),
+    ]
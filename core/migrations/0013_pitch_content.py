@@ -0,0 +1,30 @@
+# Generated by Django 5.2.4 on 2026-10-19 04:23
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0012_pitch_attachments'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PitchContent',
+            fields=[
+                ('pitch', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='content', serialize=False, to='core.pitch')),
+                ('details', models.TextField(help_text='Full details of your business pitch.')),
+            ],
+        ),
+        # Copy every pitch's details across in one statement before dropping the column
+        migrations.RunSQL(
+            "INSERT INTO core_pitchcontent (pitch_id, details) SELECT id, details FROM core_pitch",
+            reverse_sql="UPDATE core_pitch SET details = (SELECT details FROM core_pitchcontent WHERE core_pitchcontent.pitch_id = core_pitch.id)",
+        ),
+        migrations.RemoveField(
+            model_name='pitch',
+            name='details',
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.4 on 2026-10-19 04:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0013_pitch_content'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='last_digest_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
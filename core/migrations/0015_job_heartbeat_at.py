@@ -0,0 +1,23 @@
+# Generated by Django 5.2.4 on 2026-10-19 04:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0014_user_last_digest_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='job',
+            name='heartbeat_at',
+            field=models.DateTimeField(blank=True, help_text='Last sign of life from the worker running the job.', null=True),
+        ),
+        # Jobs running during the upgrade count as alive since they started
+        migrations.RunSQL(
+            "UPDATE core_job SET heartbeat_at = started_at WHERE status = 'running'",
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+    ]
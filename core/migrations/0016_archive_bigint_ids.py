@@ -0,0 +1,28 @@
+# Generated by Django 5.2.4 on 2026-10-19 04:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0015_job_heartbeat_at'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='archivedoffer',
+            name='id',
+            field=models.BigIntegerField(primary_key=True, serialize=False),
+        ),
+        migrations.AlterField(
+            model_name='archivedoffer',
+            name='pitch_id',
+            field=models.BigIntegerField(db_index=True),
+        ),
+        migrations.AlterField(
+            model_name='archivedpitch',
+            name='id',
+            field=models.BigIntegerField(primary_key=True, serialize=False),
+        ),
+    ]
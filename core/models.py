@@ -1,8 +1,12 @@
 # This file defines the database structure for our application.
 
+import uuid
+
+from django.core.files.storage import FileSystemStorage
 from django.db import models
 from django.contrib.auth.models import AbstractUser
 from django.conf import settings # Use settings to reference the User model
+from django.utils import timezone
 
 class User(AbstractUser):
     """
@@ -13,7 +17,9 @@ class User(AbstractUser):
         (1, 'entrepreneur'),
         (2, 'investor'),
     )
-    user_type = models.PositiveSmallIntegerField(choices=USER_TYPE_CHOICES, null=True, blank=True)
+    user_type = models.PositiveSmallIntegerField(choices=USER_TYPE_CHOICES, null=True, blank=True, db_index=True)
+    # Activity after this time goes into the next daily digest (see core/digest.py)
+    last_digest_at = models.DateTimeField(null=True, blank=True)
 
 class EntrepreneurProfile(models.Model):
     """
@@ -23,7 +29,7 @@ class EntrepreneurProfile(models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True, related_name='entrepreneur_profile')
     company_name = models.CharField(max_length=255, blank=True)
     company_logo = models.ImageField(upload_to='company_logos/', blank=True, null=True, help_text="Upload your company's logo.")
-    industry = models.CharField(max_length=100, blank=True)
+    industry = models.CharField(max_length=100, blank=True, db_index=True)
     funding_sought = models.DecimalField(max_digits=12, decimal_places=2, null=True, blank=True)
     business_plan = models.TextField(blank=True, help_text="Provide a detailed business plan.")
     company_details = models.TextField(blank=True, null=True, help_text="Detailed information about your company, mission, and team.")
@@ -53,13 +59,30 @@ class Pitch(models.Model):
     entrepreneur = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='pitches')
     title = models.CharField(max_length=200)
     summary = models.CharField(max_length=500, help_text="A short, compelling summary of your business.")
-    details = models.TextField(help_text="Full details of your business pitch.")
     funding_amount = models.DecimalField(max_digits=12, decimal_places=2, help_text="How much funding are you asking for?")
-    created_at = models.DateTimeField(auto_now_add=True)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    class Meta:
+        indexes = [
+            # An entrepreneur's pitches, newest first (dashboard "Your Submitted Pitches")
+            models.Index(fields=['entrepreneur', '-created_at'], name='core_pitch_entrep_created_idx'),
+        ]
     
     def __str__(self):
         return f'"{self.title}" by {self.entrepreneur.username}'
     
+class PitchContent(models.Model):
+    """
+    The full details of a pitch. Kept out of the Pitch table so the list pages,
+    which only show the summary, never read these long bodies; they are loaded
+    on the pitch page only.
+    """
+    pitch = models.OneToOneField(Pitch, on_delete=models.CASCADE, primary_key=True, related_name='content')
+    details = models.TextField(help_text="Full details of your business pitch.")
+
+    def __str__(self):
+        return f"Details of pitch #{self.pitch_id}"
+
 # --- Offer Model ---
 class Offer(models.Model):
     """
@@ -74,8 +97,20 @@ class Offer(models.Model):
     investor = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='offers_made')
     amount = models.DecimalField(max_digits=12, decimal_places=2)
     message = models.TextField(blank=True, help_text="Include a personal message or terms with your offer.")
-    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
-    created_at = models.DateTimeField(auto_now_add=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending', db_index=True)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    class Meta:
+        indexes = [
+            # An investor's sent offers, newest first (investor dashboard)
+            models.Index(fields=['investor', '-created_at'], name='core_offer_inv_created_idx'),
+            # Offers received on a pitch, newest first (entrepreneur dashboard)
+            models.Index(fields=['pitch', '-created_at'], name='core_offer_pitch_created_idx'),
+            # "Has this investor already made an offer on this pitch?" (pitch detail)
+            models.Index(fields=['pitch', 'investor'], name='core_offer_pitch_investor_idx'),
+            # Offers still awaiting a response (offer state machine)
+            models.Index(fields=['pitch'], condition=models.Q(status='pending'), name='core_offer_pending_idx'),
+        ]
 
     def __str__(self):
         return f'Offer of ${self.amount} for "{self.pitch.title}" by {self.investor.username}'
@@ -88,7 +123,13 @@ class Question(models.Model):
     pitch = models.ForeignKey(Pitch, on_delete=models.CASCADE, related_name='questions')
     author = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='questions_asked')
     text = models.TextField(max_length=500)
-    created_at = models.DateTimeField(auto_now_add=True)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    class Meta:
+        indexes = [
+            # A pitch's Q&A thread and unanswered questions, newest first
+            models.Index(fields=['pitch', '-created_at'], name='core_question_pitch_idx'),
+        ]
 
     def __str__(self):
         return f"Question by {self.author.username} on '{self.pitch.title}'"
@@ -100,7 +141,208 @@ class Answer(models.Model):
     question = models.OneToOneField(Question, on_delete=models.CASCADE, related_name='answer')
     author = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='answers_given')
     text = models.TextField(max_length=1000)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    def __str__(self):
+        return f"Answer by {self.author.username} to question ID {self.question_id}"
+
+# --- Pitch Analytics Model ---
+class PitchViewStats(models.Model):
+    """
+    Daily engagement totals for a pitch.
+    Rows are written in batches by core.analytics, never once per page view.
+    """
+    pitch = models.ForeignKey(Pitch, on_delete=models.CASCADE, related_name='daily_stats')
+    date = models.DateField()
+    views = models.PositiveIntegerField(default=0)
+    questions = models.PositiveIntegerField(default=0)
+    offers = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['pitch', 'date'], name='core_pitchviewstats_pitch_date'),
+        ]
+
+    def __str__(self):
+        return f"Stats for pitch #{self.pitch_id} on {self.date}"
+
+# --- Background Job Model ---
+class Job(models.Model):
+    """
+    A unit of background work stored in the database.
+    Jobs are enqueued with core.jobs.enqueue() and executed by `manage.py runjobs`.
+    """
+    STATUS_CHOICES = (
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    )
+    job_type = models.CharField(max_length=100)
+    payload = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='queued')
+    dedupe_key = models.CharField(max_length=255, null=True, blank=True, help_text="Only one queued or running job may hold a given key.")
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=5)
+    run_after = models.DateTimeField(default=timezone.now, help_text="The job won't be picked up before this time.")
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    heartbeat_at = models.DateTimeField(null=True, blank=True, help_text="Last sign of life from the worker running the job.")
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            # Workers claim jobs with: status='queued' AND run_after <= now ORDER BY run_after
+            models.Index(fields=['status', 'run_after'], name='core_job_claim_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['dedupe_key'],
+                condition=models.Q(status__in=['queued', 'running']),
+                name='core_job_unique_active_dedupe_key',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.job_type} job #{self.id} ({self.status})"
+
+# --- Archive Models ---
+# Cold copies of rows moved out of the hot tables by core.archive.
+# They keep the original primary key so links and ids stay valid.
+
+class ArchivedPitch(models.Model):
+    """
+    A stale pitch, moved out of the Pitch table together with a snapshot
+    of its Q&A thread and its lifetime engagement totals.
+    """
+    id = models.BigIntegerField(primary_key=True)
+    entrepreneur = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='archived_pitches')
+    title = models.CharField(max_length=200)
+    summary = models.CharField(max_length=500)
+    details = models.TextField()
+    funding_amount = models.DecimalField(max_digits=12, decimal_places=2)
+    created_at = models.DateTimeField()
+    qa_thread = models.JSONField(default=list, blank=True, help_text="The questions and answers at archive time.")
+    total_views = models.PositiveIntegerField(default=0)
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['entrepreneur', '-created_at'], name='core_archpitch_entrep_idx'),
+        ]
+
+    def __str__(self):
+        return f'Archived pitch "{self.title}"'
+
+class ArchivedOffer(models.Model):
+    """
+    A rejected offer moved out of the Offer table.
+    The pitch is referenced by id only, since the pitch may be archived later too.
+    """
+    id = models.BigIntegerField(primary_key=True)
+    pitch_id = models.BigIntegerField(db_index=True)
+    pitch_title = models.CharField(max_length=200)
+    investor = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='archived_offers')
+    amount = models.DecimalField(max_digits=12, decimal_places=2)
+    message = models.TextField(blank=True)
+    status = models.CharField(max_length=10, choices=Offer.STATUS_CHOICES)
+    created_at = models.DateTimeField()
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['investor', '-created_at'], name='core_archoffer_inv_idx'),
+        ]
+
+    def __str__(self):
+        return f'Archived offer of ${self.amount} for "{self.pitch_title}"'
+
+# --- Investor Matching Models ---
+
+class InterestKeyword(models.Model):
+    """
+    One normalized keyword from an investor's investment_interests.
+    This is the reverse index (keyword -> investors) used to find the investors
+    interested in a new pitch; it is rebuilt whenever the InvestorProfile is saved.
+    """
+    keyword = models.CharField(max_length=100)
+    investor = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='interest_keywords')
+
+    class Meta:
+        constraints = [
+            # Its index (keyword first) serves the keyword__in lookup
+            models.UniqueConstraint(fields=['keyword', 'investor'], name='core_interestkeyword_unique'),
+        ]
+
+    def __str__(self):
+        return f"{self.keyword} (investor #{self.investor_id})"
+
+class PitchMatch(models.Model):
+    """
+    A new pitch that matched an investor's interests, shown on their dashboard.
+    """
+    pitch = models.ForeignKey(Pitch, on_delete=models.CASCADE, related_name='matches')
+    investor = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='pitch_matches')
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['pitch', 'investor'], name='core_pitchmatch_unique'),
+        ]
+        indexes = [
+            # An investor's matches, newest first (investor dashboard)
+            models.Index(fields=['investor', '-created_at'], name='core_pitchmatch_inv_idx'),
+        ]
+
+    def __str__(self):
+        return f"Pitch #{self.pitch_id} matched investor #{self.investor_id}"
+
+# --- Pitch Attachment Models ---
+
+def attachment_storage():
+    # Attachments live outside MEDIA_ROOT so they can only be downloaded
+    # through the access-checked view in core/attachments.py
+    return FileSystemStorage(location=settings.PITCH_ATTACHMENT_ROOT)
+
+class PitchAttachment(models.Model):
+    """
+    A file (pitch deck, demo video, ...) attached to a pitch.
+    Created by core.attachments once a chunked upload has been received in full and verified.
+    """
+    pitch = models.ForeignKey(Pitch, on_delete=models.CASCADE, related_name='attachments')
+    uploaded_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='pitch_attachments')
+    file = models.FileField(storage=attachment_storage, max_length=255)
+    filename = models.CharField(max_length=255, help_text="The name of the file on the uploader's computer.")
+    content_type = models.CharField(max_length=100)
+    size = models.PositiveBigIntegerField()
+    sha256 = models.CharField(max_length=64)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['pitch', 'created_at'], name='core_attachment_pitch_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.filename} on pitch #{self.pitch_id}'
+
+class AttachmentUpload(models.Model):
+    """
+    An attachment upload in progress. The client sends the file in chunks;
+    `received` is how many bytes have been written so far, so an interrupted
+    upload resumes from there instead of starting over.
+    """
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    pitch = models.ForeignKey(Pitch, on_delete=models.CASCADE, related_name='attachment_uploads')
+    uploaded_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='attachment_uploads')
+    filename = models.CharField(max_length=255)
+    content_type = models.CharField(max_length=100)
+    size = models.PositiveBigIntegerField()
+    sha256 = models.CharField(max_length=64, blank=True, help_text="Checksum declared by the client, verified once the last chunk arrives.")
+    received = models.PositiveBigIntegerField(default=0)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
 
     def __str__(self):
-        return f"Answer by {self.author.username} to question ID {self.question.id}"
+        return f'Upload of {self.filename} ({self.received}/{self.size} bytes)'
@@ -0,0 +1,40 @@
+# This file contains paginators for very large tables.
+
+from django.core.paginator import Paginator
+from django.db import connections
+from django.utils.functional import cached_property
+
+class EstimatedCountPaginator(Paginator):
+    """
+    A paginator that avoids SELECT COUNT(*) over a whole table.
+
+    For unfiltered querysets on PostgreSQL it reads the planner's row estimate
+    (pg_class.reltuples, kept up to date by autovacuum/ANALYZE). Filtered
+    querysets, small tables and other databases fall back to an exact count.
+    """
+    # Below this estimate an exact count is cheap enough to just run
+    exact_count_threshold = 10000
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        query = getattr(queryset, 'query', None)
+        if query is None or query.where or query.distinct:
+            return super().count
+
+        connection = connections[queryset.db]
+        if connection.vendor != 'postgresql':
+            return super().count
+
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass",
+                [queryset.model._meta.db_table],
+            )
+            row = cursor.fetchone()
+        estimate = row[0] if row else -1
+
+        # reltuples is -1 for tables that have never been analyzed
+        if estimate < self.exact_count_threshold:
+            return super().count
+        return estimate
@@ -0,0 +1,402 @@
+# This file implements an on-demand sampling profiler for single requests and
+# websocket messages.
+#
+# A request is profiled when PROFILING_ENABLED is on and one of these holds:
+#
+#   - a staff user sends an `X-Profile: 1` header or a `?profile=1` parameter,
+#   - the `X-Profile-Token` header or `?profile_token=` parameter matches
+#     PROFILING_TOKEN (to replay a slow request with another user's session),
+#   - the request is picked at random by PROFILING_SAMPLE_RATE, optionally only
+#     for the users in PROFILING_USER_IDS.
+#
+# While a request is profiled, a daemon thread samples the stack of the thread
+# handling it every PROFILING_INTERVAL_MS, and every SQL query is timed.
+# Websocket messages are handled on the event loop alongside every other
+# socket, so for them only the queries and the duration are recorded. The
+# result is saved under PROFILING_ROOT as a speedscope file (https://speedscope.app):
+# the stacks as a sampled profile and the queries as an evented "SQL" timeline.
+# Staff browse the profiles at /monitoring/profiles/ and download them as
+# speedscope JSON or as collapsed stacks for flamegraph.pl.
+#
+# PROFILING_ENABLED is off by default. Then the middleware removes itself and no database hook is
+# installed, so there is no overhead at all. With it on, requests that are not
+# profiled pay for a header check and one context variable lookup per query.
+
+import json
+import logging
+import random
+import secrets
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import asynccontextmanager, contextmanager, nullcontext
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from pathlib import Path
+from urllib.parse import parse_qs
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.admin.views.decorators import staff_member_required
+from django.core.exceptions import MiddlewareNotUsed
+from django.db.backends.signals import connection_created
+from django.http import FileResponse, Http404, HttpResponse
+from django.shortcuts import render
+from django.urls import reverse
+from django.utils.crypto import constant_time_compare
+
+logger = logging.getLogger(__name__)
+
+# The profile being recorded by the current request or consumer message, if any.
+# Context variables follow sync_to_async, so queries run by database_sync_to_async
+# in a worker thread are still attributed to the consumer's profile.
+_active = ContextVar('active_profile', default=None)
+
+# Longest SQL statement kept in the timeline
+MAX_SQL_LENGTH = 1000
+
+# --- Recording ---
+
+class Sampler:
+    """
+    Records the stack of one thread every `interval` seconds, from a daemon thread.
+    Each sample is (perf_counter time, tuple of code objects, outermost first).
+    """
+    def __init__(self, thread_id, interval, max_samples):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.max_samples = max_samples
+        self.samples = []
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='profiler-sampler', daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval) and len(self.samples) < self.max_samples:
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                stack.append(frame.f_code)
+                frame = frame.f_back
+            stack.reverse()
+            self.samples.append((time.perf_counter(), tuple(stack)))
+
+class Profile:
+    """
+    One profiled request or message: its sampled stacks and SQL timeline.
+    """
+    def __init__(self, name, meta):
+        now = datetime.now(timezone.utc)
+        self.id = now.strftime('%Y%m%d-%H%M%S-%f-') + secrets.token_hex(2)
+        self.name = name
+        self.meta = {'id': self.id, 'name': name, 'started_at': now.isoformat(timespec='seconds'), **meta}
+        self.queries = []  # (perf_counter start, seconds, sql)
+        self.samples = []
+        self.started = time.perf_counter()
+        self.ended = None
+
+    def record_query(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries.append((started, time.perf_counter() - started, sql))
+
+    def to_speedscope(self):
+        """
+        The profile in speedscope's file format: a sampled profile of the stacks
+        and an evented profile with one event per query.
+        """
+        frames, frame_ids = [], {}
+
+        def frame_id(key, frame):
+            if key not in frame_ids:
+                frame_ids[key] = len(frames)
+                frames.append(frame)
+            return frame_ids[key]
+
+        def code_frame(code):
+            name = getattr(code, 'co_qualname', code.co_name)
+            return frame_id(code, {'name': name, 'file': _short_path(code.co_filename), 'line': code.co_firstlineno})
+
+        def ms(at):
+            return round((at - self.started) * 1000, 3)
+
+        stacks, weights, previous = [], [], self.started
+        for at, stack in self.samples:
+            stacks.append([code_frame(code) for code in stack])
+            # Each sample stands for the time since the one before it
+            weights.append(round((at - previous) * 1000, 3))
+            previous = at
+
+        events, last_close = [], 0
+        for started, duration, sql in sorted(self.queries):
+            frame = frame_id(('sql', sql[:MAX_SQL_LENGTH]), {'name': sql[:MAX_SQL_LENGTH]})
+            # Evented profiles must nest; queries on one connection never overlap, so just clamp rounding
+            opened = max(ms(started), last_close)
+            last_close = max(opened, ms(started + duration))
+            events += [{'type': 'O', 'frame': frame, 'at': opened}, {'type': 'C', 'frame': frame, 'at': last_close}]
+
+        end = ms(self.ended)
+        return {
+            '$schema': 'https://www.speedscope.app/file-format-schema.json',
+            'name': self.name,
+            'exporter': 'invent',
+            'activeProfileIndex': 0,
+            'shared': {'frames': frames},
+            'profiles': [
+                {
+                    'type': 'sampled', 'name': self.name, 'unit': 'milliseconds',
+                    'startValue': 0, 'endValue': end, 'samples': stacks, 'weights': weights,
+                },
+                {
+                    'type': 'evented', 'name': 'SQL', 'unit': 'milliseconds',
+                    'startValue': 0, 'endValue': max(end, last_close), 'events': events,
+                },
+            ],
+        }
+
+    def save(self):
+        self.meta.update({
+            'duration_ms': round((self.ended - self.started) * 1000, 1),
+            'samples': len(self.samples),
+            'queries': len(self.queries),
+            'sql_ms': round(sum(duration for _, duration, _ in self.queries) * 1000, 1),
+        })
+        root = Path(settings.PROFILING_ROOT)
+        root.mkdir(parents=True, exist_ok=True)
+        (root / f'{self.id}.speedscope.json').write_text(json.dumps(self.to_speedscope()))
+        (root / f'{self.id}.meta.json').write_text(json.dumps(self.meta))
+        prune_profiles(root)
+
+def _short_path(filename):
+    base = str(settings.BASE_DIR)
+    if filename.startswith(base):
+        return filename[len(base):].lstrip('/\\')
+    if 'site-packages' in filename:
+        return filename.rsplit('site-packages', 1)[1].lstrip('/\\')
+    return filename
+
+def _time_query(execute, sql, params, many, context):
+    profile = _active.get()
+    if profile is None:
+        return execute(sql, params, many, context)
+    return profile.record_query(execute, sql, params, many, context)
+
+def _install_query_hook(sender, connection, **kwargs):
+    # Sent again on every reconnect of the same connection object
+    if _time_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_time_query)
+
+def install():
+    """
+    Times the queries of every database connection opened from now on while a
+    profile is active. Called from CoreConfig.ready() when PROFILING_ENABLED is on.
+    """
+    connection_created.connect(_install_query_hook, dispatch_uid='core.profiling')
+
+@contextmanager
+def profiled(name, **meta):
+    """
+    Samples the current thread and times its queries for the duration of the block,
+    then saves the profile. Yields the Profile so callers can add to its meta.
+    """
+    profile = Profile(name, meta)
+    sampler = Sampler(threading.get_ident(), settings.PROFILING_INTERVAL_MS / 1000, settings.PROFILING_MAX_SAMPLES)
+    token = _active.set(profile)
+    sampler.start()
+    try:
+        yield profile
+    finally:
+        sampler.stop()
+        _active.reset(token)
+        profile.ended = time.perf_counter()
+        profile.samples = sampler.samples
+        try:
+            profile.save()
+        except OSError:
+            logger.exception("Saving profile %s failed.", profile.id)
+
+@asynccontextmanager
+async def aprofiled(name, **meta):
+    """
+    profiled() for coroutines. The event loop's thread runs other coroutines
+    between awaits, so its stack is not sampled: the profile holds the queries
+    (attributed through the context variable, which each task has its own copy
+    of) and the duration. The profile is saved from a worker thread, so the
+    file writes never block the event loop.
+    """
+    profile = Profile(name, meta)
+    token = _active.set(profile)
+    try:
+        yield profile
+    finally:
+        _active.reset(token)
+        profile.ended = time.perf_counter()
+        try:
+            await sync_to_async(profile.save, thread_sensitive=False)()
+        except OSError:
+            logger.exception("Saving profile %s failed.", profile.id)
+
+def wants_profile(get_user, flag, token):
+    """
+    Whether to profile a request. `get_user` is only called when the answer
+    depends on the user, so unprofiled requests never load it.
+    """
+    if flag:
+        user = get_user()
+        if user is not None and user.is_staff:
+            return True
+    if token and settings.PROFILING_TOKEN and constant_time_compare(token, settings.PROFILING_TOKEN):
+        return True
+    if settings.PROFILING_SAMPLE_RATE and random.random() < settings.PROFILING_SAMPLE_RATE:
+        if not settings.PROFILING_USER_IDS:
+            return True
+        user = get_user()
+        return user is not None and user.id in settings.PROFILING_USER_IDS
+    return False
+
+# --- Storage ---
+
+def prune_profiles(root):
+    """
+    Keeps the newest PROFILING_MAX_PROFILES profiles. Profile ids sort by time.
+    """
+    stale = sorted(root.glob('*.meta.json'))[:-settings.PROFILING_MAX_PROFILES]
+    for meta_path in stale:
+        profile_id = meta_path.name[:-len('.meta.json')]
+        for path in (meta_path, root / f'{profile_id}.speedscope.json'):
+            path.unlink(missing_ok=True)
+
+def saved_profiles():
+    """
+    The meta of every saved profile, newest first.
+    """
+    root = Path(settings.PROFILING_ROOT)
+    profiles = []
+    for meta_path in sorted(root.glob('*.meta.json'), reverse=True):
+        try:
+            profiles.append(json.loads(meta_path.read_text()))
+        except (OSError, ValueError):
+            continue  # Pruned or half-written by another process
+    return profiles
+
+def collapsed_stacks(speedscope):
+    """
+    The sampled profile as collapsed stacks ("outer;inner;leaf count" per line),
+    the input format of flamegraph.pl and many other flame graph tools.
+    """
+    frames = speedscope['shared']['frames']
+    names = [f"{frame['name']} ({frame.get('file', '')}:{frame.get('line', '')})".replace(';', ':') for frame in frames]
+    counts = Counter(';'.join(names[index] for index in stack) for stack in speedscope['profiles'][0]['samples'])
+    return ''.join(f'{stack} {count}\n' for stack, count in counts.items() if stack)
+
+# --- HTTP ---
+
+class ProfilingMiddleware:
+    """
+    Profiles the requests picked by wants_profile() and adds an X-Profile header
+    with the profile's URL to their responses. Must come after AuthenticationMiddleware.
+    """
+    def __init__(self, get_response):
+        if not settings.PROFILING_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        flag = request.headers.get('X-Profile') == '1' or request.GET.get('profile') == '1'
+        token = request.headers.get('X-Profile-Token') or request.GET.get('profile_token')
+        if not wants_profile(lambda: request.user, flag, token):
+            return self.get_response(request)
+
+        params = request.GET.copy()
+        params.pop('profile_token', None)
+        path = request.path + ('?' + params.urlencode() if params else '')
+        with profiled(f'{request.method} {path}', method=request.method, path=path) as profile:
+            response = self.get_response(request)
+            profile.meta['status'] = response.status_code
+            profile.meta['user_id'] = request.user.id
+        response['X-Profile'] = reverse('profile_detail', args=[profile.id])
+        return response
+
+@staff_member_required
+def profile_list_view(request):
+    """
+    The saved profiles, newest first.
+    """
+    return render(request, 'monitoring/profiles.html', {'profiles': saved_profiles()})
+
+@staff_member_required
+def profile_detail_view(request, profile_id):
+    """
+    One profile's SQL timeline and hottest functions, with download links.
+    ?format=speedscope or ?format=collapsed downloads the profile itself.
+    """
+    root = Path(settings.PROFILING_ROOT)
+    path = root / f'{profile_id}.speedscope.json'
+    if not path.is_file():
+        raise Http404("No such profile.")
+
+    file_format = request.GET.get('format')
+    if file_format == 'speedscope':
+        return FileResponse(open(path, 'rb'), as_attachment=True, filename=path.name, content_type='application/json')
+
+    speedscope = json.loads(path.read_text())
+    if file_format == 'collapsed':
+        response = HttpResponse(collapsed_stacks(speedscope), content_type='text/plain; charset=utf-8')
+        response['Content-Disposition'] = f'attachment; filename="{profile_id}.collapsed.txt"'
+        return response
+
+    frames = speedscope['shared']['frames']
+    sampled, sql = speedscope['profiles']
+    # Self time: the weight of each sample goes to its innermost frame
+    self_time = Counter()
+    for stack, weight in zip(sampled['samples'], sampled['weights']):
+        if stack:
+            self_time[stack[-1]] += weight
+    hottest = [
+        {'frame': frames[index], 'ms': round(ms, 1), 'share': ms / sampled['endValue'] * 100 if sampled['endValue'] else 0}
+        for index, ms in self_time.most_common(25)
+    ]
+    events = sql['events']
+    queries = [
+        {'at': opened['at'], 'ms': round(closed['at'] - opened['at'], 3), 'sql': frames[opened['frame']]['name']}
+        for opened, closed in zip(events[::2], events[1::2])
+    ]
+    meta = json.loads((root / f'{profile_id}.meta.json').read_text())
+    return render(request, 'monitoring/profile_detail.html', {'profile': meta, 'hottest': hottest, 'queries': queries})
+
+# --- Websockets ---
+
+class ProfiledConsumerMixin:
+    """
+    Mixin for async websocket consumers. Wrap the handling of an incoming
+    message in `async with self.profiled_message('name'):`. Every message is
+    profiled on a socket opened by a staff user with ?profile=1 or with a valid
+    ?profile_token=; otherwise messages are picked by PROFILING_SAMPLE_RATE.
+
+    Messages are recorded with aprofiled(): the SQL timeline of the queries run
+    through database_sync_to_async and the message's duration, without stack
+    samples, since the event loop's stack belongs to every socket at once.
+    """
+    def profiled_message(self, name):
+        if not settings.PROFILING_ENABLED:
+            return nullcontext()
+        user = self.scope.get('user')
+        if not hasattr(self, '_profile_socket'):
+            params = parse_qs(self.scope.get('query_string', b'').decode())
+            flag = params.get('profile', [''])[0] == '1'
+            token = params.get('profile_token', [''])[0]
+            self._profile_socket = (flag and user is not None and user.is_staff) or bool(
+                token and settings.PROFILING_TOKEN and constant_time_compare(token, settings.PROFILING_TOKEN)
+            )
+        if not self._profile_socket and not wants_profile(lambda: user, False, None):
+            return nullcontext()
+        return aprofiled(f"WS {self.scope.get('path', '')} {name}", path=self.scope.get('path', ''), user_id=getattr(user, 'id', None))
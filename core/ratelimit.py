@@ -0,0 +1,212 @@
+# This file implements per-client rate limiting for expensive routes and websocket sends.
+#
+# Limits are configured in settings.RATE_LIMITS as named rules:
+#
+#     RATE_LIMITS = {
+#         'search': {'rate': 1.0, 'burst': 20},   # 1 request/second, bursts of up to 20
+#     }
+#     RATE_LIMITED_ROUTES = {'search_results': 'search'}   # URL name -> rule
+#
+# Each client (the user id, or the IP address for anonymous visitors) gets its
+# own bucket per rule. RateLimitMiddleware applies rules to HTTP routes and
+# RateLimitedConsumerMixin applies them to websocket consumers.
+
+import threading
+import time
+from collections import Counter
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse, JsonResponse
+from django.contrib.admin.views.decorators import staff_member_required
+
+# Websocket close code sent when a client exceeds its limit (4000-4999 are application codes)
+WEBSOCKET_RATE_LIMIT_CLOSE_CODE = 4429
+
+# --- Backends ---
+
+class MemoryBackend:
+    """
+    Classic token buckets kept in this process. Fast and exact, but each worker
+    process enforces its own limit.
+    """
+    # Once this many buckets exist, idle (full) buckets are dropped
+    MAX_BUCKETS = 10000
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._buckets = {}
+        self._stats = Counter()
+
+    def hit(self, key, rate, burst):
+        """
+        Takes one token from the bucket. Returns (allowed, retry_after_seconds).
+        """
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated, _ = self._buckets.get(key, (burst, now, now))
+            tokens = min(burst, tokens + (now - updated) * rate)
+            if len(self._buckets) >= self.MAX_BUCKETS:
+                self._prune(now)
+            allowed = tokens >= 1
+            if allowed:
+                tokens -= 1
+            # Remember when the bucket will be full again so idle buckets can be pruned
+            self._buckets[key] = (tokens, now, now + (burst - tokens) / rate)
+            return allowed, 0 if allowed else (1 - tokens) / rate
+
+    def _prune(self, now):
+        self._buckets = {key: bucket for key, bucket in self._buckets.items() if bucket[2] > now}
+
+    def incr_stat(self, rule, outcome):
+        with self._lock:
+            self._stats[(rule, outcome)] += 1
+
+    def get_stats(self, rules):
+        with self._lock:
+            return {rule: {'allowed': self._stats[(rule, 'allowed')], 'rejected': self._stats[(rule, 'rejected')]} for rule in rules}
+
+def _incr(key, timeout):
+    """
+    Atomically adds one to a cache counter, creating it if needed.
+    """
+    # add() is a no-op if the key exists, then incr() is atomic
+    cache.add(key, 0, timeout=timeout)
+    try:
+        return cache.incr(key)
+    except ValueError:
+        # The key expired (or was evicted) between add() and incr()
+        if cache.add(key, 1, timeout=timeout):
+            return 1
+        return cache.incr(key)
+
+class CacheBackend:
+    """
+    Buckets shared by every process through the Django cache (Redis in production).
+
+    The cache API only offers atomic increments, not compare-and-set, so the
+    bucket is modelled as a sliding window: requests are counted with incr() in
+    windows of burst / rate seconds, and the previous window's count is decayed
+    linearly. This admits bursts of up to `burst` requests and a sustained `rate`
+    per second, like a token bucket, without any read-modify-write races.
+    """
+    def hit(self, key, rate, burst):
+        window = burst / rate
+        now = time.time()
+        current_window = int(now // window)
+        elapsed = (now % window) / window
+
+        current_key = f'ratelimit:{key}:{current_window}'
+        previous_key = f'ratelimit:{key}:{current_window - 1}'
+
+        count = _incr(current_key, timeout=int(window * 2) + 1)
+        previous = cache.get(previous_key, 0)
+
+        used = previous * (1 - elapsed) + count
+        if used <= burst:
+            return True, 0
+        return False, window * (1 - elapsed)
+
+    def incr_stat(self, rule, outcome):
+        _incr(f'ratelimit:stats:{rule}:{outcome}', timeout=None)
+
+    def get_stats(self, rules):
+        keys = [f'ratelimit:stats:{rule}:{outcome}' for rule in rules for outcome in ('allowed', 'rejected')]
+        values = cache.get_many(keys)
+        return {
+            rule: {outcome: values.get(f'ratelimit:stats:{rule}:{outcome}', 0) for outcome in ('allowed', 'rejected')}
+            for rule in rules
+        }
+
+# --- Limiter ---
+
+class RateLimiter:
+    def __init__(self, backend):
+        self.backend = backend
+
+    def check(self, rule_name, client_id):
+        """
+        Counts one request from `client_id` against `rule_name`.
+        Returns (allowed, retry_after_seconds).
+        """
+        rule = settings.RATE_LIMITS[rule_name]
+        allowed, retry_after = self.backend.hit(f'{rule_name}:{client_id}', rule['rate'], rule['burst'])
+        self.backend.incr_stat(rule_name, 'allowed' if allowed else 'rejected')
+        return allowed, retry_after
+
+    def stats(self):
+        return self.backend.get_stats(list(settings.RATE_LIMITS))
+
+def _make_limiter():
+    backend = getattr(settings, 'RATELIMIT_BACKEND', 'memory')
+    return RateLimiter(CacheBackend() if backend == 'cache' else MemoryBackend())
+
+limiter = _make_limiter()
+
+def client_id_for(user, ip_address):
+    """
+    Logged-in users are limited per account, everyone else per IP address.
+    """
+    if user is not None and user.is_authenticated:
+        return f'user:{user.id}'
+    return f'ip:{ip_address}'
+
+def get_client_ip(request):
+    if getattr(settings, 'RATELIMIT_TRUST_X_FORWARDED_FOR', False):
+        forwarded = request.META.get('HTTP_X_FORWARDED_FOR')
+        if forwarded:
+            return forwarded.split(',')[0].strip()
+    return request.META.get('REMOTE_ADDR', '')
+
+# --- HTTP ---
+
+class RateLimitMiddleware:
+    """
+    Applies the rule mapped to the matched URL name in settings.RATE_LIMITED_ROUTES
+    and answers with 429 Too Many Requests when the client is over its limit.
+    Must come after AuthenticationMiddleware.
+    """
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        return self.get_response(request)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        rule_name = settings.RATE_LIMITED_ROUTES.get(request.resolver_match.view_name)
+        if rule_name is None:
+            return None
+
+        allowed, retry_after = limiter.check(rule_name, client_id_for(request.user, get_client_ip(request)))
+        if allowed:
+            return None
+
+        response = HttpResponse("Too many requests. Please slow down.", status=429)
+        response['Retry-After'] = str(max(int(retry_after + 0.999), 1))
+        return response
+
+@staff_member_required
+def rate_limit_stats_view(request):
+    """
+    Allowed/rejected counts per rule, for monitoring.
+    """
+    return JsonResponse(limiter.stats())
+
+# --- Websockets ---
+
+class RateLimitedConsumerMixin:
+    """
+    Mixin for websocket consumers. Call `await self.allow_rate_limited()` before
+    doing work for an incoming message; when the client is over the limit the
+    socket is closed with WEBSOCKET_RATE_LIMIT_CLOSE_CODE and False is returned.
+    """
+    rate_limit_rule = None
+
+    async def allow_rate_limited(self):
+        user = self.scope.get('user')
+        client = self.scope.get('client') or ('', None)
+        allowed, _ = await sync_to_async(limiter.check)(self.rate_limit_rule, client_id_for(user, client[0]))
+        if not allowed:
+            await self.close(code=WEBSOCKET_RATE_LIMIT_CLOSE_CODE)
+        return allowed
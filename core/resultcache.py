@@ -0,0 +1,155 @@
+# This file caches the results of pitch and investor searches as ordered id lists.
+#
+# A search (the text box on /search/, or the keyword and industry filters of the
+# investor dashboard) is looked up by its normalized query text and filters. On a
+# miss the ids of the matching rows are computed and stored; on a hit the rows
+# are loaded with a single in_bulk() query, in the cached order. Searches with
+# more than RESULT_CACHE_MAX_IDS matches are left to the database: loading that
+# many rows by id is slower than running the search again.
+#
+# Every key includes the "corpus version", a counter in the cache that the
+# signal handlers in core/signals.py bump after any committed write to the
+# searched models. A bump makes every older entry unreachable (they expire after
+# RESULT_CACHE_TIMEOUT), so a search never returns rows from before a change.
+#
+# Like the rest of CACHES, entries and the version are shared between processes
+# only with Redis; with the local-memory cache each process keeps its own.
+
+import hashlib
+import threading
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.contrib.admin.views.decorators import staff_member_required
+from django.core.cache import cache
+from django.db import transaction
+from django.http import JsonResponse
+
+VERSION_KEY = 'resultcache:version'
+
+_lock = threading.Lock()
+_stats = Counter()
+
+def normalize_query(text):
+    """
+    Collapses whitespace and lowercases, so "  FinTech " and "fintech" share an
+    entry. Searches run with the normalized text, which the case-insensitive
+    filters treat the same as the original.
+    """
+    return ' '.join(text.split()).lower()
+
+# --- Corpus version ---
+
+def corpus_version():
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        # A fresh (or evicted) counter starts from the clock, above any version used before
+        cache.add(VERSION_KEY, time.time_ns() // 1000, timeout=None)
+        version = cache.get(VERSION_KEY)
+    return version
+
+def _bump():
+    try:
+        cache.incr(VERSION_KEY)
+    except ValueError:
+        corpus_version()
+
+def bump_corpus_version():
+    """
+    Invalidates every cached result once the current transaction commits.
+    Bumping earlier would let a search running alongside the write cache the
+    old rows under the new version.
+    """
+    transaction.on_commit(_bump)
+
+# --- Lookups ---
+
+# Cached in place of the ids when a search matches more than RESULT_CACHE_MAX_IDS rows
+TOO_MANY = 'too-many'
+
+def _key(kind, params):
+    digest = hashlib.blake2b(repr(sorted(params.items())).encode(), digest_size=16).hexdigest()
+    return f'resultcache:{corpus_version()}:{kind}:{digest}'
+
+def cached_result(kind, params, compute):
+    """
+    Returns the cached result of the `kind` lookup with `params` (a dict of
+    normalized filters), or calls compute() and caches what it returns.
+    """
+    if not settings.RESULT_CACHE_TIMEOUT:
+        return compute()
+    key = _key(kind, params)
+    result = cache.get(key)
+    if result is not None:
+        _count(kind, 'hits')
+        return result
+    _count(kind, 'misses')
+    result = compute()
+    cache.set(key, result, settings.RESULT_CACHE_TIMEOUT)
+    return result
+
+def cached_search(kind, params, matching, rows):
+    """
+    The rows a search matches, in order. `matching` is the search's queryset
+    (filtered and ordered); its ids are cached under `kind` and `params`, and
+    the rows are loaded from `rows` with one in_bulk() query.
+
+    Loading rows by id costs more per row than the search's own query, so
+    searches matching more than RESULT_CACHE_MAX_IDS rows are only remembered
+    as too large, and `matching` itself is returned for them.
+    """
+    if not settings.RESULT_CACHE_TIMEOUT:
+        return matching
+    limit = settings.RESULT_CACHE_MAX_IDS
+    key = _key(kind, params)
+    ids = cache.get(key)
+    if ids is None:
+        _count(kind, 'misses')
+        ids = list(matching.values_list('pk', flat=True)[:limit + 1])
+        if len(ids) > limit:
+            ids = TOO_MANY
+        cache.set(key, ids, settings.RESULT_CACHE_TIMEOUT)
+    elif ids == TOO_MANY:
+        _count(kind, 'too_many')
+    else:
+        _count(kind, 'hits')
+    return matching if ids == TOO_MANY else hydrate(rows, ids)
+
+def hydrate(queryset, ids):
+    """
+    Loads the rows for `ids` with one in_bulk() query, in the order of `ids`.
+    Rows deleted since the ids were cached are skipped.
+    """
+    rows = queryset.in_bulk(ids)
+    return [rows[pk] for pk in ids if pk in rows]
+
+# --- Metrics ---
+
+def _count(kind, outcome):
+    with _lock:
+        _stats[(kind, outcome)] += 1
+
+def stats():
+    with _lock:
+        counts = dict(_stats)
+    kinds = sorted({kind for kind, _ in counts})
+    report = {'version': corpus_version(), 'kinds': {}}
+    for kind in kinds:
+        hits, misses, too_many = (counts.get((kind, outcome), 0) for outcome in ('hits', 'misses', 'too_many'))
+        lookups = hits + misses + too_many
+        report['kinds'][kind] = {
+            'hits': hits,
+            'misses': misses,
+            # Repeats of searches too large to cache, answered by the database
+            'too_many': too_many,
+            'hit_rate': round(hits / lookups, 3) if lookups else None,
+        }
+    return report
+
+@staff_member_required
+def result_cache_stats_view(request):
+    """
+    Hit rates per kind of search in this process, for monitoring.
+    """
+    return JsonResponse(stats())
@@ -0,0 +1,94 @@
+# This file contains business logic that changes several models at once.
+# Views call into these functions so that the rules live in one place.
+
+from django.db import transaction
+from .models import Offer
+from chat.models import Conversation
+from chat import notifications
+
+# --- Offer State Machine ---
+
+# Which statuses an offer may move to from its current status.
+# Accepted and rejected offers are final.
+OFFER_TRANSITIONS = {
+    'pending': {'accepted', 'rejected'},
+    'accepted': set(),
+    'rejected': set(),
+}
+
+class InvalidOfferTransition(Exception):
+    """
+    Raised when an offer is asked to move to a status it cannot reach.
+    """
+    pass
+
+def respond_to_offers(entrepreneur, offer_ids, new_status):
+    """
+    Accepts or rejects many offers in a single transaction.
+
+    Only offers on the entrepreneur's own pitches that are still allowed to
+    move to `new_status` are changed; everything else is ignored. The rows are
+    locked with SELECT ... FOR UPDATE so two concurrent responses can't both act
+    on the same offer. Conversations (and their participants) for accepted offers
+    are created with bulk_create.
+
+    Returns the list of offers that were transitioned.
+    """
+    if new_status not in OFFER_TRANSITIONS:
+        raise InvalidOfferTransition(f"Unknown offer status '{new_status}'.")
+
+    from_statuses = [status for status, targets in OFFER_TRANSITIONS.items() if new_status in targets]
+
+    with transaction.atomic():
+        # of=('self',) locks only the offer rows, not the joined pitch rows
+        offers = list(
+            Offer.objects.select_for_update(of=('self',))
+            .select_related('pitch__entrepreneur', 'investor')
+            .filter(id__in=offer_ids, pitch__entrepreneur=entrepreneur, status__in=from_statuses)
+            .order_by('id')
+        )
+        if not offers:
+            return []
+
+        offer_ids = [offer.id for offer in offers]
+        Offer.objects.filter(id__in=offer_ids).update(status=new_status)
+        for offer in offers:
+            offer.status = new_status
+
+        if new_status == 'accepted':
+            _create_conversations(offers)
+
+        # QuerySet.update() skips post_save, so publish the dashboard events here
+        for offer in offers:
+            notifications.offer_status_changed(offer)
+
+    return offers
+
+def _create_conversations(offers):
+    """
+    Creates a conversation between the entrepreneur and the investor for each
+    offer that doesn't already have one, using one insert per table.
+    """
+    existing = set(
+        Conversation.objects.filter(offer__in=offers).values_list('offer_id', flat=True)
+    )
+    new_offers = {offer.id: offer for offer in offers if offer.id not in existing}
+    if not new_offers:
+        return
+
+    conversations = Conversation.objects.bulk_create([Conversation(offer=offer) for offer in new_offers.values()])
+
+    # Some databases (e.g. MySQL) don't return primary keys from bulk_create, so read the rows back
+    if any(conversation.pk is None for conversation in conversations):
+        conversations = list(Conversation.objects.filter(offer_id__in=new_offers))
+
+    Participant = Conversation.participants.through
+    participants = []
+    for conversation in conversations:
+        offer = new_offers[conversation.offer_id]
+        participants.append(Participant(conversation_id=conversation.pk, user_id=offer.pitch.entrepreneur_id))
+        participants.append(Participant(conversation_id=conversation.pk, user_id=offer.investor_id))
+    Participant.objects.bulk_create(participants, ignore_conflicts=True)
+
+    for conversation in conversations:
+        notifications.conversation_created(conversation, new_offers[conversation.offer_id])
@@ -0,0 +1,109 @@
+# This file contains signal handlers that keep cached data in sync with the database
+# and publish live dashboard events.
+
+from django.core.cache import cache
+from django.core.cache.utils import make_template_fragment_key
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from .models import User, EntrepreneurProfile, InvestorProfile, Pitch, PitchContent, Offer, Question, Answer, PitchAttachment, AttachmentUpload
+from chat.models import Conversation
+from chat import notifications
+from .analytics import record_event
+from .jobs import enqueue
+from .matching import sync_investor_keywords
+from .attachments import partial_path
+from .resultcache import bump_corpus_version
+
+# Name of the {% cache %} fragment wrapping the Q&A thread in pitch_detail.html
+QA_THREAD_FRAGMENT = 'pitch_qa_thread'
+
+def invalidate_qa_thread(pitch_id):
+    """
+    Drops the cached Q&A thread for a pitch so the next page view re-renders it.
+    """
+    cache.delete(make_template_fragment_key(QA_THREAD_FRAGMENT, [pitch_id]))
+
+@receiver([post_save, post_delete], sender=Question)
+def question_changed(sender, instance, **kwargs):
+    invalidate_qa_thread(instance.pitch_id)
+
+@receiver([post_save, post_delete], sender=Answer)
+def answer_changed(sender, instance, **kwargs):
+    # Look up the pitch id without loading the whole question row
+    pitch_id = Question.objects.filter(id=instance.question_id).values_list('pitch_id', flat=True).first()
+    if pitch_id is not None:
+        invalidate_qa_thread(pitch_id)
+
+# --- Search result cache ---
+
+@receiver([post_save, post_delete], sender=Pitch)
+@receiver([post_save, post_delete], sender=PitchContent)
+@receiver([post_save, post_delete], sender=EntrepreneurProfile)
+@receiver([post_save, post_delete], sender=InvestorProfile)
+def search_corpus_changed(sender, **kwargs):
+    # Every cached search result is dropped; see core/resultcache.py
+    bump_corpus_version()
+
+@receiver([post_save, post_delete], sender=User)
+def investor_changed(sender, instance, update_fields=None, **kwargs):
+    # Investors are searched by name; logins (which only save last_login) don't count
+    if instance.user_type == 2 and update_fields != frozenset({'last_login'}):
+        bump_corpus_version()
+
+# --- Live dashboard events ---
+
+@receiver(post_save, sender=Offer)
+def offer_saved(sender, instance, created, **kwargs):
+    if created:
+        notifications.offer_created(instance)
+        record_event(instance.pitch_id, 'offers')
+    else:
+        notifications.offer_status_changed(instance)
+
+@receiver(post_save, sender=Question)
+def question_saved(sender, instance, created, **kwargs):
+    if created:
+        notifications.question_created(instance)
+        record_event(instance.pitch_id, 'questions')
+
+@receiver(post_save, sender=Answer)
+def answer_saved(sender, instance, created, **kwargs):
+    if created:
+        notifications.question_answered(instance)
+
+@receiver(post_save, sender=Conversation)
+def conversation_saved(sender, instance, created, **kwargs):
+    if created:
+        notifications.conversation_created(instance, instance.offer)
+
+# --- Investor matching ---
+
+@receiver(post_save, sender=InvestorProfile)
+def investor_profile_saved(sender, instance, **kwargs):
+    # Keep the keyword -> investor reverse index in step with the interests
+    sync_investor_keywords(instance.user_id, instance.investment_interests)
+
+@receiver(post_delete, sender=InvestorProfile)
+def investor_profile_deleted(sender, instance, **kwargs):
+    sync_investor_keywords(instance.user_id, '')
+
+@receiver(post_save, sender=Pitch)
+def pitch_saved(sender, instance, created, **kwargs):
+    if created:
+        # Matching investors are notified by a background job, off the request path
+        enqueue('match_pitch_to_investors', {'pitch_id': instance.id}, dedupe_key=f'match_pitch:{instance.id}')
+
+# --- Attachment files ---
+
+@receiver(post_delete, sender=PitchAttachment)
+def attachment_deleted(sender, instance, **kwargs):
+    # Only remove the file once the row is really gone
+    storage, name = instance.file.storage, instance.file.name
+    transaction.on_commit(lambda: storage.delete(name))
+
+@receiver(post_delete, sender=AttachmentUpload)
+def attachment_upload_deleted(sender, instance, **kwargs):
+    # Also covers uploads removed with their pitch; a finished upload's file has been renamed away
+    path = partial_path(instance)
+    transaction.on_commit(lambda: path.unlink(missing_ok=True))
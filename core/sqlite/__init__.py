@@ -0,0 +1,2 @@
+# SQLite database backend for production use under concurrent requests.
+# See base.py; selected in settings.py when DATABASE_URL points at SQLite.
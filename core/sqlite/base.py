@@ -0,0 +1,236 @@
+# This file is Django's SQLite backend with every write queued behind a single
+# writer.
+#
+# SQLite allows one writer at a time. settings.py already makes each connection
+# use WAL journaling (so readers never wait for the writer), a busy timeout and
+# BEGIN IMMEDIATE transactions (so a transaction takes the write lock up front
+# instead of failing with "database is locked" when it later tries to upgrade).
+#
+# What is left is how writers wait. SQLite's busy handler polls with growing
+# sleeps, so under contention writers wake up late and in no particular order.
+# Here writers wait in a queue instead and are handed the database as soon as
+# the previous one commits: in a FIFO queue within the process, and behind an
+# exclusive lock on "<database>-writer.lock" between processes.
+# A writer joins the queue as follows:
+#
+#   - an atomic() block joins the queue before its BEGIN IMMEDIATE and leaves it
+#     on commit or rollback;
+#   - a single writing statement run outside atomic() (Django's autocommit)
+#     joins the queue for that statement: INSERT/UPDATE/DELETE/REPLACE, a WITH
+#     statement ending in one of them, and schema changes (CREATE, DROP, ALTER,
+#     ...), which migrations may run outside a transaction.
+#
+# Reads outside atomic() never queue. Anything writing to the file without this
+# backend (the sqlite3 shell, say) is still kept in line by SQLite's own lock and
+# the busy timeout.
+
+import os
+import re
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+from django.db import OperationalError
+from django.db.backends.sqlite3 import base
+
+try:
+    import fcntl
+except ImportError:  # Windows: writers are only queued within each process
+    fcntl = None
+
+# Statements that write, by their first keyword
+WRITE_STATEMENTS = frozenset({
+    'INSERT', 'UPDATE', 'DELETE', 'REPLACE', 'CREATE', 'DROP', 'ALTER', 'REINDEX', 'ANALYZE', 'VACUUM',
+})
+# Whitespace, comments and opening parentheses before a statement's first keyword
+LEADING_RE = re.compile(r'(?:\s+|--[^\n]*(?:\n|$)|/\*.*?\*/|\()*', re.DOTALL)
+KEYWORD_RE = re.compile(r'[A-Za-z]+')
+# A WITH statement writes if a DML keyword follows its common table expressions.
+# A match inside a literal only makes a read queue, which is harmless.
+CTE_WRITE_RE = re.compile(r'\b(?:INSERT|UPDATE|DELETE|REPLACE)\b', re.IGNORECASE)
+
+def is_write(query):
+    """
+    Whether `query` writes to the database, so must wait for the writer's turn.
+    """
+    keyword = KEYWORD_RE.match(query, LEADING_RE.match(query).end())
+    if keyword is None:
+        return False
+    keyword = keyword.group().upper()
+    if keyword == 'WITH':
+        return CTE_WRITE_RE.search(query) is not None
+    return keyword in WRITE_STATEMENTS
+
+class WriterQueue:
+    """
+    The writers of one database file, in line. Within a process writers wait in
+    a FIFO queue; the writer at its head then takes an exclusive lock on
+    `lock_path`, which lines up the processes.
+    """
+    def __init__(self, lock_path):
+        self.lock_path = lock_path
+        self._lock = threading.Lock()
+        self._waiters = deque()
+        self._held = False
+        self._fd = None
+        self._pid = None
+
+    def acquire(self, timeout):
+        deadline = time.monotonic() + timeout
+        if not self._take_turn(timeout):
+            return False
+        if not self._lock_file(deadline):
+            self._pass_turn()
+            return False
+        return True
+
+    def release(self):
+        if self._fd is not None:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+        self._pass_turn()
+
+    def _take_turn(self, timeout):
+        with self._lock:
+            if not self._held:
+                self._held = True
+                return True
+            turn = threading.Event()
+            self._waiters.append(turn)
+        if turn.wait(timeout):
+            return True
+        with self._lock:
+            # The previous writer may have handed over just as the wait timed out
+            if turn.is_set():
+                return True
+            self._waiters.remove(turn)
+            return False
+
+    def _pass_turn(self):
+        with self._lock:
+            if self._waiters:
+                # Hand over directly, so no newcomer can cut in
+                self._waiters.popleft().set()
+            else:
+                self._held = False
+
+    def _lock_file(self, deadline):
+        # Only the writer holding the process's turn gets here, so _fd needs no lock
+        if self.lock_path is None or fcntl is None:
+            return True
+        if self._pid != os.getpid():
+            # A lock file inherited through fork would be shared with the parent
+            self._fd = os.open(self.lock_path, os.O_RDWR | os.O_CREAT, 0o600)
+            self._pid = os.getpid()
+        delay = 0.0005
+        while True:
+            try:
+                fcntl.flock(self._fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                return True
+            except BlockingIOError:
+                if time.monotonic() >= deadline:
+                    return False
+                time.sleep(delay)
+                delay = min(delay * 2, 0.005)
+
+    def __len__(self):
+        return len(self._waiters)
+
+    def _reset(self):
+        # In a forked child: the parent's writers (and their turn) stay in the parent
+        self._lock = threading.Lock()
+        self._waiters = deque()
+        self._held = False
+        if self._fd is not None:
+            os.close(self._fd)  # Closing our copy leaves the parent's lock alone
+        self._fd = None
+        self._pid = None
+
+# One queue per database file, shared by every connection (thread) in the process
+_queues = {}
+_queues_lock = threading.Lock()
+
+def _reset_queues_after_fork():
+    for queue in _queues.values():
+        queue._reset()
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_queues_after_fork)
+
+def writer_queue(name):
+    name = str(name)
+    with _queues_lock:
+        if name not in _queues:
+            in_memory = name == ':memory:' or 'mode=memory' in name
+            _queues[name] = WriterQueue(None if in_memory else f'{name}-writer.lock')
+        return _queues[name]
+
+class QueuedCursorWrapper(base.SQLiteCursorWrapper):
+    database = None
+
+    def execute(self, query, params=None):
+        with self.database.autocommit_write(query):
+            return super().execute(query, params)
+
+    def executemany(self, query, param_list):
+        with self.database.autocommit_write(query):
+            return super().executemany(query, param_list)
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.writer_queue = writer_queue(self.settings_dict['NAME'])
+        self.holds_writer_turn = False
+
+    def _wait_for_writer_turn(self):
+        timeout = self.settings_dict['OPTIONS'].get('timeout', 5)
+        if not self.writer_queue.acquire(timeout):
+            raise OperationalError(f"database is locked (waited {timeout}s in the writer queue)")
+        self.holds_writer_turn = True
+
+    def _end_writer_turn(self):
+        if self.holds_writer_turn:
+            self.holds_writer_turn = False
+            self.writer_queue.release()
+
+    @contextmanager
+    def autocommit_write(self, query):
+        if self.holds_writer_turn or self.in_atomic_block or not is_write(query):
+            yield
+            return
+        self._wait_for_writer_turn()
+        try:
+            yield
+        finally:
+            self._end_writer_turn()
+
+    def create_cursor(self, name=None):
+        cursor = self.connection.cursor(factory=QueuedCursorWrapper)
+        cursor.database = self
+        return cursor
+
+    def _start_transaction_under_autocommit(self):
+        self._wait_for_writer_turn()
+        try:
+            super()._start_transaction_under_autocommit()
+        except Exception:
+            self._end_writer_turn()
+            raise
+
+    def _commit(self):
+        try:
+            return super()._commit()
+        finally:
+            self._end_writer_turn()
+
+    def _rollback(self):
+        try:
+            return super()._rollback()
+        finally:
+            self._end_writer_turn()
+
+    def _close(self):
+        try:
+            return super()._close()
+        finally:
+            self._end_writer_turn()
@@ -0,0 +1,25 @@
+# Background job handlers for the core app, run by `manage.py runjobs` (see core/jobs.py).
+
+from django.conf import settings
+
+from .jobs import job
+from .digest import send_digests
+from .matching import fan_out_pitch
+from .models import Pitch
+
+@job('match_pitch_to_investors', max_attempts=3)
+def match_pitch_to_investors(pitch_id):
+    """
+    Tells every investor whose interests match a new pitch about it.
+    """
+    pitch = Pitch.objects.select_related('entrepreneur__entrepreneur_profile').filter(id=pitch_id).first()
+    if pitch is None:
+        return  # Deleted before the job ran
+    fan_out_pitch(pitch)
+
+@job('send_daily_digest', max_attempts=1, daily_at=settings.DIGEST_HOUR)
+def send_daily_digest():
+    """
+    E-mails every user a digest of their activity since their last digest.
+    """
+    send_digests()
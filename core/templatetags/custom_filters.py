@@ -1,6 +1,13 @@
+from functools import lru_cache
+from pathlib import Path
+
 from django import template
+from django.conf import settings
+from django.utils.html import format_html_join
 import re
 
+from core import cssbuild
+
 register = template.Library()
 
 @register.filter(name='indian_currency')
@@ -16,4 +23,28 @@ def indian_currency(value):
 
         return f"₹{integer_part}.{decimal_part}"
     except (ValueError, TypeError):
-        return value
\ No newline at end of file
+        return value
+
+@register.simple_tag
+def fallback_font_links():
+    """
+    Google Fonts links for the site font weights whose woff2 file is not in
+    static/fonts/ yet (utilities.css only declares the self-hosted ones), if
+    WEB_FONTS_CDN_FALLBACK is set. Otherwise those weights use the system font.
+    """
+    if not settings.WEB_FONTS_CDN_FALLBACK:
+        return ''
+    return _cdn_font_links()
+
+@lru_cache(maxsize=None)
+def _cdn_font_links():
+    missing = cssbuild.missing_font_weights(
+        cssbuild.WEB_FONT_FAMILY, cssbuild.WEB_FONT_WEIGHTS, Path(settings.BASE_DIR) / 'static' / 'fonts'
+    )
+    if not missing:
+        return ''
+    return format_html_join('\n    ', '<link rel="{}" href="{}"{}>', [
+        ('preconnect', 'https://fonts.googleapis.com', ''),
+        ('preconnect', 'https://fonts.gstatic.com', ' crossorigin'),
+        ('stylesheet', cssbuild.google_fonts_url(cssbuild.WEB_FONT_FAMILY, missing), ''),
+    ])
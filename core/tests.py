@@ -1,3 +1,1330 @@
-from django.test import TestCase
+import base64
+import copy
+import hashlib
+import json
+import os
+import random
+import tempfile
+import re
+import threading
+import time
+from datetime import timedelta
+from pathlib import Path
+from unittest import mock
 
-# Create your tests here.
+from django.core import mail
+from asgiref.sync import async_to_sync
+from asgiref.testing import ApplicationCommunicator
+from channels.db import database_sync_to_async
+from django.core.cache import cache
+from django.core.exceptions import MiddlewareNotUsed
+from django.core.files.storage import FileSystemStorage
+from django.db import OperationalError, connection, connections, transaction
+from django.db.models import Value
+from django.db.models.functions import Concat
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from . import jobs
+from .analytics import EngagementBuffer
+from .paginators import EstimatedCountPaginator
+from . import analytics, attachments, autocomplete, cssbuild, matching, profiling, ratelimit, resultcache
+from .archive import MessageArchiver, RejectedOfferArchiver, StalePitchArchiver, archive_cold_data
+from .digest import send_digests
+from .models import (
+    User, EntrepreneurProfile, InvestorProfile, Pitch, Offer, Question, Answer, Job, PitchViewStats,
+    ArchivedPitch, ArchivedOffer, PitchAttachment, AttachmentUpload, PitchContent, InterestKeyword, PitchMatch,
+)
+from .services import InvalidOfferTransition, respond_to_offers
+from .sqlite import base as sqlite_base
+from .templatetags import custom_filters
+from chat.history import message_page
+from chat.models import Conversation, Message, ArchivedMessage
+from invent.asgi import combined_application
+
+# Templates use {% static %}; the manifest storage needs collectstatic, so tests use the plain one.
+TEST_STORAGES = {
+    'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+    'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+}
+
+# --- Query plan regression tests ---
+
+@override_settings(STORAGES=TEST_STORAGES)
+class QueryPlanTests(TestCase):
+    """
+    Runs EXPLAIN on the queries behind the hot views over a generated dataset
+    and fails if any of them falls back to scanning a whole table.
+    """
+    @classmethod
+    def setUpTestData(cls):
+        rnd = random.Random(42)
+        cls.entrepreneurs = User.objects.bulk_create([User(username=f'founder{i}', user_type=1) for i in range(50)])
+        cls.investors = User.objects.bulk_create([User(username=f'investor{i}', user_type=2) for i in range(200)])
+        EntrepreneurProfile.objects.bulk_create([
+            EntrepreneurProfile(user=user, company_name=f'Company {i}', industry=f'Industry {i % 8}')
+            for i, user in enumerate(cls.entrepreneurs)
+        ])
+        InvestorProfile.objects.bulk_create([InvestorProfile(user=user) for user in cls.investors])
+        cls.pitches = Pitch.objects.bulk_create([
+            Pitch(entrepreneur=cls.entrepreneurs[i % 50], title=f'Pitch {i}', summary='Summary', funding_amount=1000)
+            for i in range(500)
+        ])
+        offers = Offer.objects.bulk_create([
+            Offer(pitch=rnd.choice(cls.pitches), investor=rnd.choice(cls.investors), amount=500)
+            for _ in range(3000)
+        ])
+        questions = Question.objects.bulk_create([
+            Question(pitch=rnd.choice(cls.pitches), author=rnd.choice(cls.investors), text='Question?')
+            for _ in range(3000)
+        ])
+        Answer.objects.bulk_create([Answer(question=q, author=q.pitch.entrepreneur, text='Answer.') for q in questions[::2]])
+        for entrepreneur in cls.entrepreneurs[:10]:
+            respond_to_offers(entrepreneur, [o.id for o in offers if o.pitch.entrepreneur_id == entrepreneur.id], 'accepted')
+
+        # Give the planner real statistics, as production databases have
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+
+    def setUp(self):
+        # Cached search results would skip the queries under test (see core/resultcache.py)
+        cache.clear()
+
+    def full_scans(self, sql):
+        """
+        Returns the tables a query reads in full, according to the database's EXPLAIN.
+        """
+        with connection.cursor() as cursor:
+            if connection.vendor == 'postgresql':
+                # Tiny test tables make sequential scans look cheap; only fail if no index could be used
+                cursor.execute('SET LOCAL enable_seqscan = off')
+                cursor.execute('EXPLAIN ' + sql)
+                plan = '\n'.join(row[0] for row in cursor.fetchall())
+                return re.findall(r'Seq Scan on (\w+)', plan)
+            if connection.vendor == 'sqlite':
+                cursor.execute('EXPLAIN QUERY PLAN ' + sql)
+                details = [row[3] for row in cursor.fetchall()]
+                return [match.group(1) for detail in details if (match := re.match(r'SCAN (\w+)', detail))]
+        self.skipTest(f'No query plan parser for {connection.vendor}.')
+
+    def assertNoFullScans(self, user, url, allowed=()):
+        """
+        Requests `url` as `user` and checks every SELECT it ran.
+        `allowed` lists tables the view is meant to read in full.
+        """
+        self.client.force_login(user)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+
+        offenders = []
+        for query in queries:
+            if not query['sql'].startswith('SELECT'):
+                continue
+            scanned = [table for table in self.full_scans(query['sql']) if table not in allowed]
+            if scanned:
+                offenders.append(f"{', '.join(scanned)}: {query['sql']}")
+        self.assertFalse(offenders, 'Full table scans in {}:\n{}'.format(url, '\n'.join(offenders)))
+
+    def test_entrepreneur_dashboard(self):
+        self.assertNoFullScans(self.entrepreneurs[0], '/dashboard/entrepreneur/')
+
+    def test_investor_dashboard(self):
+        # Browsing lists every pitch, and the industry dropdown reads the (covering) industry index
+        self.assertNoFullScans(self.investors[0], '/dashboard/investor/', allowed=['core_pitch', 'core_entrepreneurprofile'])
+
+    def test_investor_dashboard_industry_filter(self):
+        self.assertNoFullScans(self.investors[0], '/dashboard/investor/?industry=Industry+3', allowed=['core_entrepreneurprofile'])
+
+    def test_pitch_detail(self):
+        self.assertNoFullScans(self.investors[0], f'/pitch/{self.pitches[7].id}/')
+
+    def test_list_pages_load_no_deferred_columns(self):
+        """
+        The list pages load only the columns they render (see PITCH_CARD_FIELDS in
+        core/views.py). A template reading a column that was left out would fetch
+        it with one query per row, so the query count would grow with the data.
+        """
+        # The accepted offers gave the first entrepreneurs and their investors conversations
+        investor = Conversation.objects.filter(offer__pitch__entrepreneur=self.entrepreneurs[0]).first().offer.investor
+        pages = [
+            (self.entrepreneurs[0], '/'),
+            (self.entrepreneurs[0], '/search/?q=Pitch'),
+            (self.entrepreneurs[0], '/dashboard/entrepreneur/'),
+            (investor, '/dashboard/investor/'),
+        ]
+        # The dashboard sections rendered on their own (see templates/dashboard/)
+        for section in ['profile', 'pitches', 'offers', 'questions', 'conversations']:
+            pages.append((self.entrepreneurs[0], f'/dashboard/sections/{section}/'))
+            if section != 'questions':
+                pages.append((investor, f'/dashboard/sections/{section}/'))
+        for user, url in pages:
+            with self.subTest(url):
+                self.client.force_login(user)
+                with CaptureQueriesContext(connection) as queries:
+                    response = self.client.get(url)
+                self.assertEqual(response.status_code, 200)
+                self.assertLess(len(queries), 20, '\n'.join(query['sql'] for query in queries))
+
+    def test_digest_queries_per_chunk(self):
+        """
+        The daily digest counts activity for a whole chunk of users at once (see
+        core/digest.py), so its query count depends on the chunks, not the users.
+        """
+        User.objects.update(email=Concat('username', Value('@example.com')))
+        with CaptureQueriesContext(connection) as queries:
+            processed, sent = send_digests(chunk_size=100)
+        self.assertEqual(processed, 250)
+        self.assertEqual(sent, len(mail.outbox))
+        self.assertGreater(sent, 0)
+        # 3 chunks of 9 queries (users, 7 kinds of activity, marking them sent) and the empty last read
+        self.assertEqual(len(queries), 3 * 9 + 1, '\n'.join(query['sql'] for query in queries))
+
+    def test_hot_querysets(self):
+        """
+        The individual filters called out as hot paths, checked directly.
+        """
+        entrepreneur, investor, pitch = self.entrepreneurs[0], self.investors[0], self.pitches[0]
+        hot_querysets = {
+            'offers by investor': Offer.objects.filter(investor=investor).order_by('-created_at'),
+            'offers on pitch by investor': Offer.objects.filter(pitch=pitch, investor=investor),
+            'unanswered questions': Question.objects.filter(pitch__entrepreneur=entrepreneur, answer__isnull=True).order_by('-created_at'),
+            'pitches by entrepreneur': Pitch.objects.filter(entrepreneur=entrepreneur).order_by('-created_at'),
+            'conversations of user': Conversation.objects.filter(participants=entrepreneur).order_by('-created_at'),
+            'pending offers for entrepreneur': Offer.objects.filter(pitch__entrepreneur=entrepreneur, status='pending'),
+        }
+        for name, queryset in hot_querysets.items():
+            with self.subTest(name):
+                sql, params = queryset.query.sql_with_params()
+                with connection.cursor() as cursor:
+                    # Let the driver quote the parameters
+                    sql = cursor.mogrify(sql, params).decode() if hasattr(cursor, 'mogrify') else connection.ops.last_executed_query(cursor, sql, params)
+                self.assertEqual(self.full_scans(sql), [])
+
+
+# --- Offer state machine tests ---
+
+class RespondToOffersTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.entrepreneur = User.objects.create(username='founder', user_type=1)
+        cls.other = User.objects.create(username='other-founder', user_type=1)
+        cls.investor = User.objects.create(username='investor', user_type=2)
+        cls.pitch = Pitch.objects.create(entrepreneur=cls.entrepreneur, title='Pitch', summary='Summary', funding_amount=1000)
+        cls.other_pitch = Pitch.objects.create(entrepreneur=cls.other, title='Other', summary='Summary', funding_amount=1000)
+
+    def offer(self, pitch=None, status='pending'):
+        return Offer.objects.create(pitch=pitch or self.pitch, investor=self.investor, amount=500, status=status)
+
+    def test_only_own_pitches(self):
+        mine, theirs = self.offer(), self.offer(pitch=self.other_pitch)
+        changed = respond_to_offers(self.entrepreneur, [mine.id, theirs.id], 'rejected')
+        self.assertEqual([offer.id for offer in changed], [mine.id])
+        theirs.refresh_from_db()
+        self.assertEqual(theirs.status, 'pending')
+
+    def test_skips_offers_that_are_not_pending(self):
+        pending, rejected = self.offer(), self.offer(status='rejected')
+        changed = respond_to_offers(self.entrepreneur, [pending.id, rejected.id], 'accepted')
+        self.assertEqual([offer.id for offer in changed], [pending.id])
+        rejected.refresh_from_db()
+        self.assertEqual(rejected.status, 'rejected')
+        self.assertFalse(Conversation.objects.filter(offer=rejected).exists())
+
+    def test_unknown_status(self):
+        with self.assertRaises(InvalidOfferTransition):
+            respond_to_offers(self.entrepreneur, [self.offer().id], 'withdrawn')
+
+    def test_accepting_opens_conversations(self):
+        offers = [self.offer(), self.offer()]
+        with self.captureOnCommitCallbacks(execute=True):
+            respond_to_offers(self.entrepreneur, [offer.id for offer in offers], 'accepted')
+        for offer in offers:
+            conversation = Conversation.objects.get(offer=offer)
+            self.assertEqual(set(conversation.participants.all()), {self.entrepreneur, self.investor})
+
+    def test_conversations_read_back_without_returned_pks(self):
+        """
+        On databases whose bulk_create returns no primary keys, the conversations
+        are read back before the participants and notifications use their ids.
+        """
+        offer = self.offer()
+        real_bulk_create = Conversation.objects.bulk_create
+
+        def bulk_create_without_pks(objs, *args, **kwargs):
+            created = real_bulk_create(objs, *args, **kwargs)
+            for conversation in created:
+                conversation.pk = None
+            return created
+
+        with mock.patch.object(Conversation.objects, 'bulk_create', bulk_create_without_pks), \
+                self.captureOnCommitCallbacks(execute=True):
+            respond_to_offers(self.entrepreneur, [offer.id], 'accepted')
+        conversation = Conversation.objects.get(offer=offer)
+        self.assertEqual(conversation.participants.count(), 2)
+
+
+# --- Job queue tests ---
+
+@jobs.job('test_flaky', max_attempts=2)
+def flaky_job(fail):
+    if fail:
+        raise RuntimeError('boom')
+
+class JobQueueTests(TestCase):
+    def test_claims_only_due_jobs_once(self):
+        due = jobs.enqueue('test_flaky', {'fail': False})
+        jobs.enqueue('test_flaky', {'fail': False}, delay=timedelta(hours=1))
+        claimed = jobs.claim_jobs(limit=5)
+        self.assertEqual([job.id for job in claimed], [due.id])
+        due.refresh_from_db()
+        self.assertEqual((due.status, due.attempts), ('running', 1))
+        self.assertIsNotNone(due.heartbeat_at)
+        self.assertEqual(jobs.claim_jobs(limit=5), [])
+
+    def test_claims_by_job_type(self):
+        jobs.enqueue('test_flaky', {'fail': False})
+        self.assertEqual(jobs.claim_jobs(job_types=['match_pitch_to_investors']), [])
+        self.assertEqual(len(jobs.claim_jobs(job_types=['test_flaky'])), 1)
+
+    def test_failed_job_retries_with_backoff_until_out_of_attempts(self):
+        job = jobs.enqueue('test_flaky', {'fail': True})
+        self.assertEqual(job.max_attempts, 2)
+
+        [claimed] = jobs.claim_jobs()
+        self.assertFalse(jobs.run_job(claimed))
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'queued')
+        self.assertIn('boom', job.last_error)
+        # First retry after BACKOFF_BASE seconds, give or take the jitter
+        delay = (job.run_after - timezone.now()).total_seconds()
+        self.assertTrue(jobs.BACKOFF_BASE * 0.7 < delay <= jobs.BACKOFF_BASE * 1.2, delay)
+
+        Job.objects.filter(id=job.id).update(run_after=timezone.now())
+        [claimed] = jobs.claim_jobs()
+        self.assertFalse(jobs.run_job(claimed))
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), ('failed', 2))
+
+    def test_retry_delay_is_capped(self):
+        self.assertLessEqual(jobs.retry_delay(50).total_seconds(), jobs.BACKOFF_MAX * 1.2)
+
+    def test_successful_job(self):
+        jobs.enqueue('test_flaky', {'fail': False})
+        [claimed] = jobs.claim_jobs()
+        self.assertTrue(jobs.run_job(claimed))
+        self.assertEqual(Job.objects.get(id=claimed.id).status, 'done')
+
+    def test_dedupe_key(self):
+        first = jobs.enqueue('test_flaky', {'fail': False}, dedupe_key='flaky:1')
+        self.assertEqual(jobs.enqueue('test_flaky', {'fail': False}, dedupe_key='flaky:1').id, first.id)
+        [claimed] = jobs.claim_jobs()
+        jobs.run_job(claimed)
+        # Once the job is done, the key is free again
+        self.assertNotEqual(jobs.enqueue('test_flaky', {'fail': False}, dedupe_key='flaky:1').id, first.id)
+
+    def test_stale_jobs_respect_attempts(self):
+        alive, retry, last_try = (jobs.enqueue('test_flaky', {'fail': False}) for _ in range(3))
+        jobs.claim_jobs(limit=3)
+        long_ago = timezone.now() - timedelta(hours=1)
+        Job.objects.filter(id__in=[retry.id, last_try.id]).update(heartbeat_at=long_ago, started_at=long_ago)
+        Job.objects.filter(id=last_try.id).update(attempts=2)
+
+        self.assertEqual(jobs.requeue_stale_jobs(timedelta(minutes=10)), (1, 1))
+        statuses = dict(Job.objects.values_list('id', 'status'))
+        self.assertEqual(statuses, {alive.id: 'running', retry.id: 'queued', last_try.id: 'failed'})
+
+    def test_heartbeat_keeps_long_jobs_running(self):
+        job = jobs.enqueue('test_flaky', {'fail': False})
+        jobs.claim_jobs()
+        Job.objects.filter(id=job.id).update(started_at=timezone.now() - timedelta(hours=1), heartbeat_at=timezone.now() - timedelta(hours=1))
+        jobs.heartbeat([job.id])
+        self.assertEqual(jobs.requeue_stale_jobs(timedelta(minutes=10)), (0, 0))
+
+    def test_handlers_registered_at_startup(self):
+        # tasks.py is imported by CoreConfig.ready, not only by runjobs
+        self.assertEqual(jobs.get_handler('match_pitch_to_investors').max_attempts, 3)
+        self.assertEqual(jobs.enqueue('match_pitch_to_investors', {'pitch_id': 0}).max_attempts, 3)
+
+
+# --- Engagement buffer tests ---
+
+class EngagementBufferTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        entrepreneur = User.objects.create(username='founder', user_type=1)
+        cls.pitches = Pitch.objects.bulk_create([
+            Pitch(entrepreneur=entrepreneur, title=f'Pitch {i}', summary='Summary', funding_amount=1000)
+            for i in range(1200)
+        ])
+
+    def tearDown(self):
+        # Drain what the views recorded into the shared buffer, inside the test transaction
+        analytics.engagement.flush()
+
+    def buffer(self, **kwargs):
+        buffer = EngagementBuffer(**dict({'flush_interval': 0, 'max_keys': 10000}, **kwargs))
+        # flush_interval only sets the retry delay here: no background thread or exit hook in tests
+        buffer._ensure_timer = lambda: None
+        return buffer
+
+    def test_flushes_more_than_a_thousand_rows(self):
+        buffer = self.buffer()
+        for pitch in self.pitches:
+            buffer.record(pitch.id, 'views')
+            buffer.record(pitch.id, 'views')
+        buffer.record(self.pitches[0].id, 'offers')
+        buffer.flush()
+        # A second flush adds to the rows the first one created
+        for pitch in self.pitches:
+            buffer.record(pitch.id, 'views')
+        buffer.flush()
+
+        self.assertEqual(PitchViewStats.objects.count(), 1200)
+        self.assertEqual(set(PitchViewStats.objects.values_list('views', flat=True)), {3})
+        self.assertEqual(PitchViewStats.objects.get(pitch=self.pitches[0]).offers, 1)
+
+    def test_failed_flush_keeps_counts_without_failing_the_request(self):
+        buffer = self.buffer(max_keys=10, flush_interval=60)
+        with mock.patch.object(buffer, '_write', side_effect=OperationalError('database is locked')), \
+                self.assertLogs('core.analytics', 'ERROR'):
+            for pitch in self.pitches[:20]:
+                buffer.record(pitch.id, 'views')
+        self.assertFalse(PitchViewStats.objects.exists())
+        buffer.flush()
+        self.assertEqual(PitchViewStats.objects.filter(views=1).count(), 20)
+
+    def test_buffer_is_capped_while_flushes_fail(self):
+        buffer = self.buffer(max_keys=10, max_pending=50, flush_interval=60)
+        with mock.patch.object(buffer, '_write', side_effect=OperationalError('database is locked')), \
+                self.assertLogs('core.analytics', 'ERROR'):
+            for pitch in self.pitches[:100]:
+                buffer.record(pitch.id, 'views')
+        with self.assertLogs('core.analytics', 'WARNING') as logs:
+            buffer.flush()
+        self.assertIn('Dropped 50', logs.output[0])
+        self.assertEqual(PitchViewStats.objects.count(), 50)
+
+
+# --- Investor matching tests ---
+
+class MatchingTests(TestCase):
+    def setUp(self):
+        self.entrepreneur = User.objects.create(username='founder', user_type=1)
+        EntrepreneurProfile.objects.create(user=self.entrepreneur, company_name='Acme', industry='Clean Energy')
+
+    def investor(self, name, interests):
+        user = User.objects.create(username=name, user_type=2)
+        InvestorProfile.objects.create(user=user, investment_interests=interests)
+        return user
+
+    def keywords(self, investor):
+        return set(InterestKeyword.objects.filter(investor=investor).values_list('keyword', flat=True))
+
+    def pitch(self, title='Solar panels for schools', summary='Rooftop startups'):
+        return Pitch.objects.create(entrepreneur=self.entrepreneur, title=title, summary=summary, funding_amount=1000)
+
+    def test_interest_keywords_are_normalized(self):
+        self.assertEqual(
+            matching.interest_keywords('Fintech, Clean Energy and AI; Café & Startups / e.g. the Health-care'),
+            {'fintech', 'clean energy', 'ai', 'cafe', 'startup', 'health care'},
+        )
+        self.assertEqual(matching.interest_keywords(''), set())
+        self.assertEqual(matching.interest_keywords(None), set())
+
+    def test_keywords_follow_the_investor_profile(self):
+        investor = self.investor('investor', 'Fintech, Clean Energy')
+        self.assertEqual(self.keywords(investor), {'fintech', 'clean energy'})
+
+        profile = investor.investor_profile
+        profile.investment_interests = 'Clean Energy, Robotics'
+        profile.save()
+        self.assertEqual(self.keywords(investor), {'clean energy', 'robotic'})
+
+        profile.delete()
+        self.assertEqual(self.keywords(investor), set())
+
+    def test_matching_investor_ids(self):
+        by_industry = self.investor('energy', 'Clean Energy')
+        by_title = self.investor('solar', 'Solar Panels, Biotech')
+        by_summary = self.investor('startups', 'startup')
+        self.investor('biotech', 'Biotech')
+        # The entrepreneur's own interests never match their pitch
+        InvestorProfile.objects.create(user=self.entrepreneur, investment_interests='Solar')
+
+        pitch = Pitch.objects.select_related('entrepreneur__entrepreneur_profile').get(pk=self.pitch().pk)
+        self.assertEqual(sorted(matching.matching_investor_ids(pitch)), sorted([by_industry.id, by_title.id, by_summary.id]))
+
+    def test_fan_out_is_idempotent(self):
+        investors = [self.investor(f'investor{n}', 'Solar') for n in range(3)]
+        pitch = self.pitch()
+        with mock.patch.object(matching.notifications, 'publish') as publish:
+            self.assertEqual(matching.fan_out_pitch(pitch), 3)
+            late = self.investor('late', 'Solar')
+            self.assertEqual(matching.fan_out_pitch(pitch), 4)
+        self.assertEqual(
+            sorted(PitchMatch.objects.filter(pitch=pitch).values_list('investor_id', flat=True)),
+            sorted(investor.id for investor in investors + [late]),
+        )
+        # The second run only notifies the investor who wasn't matched yet
+        self.assertEqual(sorted(publish.call_args_list[0].args[0]), sorted(investor.id for investor in investors))
+        self.assertEqual(publish.call_args_list[1].args[0], [late.id])
+
+    def test_new_pitch_enqueues_the_match_job(self):
+        investor = self.investor('investor', 'Solar')
+        pitch = self.pitch()
+        pitch.save()
+        [job] = Job.objects.filter(job_type='match_pitch_to_investors')
+        self.assertEqual((job.payload, job.dedupe_key), ({'pitch_id': pitch.id}, f'match_pitch:{pitch.id}'))
+
+        [claimed] = jobs.claim_jobs(job_types=['match_pitch_to_investors'])
+        self.assertTrue(jobs.run_job(claimed))
+        self.assertEqual(list(PitchMatch.objects.values_list('pitch_id', 'investor_id')), [(pitch.id, investor.id)])
+
+
+# --- Rate limiting tests ---
+
+@override_settings(STORAGES=TEST_STORAGES)
+class RateLimitTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_memory_bucket_refills_at_the_rate(self):
+        backend = ratelimit.MemoryBackend()
+        with mock.patch('core.ratelimit.time.monotonic', return_value=100.0):
+            self.assertEqual([backend.hit('k', 2.0, 3)[0] for _ in range(4)], [True, True, True, False])
+            allowed, retry_after = backend.hit('k', 2.0, 3)
+            self.assertFalse(allowed)
+            self.assertAlmostEqual(retry_after, 0.5)
+        with mock.patch('core.ratelimit.time.monotonic', return_value=100.5):
+            self.assertTrue(backend.hit('k', 2.0, 3)[0])
+            self.assertFalse(backend.hit('k', 2.0, 3)[0])
+
+    def test_cache_window_admits_the_burst(self):
+        backend = ratelimit.CacheBackend()
+        # At the start of a window, with nothing left over from the previous one
+        with mock.patch('core.ratelimit.time.time', return_value=1000.0):
+            results = [backend.hit('k', 1.0, 5) for _ in range(6)]
+        self.assertEqual([allowed for allowed, _ in results], [True] * 5 + [False])
+        self.assertAlmostEqual(results[-1][1], 5.0)
+
+    def test_cache_key_expiring_before_incr(self):
+        real_incr = cache.incr
+        calls = []
+
+        def incr_after_expiry(key, *args, **kwargs):
+            calls.append(key)
+            if len(calls) == 1:
+                cache.delete(key)
+            return real_incr(key, *args, **kwargs)
+
+        with mock.patch.object(cache, 'incr', incr_after_expiry):
+            self.assertEqual(ratelimit.CacheBackend().hit('k', 1.0, 5), (True, 0))
+
+    @override_settings(RATE_LIMITS={'search': {'rate': 0.5, 'burst': 2}})
+    def test_middleware_answers_429_with_retry_after(self):
+        with mock.patch.object(ratelimit, 'limiter', ratelimit.RateLimiter(ratelimit.MemoryBackend())):
+            statuses = [self.client.get('/search/', {'q': 'x'}).status_code for _ in range(2)]
+            response = self.client.get('/search/', {'q': 'x'})
+            # Other routes are not limited
+            self.assertEqual(self.client.get('/about/').status_code, 200)
+        self.assertNotIn(429, statuses)
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response['Retry-After'], '2')
+
+    @override_settings(RATE_LIMITS={'chat_send': {'rate': 0.1, 'burst': 1}})
+    def test_consumer_is_closed_when_over_the_limit(self):
+        class Consumer(ratelimit.RateLimitedConsumerMixin):
+            rate_limit_rule = 'chat_send'
+            scope = {'user': None, 'client': ('10.0.0.1', 1234)}
+            closed_with = None
+
+            async def close(self, code=None):
+                self.closed_with = code
+
+        consumer = Consumer()
+        with mock.patch.object(ratelimit, 'limiter', ratelimit.RateLimiter(ratelimit.MemoryBackend())):
+            self.assertTrue(async_to_sync(consumer.allow_rate_limited)())
+            self.assertIsNone(consumer.closed_with)
+            self.assertFalse(async_to_sync(consumer.allow_rate_limited)())
+        self.assertEqual(consumer.closed_with, ratelimit.WEBSOCKET_RATE_LIMIT_CLOSE_CODE)
+
+
+# --- Self-hosted font tests ---
+
+class FontFaceTests(TestCase):
+    def test_only_self_hosted_weights_get_a_face(self):
+        with mock.patch.object(cssbuild.Path, 'exists', lambda path: path.name.endswith('-400-normal.woff2')):
+            css, missing = cssbuild.font_faces('Poppins', (400, 700), 'static/fonts', '../fonts/')
+            self.assertEqual(cssbuild.missing_font_weights('Poppins', (400, 700), 'static/fonts'), [700])
+        self.assertIn("font-weight: 400;", css)
+        self.assertIn("url('../fonts/poppins-latin-400-normal.woff2')", css)
+        self.assertNotIn("font-weight: 700;", css)
+        self.assertEqual(missing, ['poppins-latin-700-normal.woff2'])
+
+    def test_google_fonts_url_covers_missing_weights(self):
+        self.assertEqual(
+            cssbuild.google_fonts_url('Poppins', [700, 400]),
+            'https://fonts.googleapis.com/css2?family=Poppins:wght@400;700&display=swap',
+        )
+
+    @override_settings(STORAGES=TEST_STORAGES)
+    def test_pages_load_no_fonts_from_a_cdn_by_default(self):
+        self.assertNotIn('fonts.googleapis.com', self.client.get('/').content.decode())
+        with self.settings(WEB_FONTS_CDN_FALLBACK=True), \
+                mock.patch.object(cssbuild, 'missing_font_weights', return_value=[700]):
+            custom_filters._cdn_font_links.cache_clear()
+            self.assertIn('fonts.googleapis.com', self.client.get('/').content.decode())
+        custom_filters._cdn_font_links.cache_clear()
+
+
+# --- Archive tests ---
+
+@override_settings(STORAGES=TEST_STORAGES)
+class ArchiveTests(TestCase):
+    def setUp(self):
+        self.long_ago = timezone.now() - timedelta(days=400)
+        self.entrepreneur = User.objects.create(username='founder', user_type=1)
+        EntrepreneurProfile.objects.create(user=self.entrepreneur, company_name='Acme', industry='Fintech')
+        self.investor = User.objects.create(username='investor', user_type=2)
+        InvestorProfile.objects.create(user=self.investor)
+
+    def pitch(self, title, created_at=None):
+        pitch = Pitch.objects.create(entrepreneur=self.entrepreneur, title=title, summary='Summary', funding_amount=1000)
+        Pitch.objects.filter(pk=pitch.pk).update(created_at=created_at or self.long_ago)
+        return pitch
+
+    def test_old_messages_move_and_history_reads_across_both_tables(self):
+        pitch = self.pitch('Chat')
+        offer = Offer.objects.create(pitch=pitch, investor=self.investor, amount=500, status='accepted')
+        conversation = Conversation.objects.create(offer=offer)
+        messages = Message.objects.bulk_create([
+            Message(conversation=conversation, sender=self.investor, content=f'Message {i}') for i in range(5)
+        ])
+        Message.objects.filter(pk__in=[message.pk for message in messages[:3]]).update(timestamp=self.long_ago)
+
+        self.assertEqual(MessageArchiver().run(batch_size=2), 3)
+        self.assertEqual(sorted(ArchivedMessage.objects.values_list('id', flat=True)), [message.pk for message in messages[:3]])
+        page, has_more = message_page(conversation.pk)
+        self.assertEqual([message.content for message in page], [f'Message {i}' for i in range(5)])
+        self.assertFalse(has_more)
+
+    def test_only_rejected_offers_without_a_conversation_move(self):
+        pitch = self.pitch('Offers')
+        rejected = Offer.objects.create(pitch=pitch, investor=self.investor, amount=500, status='rejected')
+        pending = Offer.objects.create(pitch=pitch, investor=self.investor, amount=600)
+        Offer.objects.update(created_at=self.long_ago)
+
+        self.assertEqual(RejectedOfferArchiver().run(), 1)
+        self.assertFalse(Offer.objects.filter(pk=rejected.pk).exists())
+        self.assertTrue(Offer.objects.filter(pk=pending.pk).exists())
+        archived = ArchivedOffer.objects.get(pk=rejected.pk)
+        self.assertEqual((archived.pitch_id, archived.pitch_title), (pitch.pk, 'Offers'))
+
+    def test_stale_pitch_keeps_its_thread_and_views(self):
+        stale = self.pitch('Stale')
+        busy = self.pitch('Busy')
+        fresh = self.pitch('Fresh', created_at=timezone.now())
+        Offer.objects.create(pitch=busy, investor=self.investor, amount=500)
+        question = Question.objects.create(pitch=stale, author=self.investor, text='Why?')
+        Question.objects.filter(pk=question.pk).update(created_at=self.long_ago)
+        Answer.objects.create(question=question, author=self.entrepreneur, text='Because.')
+        PitchViewStats.objects.create(pitch=stale, date=self.long_ago.date(), views=7)
+
+        self.assertEqual(StalePitchArchiver().run(), 1)
+        self.assertEqual(set(Pitch.objects.values_list('pk', flat=True)), {busy.pk, fresh.pk})
+        archived = ArchivedPitch.objects.get(pk=stale.pk)
+        self.assertEqual(archived.total_views, 7)
+        self.assertEqual([(q['text'], q['answer']['text']) for q in archived.qa_thread], [('Why?', 'Because.')])
+
+    def test_interrupted_run_resumes_and_repeats_nothing(self):
+        self.pitch('One')
+        self.pitch('Two')
+        self.assertEqual(StalePitchArchiver().run(batch_size=1, max_batches=1), 1)
+        self.assertEqual(archive_cold_data(kinds=['stale_pitches']), {'stale_pitches': 1})
+        self.assertEqual(ArchivedPitch.objects.count(), 2)
+        self.assertEqual(archive_cold_data(), {'messages': 0, 'rejected_offers': 0, 'stale_pitches': 0})
+
+    def test_dashboards_list_archived_rows(self):
+        self.pitch('Old idea')
+        offer = Offer.objects.create(pitch=self.pitch('Declined'), investor=self.investor, amount=500, status='rejected')
+        Offer.objects.filter(pk=offer.pk).update(created_at=self.long_ago)
+        archive_cold_data()
+        self.assertTrue(ArchivedOffer.objects.filter(pk=offer.pk).exists())
+
+        self.client.force_login(self.entrepreneur)
+        response = self.client.get('/dashboard/sections/pitches/')
+        self.assertContains(response, 'Archived Pitches')
+        self.assertContains(response, 'Old idea')
+        self.assertNotContains(response, 'You have not submitted any pitches yet.')
+
+        self.client.force_login(self.investor)
+        response = self.client.get('/dashboard/sections/offers/')
+        self.assertContains(response, 'Archived Offers')
+        self.assertContains(response, 'Declined')
+        self.assertNotContains(response, 'You have not made any offers yet.')
+
+
+# --- Autocomplete tests ---
+
+class AutocompleteTests(TestCase):
+    def test_full_index_evicts_the_oldest_entry(self):
+        index = autocomplete.PrefixIndex(max_entries=2)
+        index.add(('pitch', 1), 'pitch', 'Solar farms', 1)
+        index.add(('pitch', 2), 'pitch', 'Drone delivery', 2)
+        index.add(('pitch', 1), 'pitch', 'Solar roofs', 1)  # Re-adding makes it the newest
+        index.add(('pitch', 3), 'pitch', 'Vertical farming', 3)
+        self.assertEqual(set(index.entries), {('pitch', 1), ('pitch', 3)})
+        self.assertEqual(index.search('drone', 8), [])
+        self.assertEqual(index.search('farm', 8), [('pitch', 'Vertical farming', 3)])
+        self.assertEqual(index.evicted, 1)
+
+    def test_searches_and_updates_run_while_the_index_is_built(self):
+        index = autocomplete.Autocomplete()
+        index._swap_in(autocomplete.PrefixIndex(10), {})
+        seen_during_build = []
+
+        def build_index(max_entries):
+            # Another thread (a request) can search and save while the database is read
+            def request():
+                seen_during_build.append(index.search('old'))
+                index.pitch_saved(Pitch(id=2, title='Saved during build'))
+            thread = threading.Thread(target=request)
+            thread.start()
+            thread.join(timeout=5)
+            new = autocomplete.PrefixIndex(max_entries)
+            new.add(('pitch', 1), 'pitch', 'Old pitch', 1)
+            return new
+
+        with mock.patch.object(autocomplete, 'build_index', build_index):
+            index._rebuild()
+        self.assertEqual(seen_during_build, [[]])
+        self.assertEqual(index.search('saved'), [('pitch', 'Saved during build', 2)])
+        self.assertEqual(index.search('old'), [('pitch', 'Old pitch', 1)])
+
+    def test_first_build_does_not_hold_the_lock(self):
+        index = autocomplete.Autocomplete()
+
+        def build_index(max_entries):
+            thread = threading.Thread(target=lambda: index.pitch_saved(Pitch(id=2, title='Saved during build')))
+            thread.start()
+            thread.join(timeout=5)
+            self.assertFalse(thread.is_alive())
+            return autocomplete.PrefixIndex(max_entries)
+
+        with mock.patch.object(autocomplete, 'build_index', build_index):
+            index.ensure_built()
+        self.assertEqual(index.search('saved'), [('pitch', 'Saved during build', 2)])
+
+    def test_search_latency_stays_under_10ms(self):
+        rnd = random.Random(7)
+        syllables = ['ka', 'ro', 'mi', 'tes', 'lan', 'vor', 'pix', 'zen', 'dra', 'fin', 'tech', 'bio', 'agro', 'nex']
+        index = autocomplete.PrefixIndex(100000)
+        for n in range(20000):
+            title = ' '.join(''.join(rnd.choice(syllables) for _ in range(rnd.randint(2, 4))) for _ in range(4))
+            index.add(('pitch', n), 'pitch', title, n)
+        timings = []
+        # Short prefixes match the most words; misspellings go through the trigram lookup
+        for query in ['k', 'ka', 'kar', 'fin te', 'bioagr', 'zenvr', 'tehc', 'dra ro'] * 25:
+            started = time.perf_counter()
+            index.search(query, 8)
+            timings.append(time.perf_counter() - started)
+        timings.sort()
+        self.assertLess(timings[int(len(timings) * 0.95)], 0.010)
+
+
+# --- Attachment tests ---
+
+class ParseRangeTests(TestCase):
+    def test_ranges(self):
+        cases = {
+            None: None,
+            'bytes=0-3': (0, 4),
+            'bytes=5-': (5, 5),          # Open-ended
+            'bytes=8-100': (8, 2),       # End clamped to the file
+            'bytes=-3': (7, 3),          # Suffix: the last 3 bytes
+            'bytes=-50': (0, 10),        # Suffix longer than the file
+            'bytes=4-2': None,           # Invalid, so ignored
+            'bytes=0-1,4-5': None,       # Several ranges: the whole file
+            'items=0-1': None,
+            'bytes=-': None,
+        }
+        for header, expected in cases.items():
+            with self.subTest(header=header):
+                self.assertEqual(attachments.parse_range(header, 10), expected)
+
+    def test_unsatisfiable_ranges(self):
+        for header in ('bytes=10-', 'bytes=12-20', 'bytes=-0'):
+            with self.subTest(header=header), self.assertRaises(ValueError):
+                attachments.parse_range(header, 10)
+
+@override_settings(PITCH_ATTACHMENT_CHUNK_SIZE=4)
+class AttachmentUploadTests(TestCase):
+    CONTENT = b'0123456789'
+
+    def setUp(self):
+        self.root = tempfile.TemporaryDirectory()
+        self.addCleanup(self.root.cleanup)
+        settings_override = override_settings(PITCH_ATTACHMENT_ROOT=Path(self.root.name))
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        storage_patch = mock.patch.object(PitchAttachment._meta.get_field('file'), 'storage', FileSystemStorage(self.root.name))
+        storage_patch.start()
+        self.addCleanup(storage_patch.stop)
+
+        self.entrepreneur = User.objects.create(username='founder', user_type=1)
+        self.investor = User.objects.create(username='investor', user_type=2)
+        self.pitch = Pitch.objects.create(entrepreneur=self.entrepreneur, title='Deck', summary='Summary', funding_amount=1000)
+        self.client.force_login(self.entrepreneur)
+
+    def start(self, **data):
+        response = self.client.post(
+            f'/pitch/{self.pitch.id}/attachments/',
+            {'filename': 'deck.pdf', 'size': len(self.CONTENT), **data}, content_type='application/json',
+        )
+        self.assertEqual(response.status_code, 201)
+        return response.json()
+
+    def put(self, url, offset, chunk, **headers):
+        return self.client.put(url, chunk, content_type='application/octet-stream', headers={'Upload-Offset': str(offset), **headers})
+
+    def test_chunked_upload_resumes_and_downloads_by_range(self):
+        state = self.start(sha256=hashlib.sha256(self.CONTENT).hexdigest())
+        self.assertEqual((state['offset'], state['chunk_size']), (0, 4))
+        self.assertEqual(self.put(state['url'], 0, self.CONTENT[:4]).status_code, 200)
+
+        # The client lost track: starting the same file again resumes it
+        state = self.start(sha256=hashlib.sha256(self.CONTENT).hexdigest())
+        self.assertEqual(state['offset'], 4)
+        self.assertEqual(self.client.get(state['url'])['Upload-Offset'], '4')
+        response = self.put(state['url'], 0, self.CONTENT[:4])
+        self.assertEqual((response.status_code, response['Upload-Offset']), (409, '4'))
+        bad_checksum = 'sha256 ' + base64.b64encode(hashlib.sha256(b'nope').digest()).decode()
+        self.assertEqual(self.put(state['url'], 4, self.CONTENT[4:8], **{'Upload-Checksum': bad_checksum}).status_code, 400)
+
+        self.assertEqual(self.put(state['url'], 4, self.CONTENT[4:8]).status_code, 200)
+        response = self.put(state['url'], 8, self.CONTENT[8:])
+        self.assertEqual(response.status_code, 201)
+        attachment = PitchAttachment.objects.get(id=response.json()['attachment']['id'])
+        self.assertFalse(AttachmentUpload.objects.exists())
+
+        self.client.force_login(self.investor)
+        url = response.json()['attachment']['url']
+        response = self.client.get(url, headers={'Range': 'bytes=-3'})
+        self.assertEqual((response.status_code, response['Content-Range']), (206, 'bytes 7-9/10'))
+        self.assertEqual(b''.join(response.streaming_content), b'789')
+        response = self.client.get(url, headers={'Range': 'bytes=10-'})
+        self.assertEqual((response.status_code, response['Content-Range']), (416, 'bytes */10'))
+        response = self.client.get(url)
+        self.assertEqual(b''.join(response.streaming_content), self.CONTENT)
+        self.assertEqual(Path(attachment.file.path).read_bytes(), self.CONTENT)
+
+    def test_chunk_is_refused_while_another_is_being_written(self):
+        state = self.start()
+        upload = AttachmentUpload.objects.get()
+        fd = os.open(attachments.partial_path(upload), os.O_WRONLY)
+        try:
+            attachments.fcntl.flock(fd, attachments.fcntl.LOCK_EX)
+            response = self.put(state['url'], 0, b'XXXX')
+        finally:
+            os.close(fd)
+        self.assertEqual(response.status_code, 409)
+        upload.refresh_from_db()
+        self.assertEqual(upload.received, 0)
+        self.assertEqual(attachments.partial_path(upload).read_bytes(), b'')
+
+    def test_failed_finish_keeps_the_upload(self):
+        state = self.start()
+        self.put(state['url'], 0, self.CONTENT[:4])
+        self.put(state['url'], 4, self.CONTENT[4:8])
+        with mock.patch.object(attachments.os, 'link', side_effect=OSError('disk full')), self.assertRaises(OSError):
+            self.put(state['url'], 8, self.CONTENT[8:])
+        upload = AttachmentUpload.objects.get()
+        self.assertFalse(PitchAttachment.objects.exists())
+        self.assertEqual(attachments.partial_path(upload).read_bytes(), self.CONTENT)
+        self.assertEqual(list(Path(self.root.name).glob(f'{self.pitch.id}/*')), [])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            attachment = attachments.finish_upload(upload)
+        self.assertEqual(Path(attachment.file.path).read_bytes(), self.CONTENT)
+        self.assertFalse(attachments.partial_path(upload).exists())
+
+    def test_pitches_with_attachments_are_not_archived(self):
+        state = self.start()
+        Pitch.objects.update(created_at=timezone.now() - timedelta(days=400))
+        self.assertEqual(StalePitchArchiver().count(), 0)  # An upload in progress
+        for offset in range(0, 10, 4):
+            self.put(state['url'], offset, self.CONTENT[offset:offset + 4])
+        self.assertEqual(StalePitchArchiver().run(), 0)
+        self.assertTrue(Pitch.objects.filter(id=self.pitch.id).exists())
+
+
+# --- Profiling tests ---
+
+@override_settings(STORAGES=TEST_STORAGES, PROFILING_ENABLED=True, PROFILING_TOKEN='secret', PROFILING_SAMPLE_RATE=0)
+class ProfilingTests(TestCase):
+    def setUp(self):
+        self.root = tempfile.TemporaryDirectory()
+        self.addCleanup(self.root.cleanup)
+        settings_override = override_settings(PROFILING_ROOT=Path(self.root.name))
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.staff = User.objects.create(username='staff', is_staff=True)
+        self.founder = User.objects.create(username='founder', user_type=1)
+
+    def saved(self):
+        return profiling.saved_profiles()
+
+    @override_settings(PROFILING_ENABLED=False)
+    def test_disabled_middleware_removes_itself(self):
+        with self.assertRaises(MiddlewareNotUsed):
+            profiling.ProfilingMiddleware(lambda request: None)
+
+    def test_staff_flag_or_token_profiles_a_request(self):
+        self.client.force_login(self.founder)
+        self.assertNotIn('X-Profile', self.client.get('/about/', {'profile': '1'}))
+        response = self.client.get('/about/', {'profile_token': 'secret'})
+        self.assertIn('X-Profile', response)
+
+        self.client.force_login(self.staff)
+        response = self.client.get('/about/', headers={'X-Profile': '1'})
+        [newest, _] = self.saved()
+        self.assertEqual(response['X-Profile'], f"/monitoring/profiles/{newest['id']}/")
+        self.assertEqual((newest['path'], newest['status']), ('/about/', 200))
+        self.assertEqual(self.client.get(response['X-Profile']).status_code, 200)
+        collapsed = self.client.get(response['X-Profile'], {'format': 'collapsed'})
+        self.assertEqual(collapsed['Content-Type'], 'text/plain; charset=utf-8')
+
+    @override_settings(PROFILING_SAMPLE_RATE=1.0, PROFILING_USER_IDS=[1])
+    def test_sampling_can_be_limited_to_users(self):
+        chosen, other = mock.Mock(id=1), mock.Mock(id=2)
+        self.assertTrue(profiling.wants_profile(lambda: chosen, False, None))
+        self.assertFalse(profiling.wants_profile(lambda: other, False, None))
+
+    @override_settings(PROFILING_MAX_PROFILES=2)
+    def test_keeps_only_the_newest_profiles(self):
+        for n in range(3):
+            with profiling.profiled(f'job {n}'):
+                pass
+        self.assertEqual([profile['name'] for profile in self.saved()], ['job 2', 'job 1'])
+
+    def test_consumer_messages_are_profiled_off_the_event_loop(self):
+        class Consumer(profiling.ProfiledConsumerMixin):
+            scope = {'user': self.staff, 'path': '/ws/chat/1/', 'query_string': b'profile=1'}
+
+        loop_threads, save_threads = [], []
+        save = profiling.Profile.save
+
+        def record_save(profile):
+            save_threads.append(threading.get_ident())
+            save(profile)
+
+        async def receive():
+            loop_threads.append(threading.get_ident())
+            async with Consumer().profiled_message('receive'):
+                await database_sync_to_async(lambda: list(User.objects.all()))()
+
+        with mock.patch.object(profiling.Profile, 'save', record_save), connection.execute_wrapper(profiling._time_query):
+            async_to_sync(receive)()
+        [saved] = self.saved()
+        self.assertEqual((saved['name'], saved['samples'], saved['queries']), ('WS /ws/chat/1/ receive', 0, 1))
+        self.assertNotEqual(save_threads, loop_threads)
+        speedscope = json.loads((Path(self.root.name) / f"{saved['id']}.speedscope.json").read_text())
+        self.assertEqual(len(speedscope['profiles'][1]['events']), 2)
+
+
+# --- Search result cache tests ---
+
+@override_settings(RESULT_CACHE_TIMEOUT=60, RESULT_CACHE_MAX_IDS=3)
+class ResultCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        resultcache._stats.clear()
+        self.founder = User.objects.create(username='founder', user_type=1)
+        self.profile = EntrepreneurProfile.objects.create(user=self.founder, company_name='Acme', industry='Fintech')
+        self.pitches = [
+            Pitch.objects.create(entrepreneur=self.founder, title=title, summary='Summary', funding_amount=1000)
+            for title in ('Beta', 'Alpha', 'Gamma')
+        ]
+
+    def search(self, matching):
+        return resultcache.cached_search('test', {'q': 'x'}, matching, Pitch.objects.all())
+
+    def test_hit_loads_rows_in_cached_order_with_one_query(self):
+        self.assertEqual([pitch.title for pitch in self.search(Pitch.objects.order_by('title'))], ['Alpha', 'Beta', 'Gamma'])
+        # A write that bypasses the signals leaves the cached ids (and their order) in place
+        Pitch.objects.filter(title='Alpha').update(title='Zulu')
+        with self.assertNumQueries(1):
+            titles = [pitch.title for pitch in self.search(Pitch.objects.order_by('title'))]
+        self.assertEqual(titles, ['Zulu', 'Beta', 'Gamma'])
+        self.assertEqual(resultcache.stats()['kinds']['test'], {'hits': 1, 'misses': 1, 'too_many': 0, 'hit_rate': 0.5})
+
+    def test_writes_bump_the_version_only_on_commit(self):
+        content = PitchContent.objects.create(pitch=self.pitches[0], details='Details')
+        for instance in (self.pitches[0], content, self.profile):
+            with self.subTest(model=type(instance).__name__):
+                version = resultcache.corpus_version()
+                with self.captureOnCommitCallbacks(execute=True):
+                    instance.save()
+                    self.assertEqual(resultcache.corpus_version(), version)
+                self.assertGreater(resultcache.corpus_version(), version)
+
+    def test_bump_makes_the_next_search_miss(self):
+        self.search(Pitch.objects.order_by('title'))
+        with self.captureOnCommitCallbacks(execute=True):
+            Pitch.objects.create(entrepreneur=self.founder, title='Delta', summary='Summary', funding_amount=1000)
+        self.assertEqual(len(self.search(Pitch.objects.filter(title__lt='E').order_by('title'))), 3)
+        self.assertEqual(resultcache.stats()['kinds']['test']['misses'], 2)
+
+    def test_too_many_matches_fall_through_to_the_database(self):
+        Pitch.objects.create(entrepreneur=self.founder, title='Delta', summary='Summary', funding_amount=1000)
+        matching = Pitch.objects.order_by('title')
+        self.assertIs(self.search(matching), matching)
+        again = Pitch.objects.order_by('title')
+        self.assertIs(self.search(again), again)
+        self.assertEqual(resultcache.stats()['kinds']['test']['too_many'], 1)
+
+    def test_stats_view_is_staff_only(self):
+        self.assertEqual(self.client.get('/monitoring/result-cache/').status_code, 302)
+        self.client.force_login(self.founder)
+        self.assertEqual(self.client.get('/monitoring/result-cache/').status_code, 302)
+        self.client.force_login(User.objects.create(username='staff', is_staff=True))
+        response = self.client.get('/monitoring/result-cache/')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('version', response.json())
+
+
+# --- SQLite writer queue tests ---
+
+class SQLiteWriterQueueTests(TestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.dir.cleanup)
+        self.path = os.path.join(self.dir.name, 'db.sqlite3')
+
+    def test_write_detection(self):
+        writes = [
+            'INSERT INTO t VALUES (1)', '  update t SET a = 1', '-- note\nDELETE FROM t', '/* c */ (REPLACE INTO t VALUES (1))',
+            'WITH new AS (SELECT 1) INSERT INTO t SELECT * FROM new', 'CREATE INDEX t_a ON t (a)', 'DROP TABLE t', 'ALTER TABLE t ADD b',
+        ]
+        reads = ['SELECT 1', 'WITH a AS (SELECT 1) SELECT * FROM a', 'PRAGMA foreign_keys', 'SAVEPOINT s1', '', '  ']
+        for query in writes:
+            self.assertTrue(sqlite_base.is_write(query), query)
+        for query in reads:
+            self.assertFalse(sqlite_base.is_write(query), query)
+
+    def test_writers_are_handed_the_turn_in_order(self):
+        queue = sqlite_base.WriterQueue(None)
+        self.assertTrue(queue.acquire(1))
+        order = []
+
+        def writer(n):
+            self.assertTrue(queue.acquire(5))
+            order.append(n)
+            queue.release()
+
+        threads = []
+        for n in range(3):
+            threads.append(threading.Thread(target=writer, args=(n,)))
+            threads[-1].start()
+            while len(queue) < n + 1:  # Line them up one after the other
+                time.sleep(0.001)
+        queue.release()
+        for thread in threads:
+            thread.join(5)
+        self.assertEqual(order, [0, 1, 2])
+        self.assertFalse(queue._held)
+
+    def test_timed_out_writer_leaves_the_queue(self):
+        queue = sqlite_base.WriterQueue(None)
+        self.assertTrue(queue.acquire(1))
+        results = []
+        thread = threading.Thread(target=lambda: results.append(queue.acquire(0.02)))
+        thread.start()
+        thread.join(5)
+        self.assertEqual((results, len(queue)), ([False], 0))
+        queue.release()
+        self.assertTrue(queue.acquire(0))
+
+    def test_commit_rollback_and_close_release_the_turn(self):
+        settings_dict = copy.deepcopy(connection.settings_dict)
+        settings_dict.update(NAME=self.path, OPTIONS={'timeout': 0.05})
+        database = sqlite_base.DatabaseWrapper(settings_dict, alias='writer-queue-test')
+        queue = database.writer_queue
+        self.addCleanup(database.close)
+
+        # An autocommit write takes the turn for the statement only
+        with database.cursor() as cursor:
+            cursor.execute('CREATE TABLE t (a integer)')
+        self.assertFalse(queue._held)
+
+        # A transaction takes the turn at BEGIN and gives it back however it ends
+        connections['writer-queue-test'] = database
+        self.addCleanup(connections.__delitem__, 'writer-queue-test')
+        for ending in ('commit', 'rollback', 'close'):
+            with self.subTest(ending=ending):
+                try:
+                    with transaction.atomic(using='writer-queue-test'):
+                        with database.cursor() as cursor:
+                            cursor.execute('SELECT 1')
+                        self.assertTrue(database.holds_writer_turn)
+                        if ending == 'rollback':
+                            raise RuntimeError
+                        if ending == 'close':
+                            database.close()
+                except RuntimeError:
+                    pass
+                self.assertFalse(queue._held)
+
+        # While another writer has the turn, a write waits and then gives up
+        self.assertTrue(queue.acquire(1))
+        try:
+            with self.assertRaises(OperationalError), database.cursor() as cursor:
+                cursor.execute('WITH v AS (SELECT 2) INSERT INTO t SELECT * FROM v')
+            with database.cursor() as cursor:
+                cursor.execute('SELECT count(*) FROM t')  # Reads never queue
+        finally:
+            queue.release()
+
+    def test_processes_are_lined_up_by_the_lock_file(self):
+        queue = sqlite_base.writer_queue(self.path)  # Registered, so reset in forked children
+
+        def child_acquires():
+            pid = os.fork()
+            if pid == 0:
+                # The child's inherited queue starts empty and opens its own lock file
+                os._exit(2 if queue._held else 0 if queue.acquire(0.05) else 1)
+            return os.waitstatus_to_exitcode(os.waitpid(pid, 0)[1])
+
+        self.assertTrue(queue.acquire(1))
+        self.assertEqual(child_acquires(), 1)  # Held by this process's lock
+        queue.release()
+        self.assertEqual(child_acquires(), 0)
+
+
+# --- Digest tests ---
+
+@override_settings(DIGEST_FIRST_DAYS=1)
+class DigestTests(TestCase):
+    def setUp(self):
+        self.entrepreneur = User.objects.create(username='founder', user_type=1, email='founder@example.com')
+        self.investor = User.objects.create(username='investor', user_type=2, email='investor@example.com')
+        self.pitch = Pitch.objects.create(entrepreneur=self.entrepreneur, title='Pitch', summary='Summary', funding_amount=1000)
+
+    def bodies(self):
+        bodies = {message.to[0]: message.body for message in mail.outbox}
+        mail.outbox.clear()
+        return bodies
+
+    def test_own_chat_messages_are_not_counted(self):
+        offer = Offer.objects.create(pitch=self.pitch, investor=self.investor, amount=500, status='accepted')
+        conversation = Conversation.objects.create(offer=offer)
+        conversation.participants.add(self.entrepreneur, self.investor)
+        Message.objects.bulk_create([
+            Message(conversation=conversation, sender=self.investor, content='Hello'),
+            Message(conversation=conversation, sender=self.investor, content='Any news?'),
+            Message(conversation=conversation, sender=self.entrepreneur, content='Soon'),
+        ])
+        send_digests()
+        bodies = self.bodies()
+        self.assertIn('- 2 new chat messages\n', bodies['founder@example.com'])
+        self.assertIn('- 1 new chat message\n', bodies['investor@example.com'])
+
+    def test_views_are_counted_once_across_digests(self):
+        today = timezone.now().replace(hour=12, minute=0, second=0, microsecond=0)
+        PitchViewStats.objects.create(pitch=self.pitch, date=(today - timedelta(days=3)).date(), views=5)
+        PitchViewStats.objects.create(pitch=self.pitch, date=(today - timedelta(days=2)).date(), views=3)
+
+        send_digests(until=today - timedelta(days=2))
+        self.assertIn('- 5 views of your pitches', self.bodies()['founder@example.com'])
+        send_digests(until=today - timedelta(days=1))
+        self.assertIn('- 3 views of your pitches', self.bodies()['founder@example.com'])
+        # Nothing new since: no e-mail at all
+        self.assertEqual(send_digests(until=today), (2, 0))
+
+    def test_last_digest_at_advances_for_every_user(self):
+        until = timezone.now()
+        self.assertEqual(send_digests(until=until), (2, 0))
+        self.assertEqual(set(User.objects.values_list('last_digest_at', flat=True)), {until})
+        later = until + timedelta(days=1)
+        send_digests(until=later)
+        self.assertEqual(set(User.objects.values_list('last_digest_at', flat=True)), {later})
+
+    def test_digest_is_scheduled_once_a_day(self):
+        handler = jobs.get_handler('send_daily_digest')
+        morning = timezone.now().replace(hour=6, minute=30, second=0, microsecond=0)
+        with mock.patch.object(handler, 'daily_at', 7), mock.patch('django.utils.timezone.now', return_value=morning):
+            [first] = jobs.schedule_daily_jobs()
+            [again] = jobs.schedule_daily_jobs()
+        self.assertEqual(first.id, again.id)
+        self.assertEqual(first.run_after, morning.replace(hour=7, minute=0))
+        self.assertEqual(first.dedupe_key, f'daily:send_daily_digest:{morning.date().isoformat()}')
+
+        # Once today's run is done, the next one is tomorrow's
+        Job.objects.filter(id=first.id).update(status='succeeded')
+        with mock.patch.object(handler, 'daily_at', 7), mock.patch('django.utils.timezone.now', return_value=morning.replace(hour=8)):
+            [tomorrow] = jobs.schedule_daily_jobs()
+        self.assertEqual(tomorrow.run_after, morning.replace(hour=7, minute=0) + timedelta(days=1))
+
+
+# --- Admin changelist tests ---
+
+@override_settings(STORAGES=TEST_STORAGES)
+class AdminChangelistTests(TestCase):
+    def setUp(self):
+        self.client.force_login(User.objects.create_superuser(username='admin', password='x'))
+        self.investors = []
+
+    def add_rows(self, count):
+        # Each row gets its own pitch, entrepreneur and investor, so a missing
+        # select_related shows up as queries that grow with the page
+        for _ in range(count):
+            n = Pitch.objects.count()
+            entrepreneur = User.objects.create(username=f'founder{n}', user_type=1)
+            investor = User.objects.create(username=f'investor{n}', user_type=2)
+            pitch = Pitch.objects.create(entrepreneur=entrepreneur, title=f'Pitch {n}', summary='Summary', funding_amount=1000)
+            question = Question.objects.create(pitch=pitch, author=investor, text='Question')
+            if n % 2:
+                Answer.objects.create(question=question, author=entrepreneur, text='Answer')
+
+    def assertChangelistScales(self, url, model):
+        # The page renders with the same number of queries for 3 rows as for 9
+        self.add_rows(3)
+        with CaptureQueriesContext(connection) as few:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertIsInstance(response.context['cl'].paginator, EstimatedCountPaginator)
+        self.add_rows(6)
+        with CaptureQueriesContext(connection) as many:
+            response = self.client.get(url)
+        self.assertEqual(len(response.context['cl'].result_list), model.objects.count())
+        self.assertEqual(len(many), len(few), [query['sql'] for query in many])
+        return response
+
+    def test_pitch_changelist(self):
+        self.assertChangelistScales('/admin/core/pitch/?created_at__gte=2000-01-01+00:00:00%2B00:00', Pitch)
+
+    def test_question_changelist(self):
+        response = self.assertChangelistScales('/admin/core/question/', Question)
+        unanswered = self.client.get('/admin/core/question/?answered=no').context['cl'].result_list
+        self.assertEqual({question.pk for question in unanswered}, set(Question.objects.filter(answer__isnull=True).values_list('pk', flat=True)))
+        self.assertContains(response, 'Unanswered')
+
+    def test_answer_changelist(self):
+        self.assertChangelistScales('/admin/core/answer/', Answer)
+
+
+# --- API tests ---
+
+@override_settings(STORAGES=TEST_STORAGES)
+class ApiTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.founder = User.objects.create(username='founder', user_type=1)
+        EntrepreneurProfile.objects.create(user=self.founder, company_name='Acme', industry='Fintech')
+        self.investor = User.objects.create(username='investor', user_type=2)
+        self.client.force_login(self.investor)
+
+    def add_pitches(self, count, entrepreneur=None):
+        pitches = []
+        for _ in range(count):
+            pitch = Pitch.objects.create(
+                entrepreneur=entrepreneur or self.founder, title=f'Pitch {Pitch.objects.count()}', summary='Summary', funding_amount=1000,
+            )
+            PitchAttachment.objects.create(
+                pitch=pitch, uploaded_by=pitch.entrepreneur, file='a.pdf', filename='deck.pdf', content_type='application/pdf', size=10, sha256='0' * 64,
+            )
+            pitches.append(pitch)
+        return pitches
+
+    def get(self, url, **headers):
+        return self.client.get(url, headers=headers)
+
+    def test_sparse_fields(self):
+        [pitch] = self.add_pitches(1)
+        with CaptureQueriesContext(connection) as queries:
+            body = self.get('/api/v1/pitches/?fields=title').json()
+        self.assertEqual(body['results'], [{'id': pitch.id, 'title': pitch.title}])
+        page_query = next(query['sql'] for query in queries if 'FROM "core_pitch"' in query['sql'])
+        self.assertNotIn('summary', page_query)
+
+        response = self.get('/api/v1/pitches/?fields=title,secret')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('secret', response.json()['error'])
+
+    def test_query_count_does_not_grow_with_the_page(self):
+        url = '/api/v1/pitches/?fields=title,entrepreneur,company_name,attachments'
+        self.add_pitches(2)
+        with CaptureQueriesContext(connection) as few:
+            self.assertEqual(len(self.get(url).json()['results']), 2)
+        self.add_pitches(8, entrepreneur=User.objects.create(username='other', user_type=1))
+        with self.assertNumQueries(len(few)):
+            results = self.get(url).json()['results']
+        self.assertEqual(len(results), 10)
+        self.assertEqual(results[-1]['company_name'], 'Acme')
+        self.assertEqual(results[0]['attachments'][0]['filename'], 'deck.pdf')
+
+    def follow_pages(self, url):
+        ids = []
+        while url:
+            response = self.get(url)
+            body = json.loads(b''.join(response.streaming_content) if response.streaming else response.content)
+            ids.extend(result['id'] for result in body['results'])
+            url = body['next']
+        return ids
+
+    def test_cursor_pages_have_no_duplicates_or_gaps(self):
+        pitches = self.add_pitches(7)
+        expected = sorted((pitch.id for pitch in pitches), reverse=True)
+        self.assertEqual(self.follow_pages('/api/v1/pitches/?fields=id&limit=3'), expected)
+        # The same through the streamed responses
+        with self.settings(API_BUFFERED_PAGE_SIZE=1):
+            self.assertEqual(self.follow_pages('/api/v1/pitches/?fields=id&limit=3'), expected)
+
+    def test_if_none_match_gets_a_304(self):
+        self.add_pitches(2)
+        response = self.get('/api/v1/pitches/')
+        etag = response['ETag']
+        self.assertEqual(self.get('/api/v1/pitches/', if_none_match=etag).status_code, 304)
+        self.add_pitches(1)
+        self.assertEqual(self.get('/api/v1/pitches/', if_none_match=etag).status_code, 200)
+
+    def test_results_are_scoped_to_the_user(self):
+        rival = User.objects.create(username='rival', user_type=1)
+        mine, theirs = self.add_pitches(1)[0], self.add_pitches(1, entrepreneur=rival)[0]
+        other_investor = User.objects.create(username='other_investor', user_type=2)
+        my_offer = Offer.objects.create(pitch=mine, investor=self.investor, amount=500)
+        Offer.objects.create(pitch=theirs, investor=other_investor, amount=500)
+
+        # Investors see every pitch, but only the offers they made
+        self.assertEqual(len(self.get('/api/v1/pitches/').json()['results']), 2)
+        self.assertEqual([offer['id'] for offer in self.get('/api/v1/offers/').json()['results']], [my_offer.id])
+
+        # Entrepreneurs see their own pitches and the offers received on them
+        self.client.force_login(self.founder)
+        self.assertEqual([pitch['id'] for pitch in self.get('/api/v1/pitches/').json()['results']], [mine.id])
+        self.assertEqual(self.get(f'/api/v1/pitches/{theirs.id}/').status_code, 404)
+        self.assertEqual([offer['id'] for offer in self.get('/api/v1/offers/').json()['results']], [my_offer.id])
+
+
+# --- ASGI entry point tests ---
+
+@override_settings(STORAGES=TEST_STORAGES)
+class CombinedApplicationTests(SimpleTestCase):
+    def test_http_requests_are_served_by_the_wsgi_app(self):
+        async def request():
+            communicator = ApplicationCommunicator(combined_application, {
+                'type': 'http', 'http_version': '1.1', 'method': 'GET', 'scheme': 'http', 'path': '/about/',
+                'root_path': '', 'query_string': b'', 'headers': [(b'host', b'testserver')], 'client': ('127.0.0.1', 5000),
+            })
+            await communicator.send_input({'type': 'http.request', 'body': b''})
+            messages = [await communicator.receive_output(5)]
+            while messages[-1]['type'] != 'http.response.body' or messages[-1].get('more_body'):
+                messages.append(await communicator.receive_output(5))
+            await communicator.wait()
+            return messages
+
+        start, *body = async_to_sync(request)()
+        self.assertEqual((start['type'], start['status']), ('http.response.start', 200))
+        self.assertIn((b'content-type', b'text/html; charset=utf-8'), start['headers'])
+        self.assertIn(b'</html>', b''.join(message.get('body', b'') for message in body))
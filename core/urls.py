@@ -2,6 +2,12 @@
 
 from django.urls import path, include
 from . import views
+from .ratelimit import rate_limit_stats_view
+from .autocomplete import autocomplete_view, autocomplete_stats_view
+from .profiling import profile_list_view, profile_detail_view
+from .resultcache import result_cache_stats_view
+from .api import api_index_view, api_list_view, api_detail_view
+from .attachments import attachment_upload_start_view, attachment_upload_view, attachment_download_view
 
 urlpatterns = [
     path('', views.home_view, name='home'),
@@ -11,14 +17,32 @@ urlpatterns = [
     path('dashboard/', views.dashboard_view, name='dashboard'),
     path('dashboard/entrepreneur/', views.entrepreneur_dashboard_view, name='entrepreneur_dashboard'),
     path('dashboard/investor/', views.investor_dashboard_view, name='investor_dashboard'),
+    path('dashboard/sections/profile/', views.profile_section_view, name='dashboard_profile_section'),
+    path('dashboard/sections/pitches/', views.pitches_section_view, name='dashboard_pitches_section'),
+    path('dashboard/sections/offers/', views.offers_section_view, name='dashboard_offers_section'),
+    path('dashboard/sections/questions/', views.questions_section_view, name='dashboard_questions_section'),
+    path('dashboard/sections/conversations/', views.conversations_section_view, name='dashboard_conversations_section'),
     path('pitch/<int:pitch_id>/', views.pitch_detail_view, name='pitch_detail'),
+    path('pitch/<int:pitch_id>/attachments/', attachment_upload_start_view, name='attachment_upload_start'),
+    path('attachments/uploads/<uuid:upload_id>/', attachment_upload_view, name='attachment_upload'),
+    path('attachments/<int:attachment_id>/', attachment_download_view, name='attachment_download'),
     path('offer/<int:offer_id>/respond/<str:new_status>/', views.respond_to_offer_view, name='respond_to_offer'),
+    path('offers/respond/', views.bulk_respond_to_offers_view, name='bulk_respond_to_offers'),
     path('chat/', include('chat.urls', namespace='chat')),
     path('answer/<int:question_id>/', views.submit_answer_view, name='submit_answer'),
     path('search/', views.search_results_view, name='search_results'),
+    path('search/autocomplete/', autocomplete_view, name='autocomplete'),
+    path('api/v1/', api_index_view, name='api_index'),
+    path('api/v1/<str:resource_name>/', api_list_view, name='api_list'),
+    path('api/v1/<str:resource_name>/<int:pk>/', api_detail_view, name='api_detail'),
     path('about/', views.about_view, name='about'),
     path('how-it-works/', views.how_it_works_view, name='how_it_works'),
     path('contact/', views.contact_view, name='contact'),
+    path('monitoring/rate-limits/', rate_limit_stats_view, name='rate_limit_stats'),
+    path('monitoring/autocomplete/', autocomplete_stats_view, name='autocomplete_stats'),
+    path('monitoring/result-cache/', result_cache_stats_view, name='result_cache_stats'),
+    path('monitoring/profiles/', profile_list_view, name='profile_list'),
+    path('monitoring/profiles/<slug:profile_id>/', profile_detail_view, name='profile_detail'),
 ]
 
 
@@ -1,27 +1,49 @@
 # This file contains the logic that handles requests and returns responses.
 # We'll create views for signing up, logging in, logging out, and the home page.
 
+from django.conf import settings
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth import login, authenticate, logout
 from django.contrib.auth.decorators import login_required
-from django.http import HttpResponseForbidden
+from django.http import HttpResponseForbidden, HttpResponseBadRequest
+from django.views.decorators.http import require_POST
 from django.contrib.auth.forms import AuthenticationForm
 from .forms import (
     EntrepreneurSignUpForm, InvestorSignUpForm,
     EntrepreneurProfileForm, InvestorProfileForm,
     PitchForm, OfferForm, QuestionForm, AnswerForm
 )
-from .models import User, EntrepreneurProfile, InvestorProfile, Pitch, Offer, Question, Answer
+from .models import User, EntrepreneurProfile, InvestorProfile, Pitch, Offer, Question, Answer, PitchMatch, PitchAttachment, ArchivedPitch, ArchivedOffer
+from .services import respond_to_offers
+from .analytics import record_event, pitch_stats_for
+from .resultcache import normalize_query, cached_search, cached_result
 from chat.models import Conversation
-from django.db.models import Q # Add this import for complex queries
+from django.db.models import Q, Prefetch # Add this import for complex queries
 from django.views.generic import TemplateView
 
+# Columns rendered by the pitch cards on the home page, the search results and
+# the investor dashboard. The long text fields (the pitch's details and the
+# profile's business plan and company details) are never read for a list.
+PITCH_CARD_FIELDS = (
+    'title', 'summary', 'funding_amount', 'created_at',
+    'entrepreneur__first_name', 'entrepreneur__last_name',
+    'entrepreneur__entrepreneur_profile__company_name',
+    'entrepreneur__entrepreneur_profile__company_logo',
+    'entrepreneur__entrepreneur_profile__industry',
+)
+
+def pitch_cards():
+    """
+    Pitches joined to their entrepreneur and profile, loading only PITCH_CARD_FIELDS.
+    """
+    return Pitch.objects.select_related('entrepreneur__entrepreneur_profile').only(*PITCH_CARD_FIELDS)
+
 def home_view(request):
     """
     The main landing page.
     """
     # Get the 3 most recent pitches to feature on the homepage
-    featured_pitches = Pitch.objects.select_related('entrepreneur__entrepreneur_profile').order_by('-created_at')[:3]
+    featured_pitches = pitch_cards().order_by('-created_at')[:3]
     
     context = {
         'featured_pitches': featured_pitches
@@ -34,22 +56,28 @@ def search_results_view(request):
     investors = User.objects.none() # Default to an empty queryset
 
     if query:
+        # The matching ids are cached per normalized query (see core/resultcache.py)
+        terms = normalize_query(query)
+
         # Search for pitches based on title, summary, company name, or industry
-        pitches = Pitch.objects.filter(
-            Q(title__icontains=query) |
-            Q(summary__icontains=query) |
-            Q(entrepreneur__entrepreneur_profile__company_name__icontains=query) |
-            Q(entrepreneur__entrepreneur_profile__industry__icontains=query)
-        ).distinct()
+        pitches = cached_search('search_pitches', {'q': terms}, pitch_cards().filter(
+            Q(title__icontains=terms) |
+            Q(summary__icontains=terms) |
+            Q(entrepreneur__entrepreneur_profile__company_name__icontains=terms) |
+            Q(entrepreneur__entrepreneur_profile__industry__icontains=terms)
+        ).distinct().order_by('-created_at'), pitch_cards())
 
         # Search for investors based on name or investment interests
-        investors = User.objects.filter(
+        investor_rows = User.objects.select_related('investor_profile').only(
+            'first_name', 'last_name', 'investor_profile__investment_interests'
+        )
+        investors = cached_search('search_investors', {'q': terms}, investor_rows.filter(
             user_type=2
         ).filter(
-            Q(first_name__icontains=query) |
-            Q(last_name__icontains=query) |
-            Q(investor_profile__investment_interests__icontains=query)
-        ).distinct()
+            Q(first_name__icontains=terms) |
+            Q(last_name__icontains=terms) |
+            Q(investor_profile__investment_interests__icontains=terms)
+        ).distinct().order_by('id'), investor_rows)
 
     context = {
         'query': query,
@@ -114,6 +142,116 @@ def dashboard_view(request):
         # Fallback for superusers or users without a type
         return redirect('home')
 
+# --- Dashboard sections ---
+# Each dashboard section lives in its own template under templates/dashboard/. The
+# dashboards include them all, and the section views further down render one on
+# its own, so static/js/dashboard_fragments.js can submit a section's form and
+# swap in just that section instead of reloading the whole page.
+
+def my_pitches_for(user):
+    """
+    The entrepreneur's pitches with their attachments and analytics panel numbers.
+    """
+    pitches = list(
+        Pitch.objects.filter(entrepreneur=user)
+        .only('title', 'summary', 'created_at')
+        .prefetch_related(Prefetch('attachments', queryset=PitchAttachment.objects.only('pitch', 'filename', 'size').order_by('created_at')))
+        .order_by('-created_at')
+    )
+    # Attach the analytics panel numbers, read from the daily aggregates only
+    pitch_stats = pitch_stats_for(user)
+    for pitch in pitches:
+        pitch.stats = pitch_stats.get(pitch.id)
+    return pitches
+
+def archived_pitches_for(user):
+    """
+    The entrepreneur's pitches moved to the archive by core/archive.py, listed after the live ones.
+    """
+    return ArchivedPitch.objects.filter(entrepreneur=user).only('title', 'summary', 'created_at', 'total_views').order_by('-created_at')
+
+def received_offers_for(user):
+    return (
+        Offer.objects.filter(pitch__entrepreneur=user)
+        .select_related('pitch', 'investor')
+        .only('amount', 'message', 'status', 'pitch__title', 'investor__first_name', 'investor__last_name')
+        .order_by('-created_at')
+    )
+
+def offers_made_by(user):
+    return (
+        Offer.objects.filter(investor=user)
+        .select_related('pitch__entrepreneur')
+        .only(
+            'amount', 'message', 'status', 'pitch__title', 'pitch__funding_amount',
+            'pitch__entrepreneur__first_name', 'pitch__entrepreneur__last_name',
+        )
+        .order_by('-created_at')
+    )
+
+def archived_offers_by(user):
+    """
+    The investor's rejected offers moved to the archive by core/archive.py, listed after the live ones.
+    """
+    return ArchivedOffer.objects.filter(investor=user).only('pitch_title', 'amount', 'message', 'status').order_by('-created_at')
+
+def unanswered_questions_for(user):
+    return (
+        Question.objects.filter(pitch__entrepreneur=user, answer__isnull=True)
+        .select_related('pitch').only('text', 'pitch__title').order_by('-created_at')
+    )
+
+def conversations_for(user):
+    """
+    The user's conversations, joined to whoever is on the other side of the offer.
+    """
+    conversations = Conversation.objects.filter(participants=user).order_by('-created_at')
+    if user.user_type == 1:
+        return conversations.select_related('offer__pitch', 'offer__investor').only(
+            'offer__pitch__title', 'offer__investor__first_name', 'offer__investor__last_name'
+        )
+    return conversations.select_related('offer__pitch__entrepreneur').only(
+        'offer__pitch__title', 'offer__pitch__entrepreneur__first_name', 'offer__pitch__entrepreneur__last_name'
+    )
+
+def browse_pitches(params):
+    """
+    The investor's pitch list, searched and filtered by the `q` and `industry` GET parameters.
+    The matching ids and the industry list are cached until the pitches change (see core/resultcache.py).
+    """
+    search_query = params.get('q', '')
+    selected_industry = params.get('industry', '')
+    terms = normalize_query(search_query)
+
+    all_pitches = pitch_cards().order_by('-created_at')
+    if terms:
+        all_pitches = all_pitches.filter(
+            Q(title__icontains=terms) |
+            Q(summary__icontains=terms) |
+            Q(content__details__icontains=terms)
+        )
+    if selected_industry:
+        all_pitches = all_pitches.filter(entrepreneur__entrepreneur_profile__industry=selected_industry)
+    all_pitches = cached_search('dashboard_pitches', {'q': terms, 'industry': selected_industry}, all_pitches, pitch_cards())
+
+    # Get a list of unique industries for the filter dropdown
+    industries = cached_result('industries', {}, lambda: list(
+        EntrepreneurProfile.objects.exclude(industry__exact='').values_list('industry', flat=True).distinct().order_by('industry')
+    ))
+
+    return {
+        'all_pitches': all_pitches,
+        'industries': industries,
+        'search_query': search_query,
+        'selected_industry': selected_industry,
+    }
+
+def wants_fragment(request):
+    """
+    True for requests sent by dashboard_fragments.js, which expect an HTML fragment instead of a redirect.
+    """
+    return request.headers.get('X-Fragment') == 'true'
+
 @login_required
 def entrepreneur_dashboard_view(request):
     """
@@ -127,38 +265,29 @@ def entrepreneur_dashboard_view(request):
     profile_form = EntrepreneurProfileForm(instance=profile)
     pitch_form = PitchForm()
 
-    # Get all unanswered questions for this entrepreneur's pitches
-    unanswered_questions = Question.objects.filter(pitch__entrepreneur=request.user, answer__isnull=True).order_by('-created_at')
-    answer_form = AnswerForm()
-
     if request.method == 'POST':
         if 'save_profile' in request.POST:
-            profile_form = EntrepreneurProfileForm(request.POST, instance=profile)
+            profile_form = EntrepreneurProfileForm(request.POST, request.FILES, instance=profile)
             if profile_form.is_valid():
                 profile_form.save()
                 return redirect('entrepreneur_dashboard')
         elif 'submit_pitch' in request.POST:
             pitch_form = PitchForm(request.POST)
             if pitch_form.is_valid():
-                pitch = pitch_form.save(commit=False)
-                pitch.entrepreneur = request.user
-                pitch.save()
+                pitch_form.instance.entrepreneur = request.user
+                pitch_form.save()  # Saves the details to PitchContent too
                 return redirect('entrepreneur_dashboard')
 
-    my_pitches = Pitch.objects.filter(entrepreneur=request.user).order_by('-created_at')
-    # Get all offers for this entrepreneur's pitches
-    received_offers = Offer.objects.filter(pitch__entrepreneur=request.user).order_by('-created_at')
-    # Get conversations
-    my_conversations = Conversation.objects.filter(participants=request.user).order_by('-created_at')
-        
     context = {
         'profile_form': profile_form,
         'pitch_form': pitch_form,
-        'my_pitches': my_pitches,
-        'received_offers': received_offers, # Add offers to context
-        'my_conversations': my_conversations, # Add to context
-        'unanswered_questions': unanswered_questions,
-        'answer_form': answer_form,
+        'my_pitches': my_pitches_for(request.user),
+        'archived_pitches': archived_pitches_for(request.user),
+        'received_offers': received_offers_for(request.user),
+        'my_conversations': conversations_for(request.user),
+        'unanswered_questions': unanswered_questions_for(request.user),
+        'answer_form': AnswerForm(),
+        'attachment_types': ','.join(settings.PITCH_ATTACHMENT_TYPES),
     }
     return render(request, 'entrepreneur_dashboard.html', context)
 
@@ -173,47 +302,111 @@ def investor_dashboard_view(request):
     profile, created = InvestorProfile.objects.get_or_create(user=request.user)
     
     if request.method == 'POST':
-        form = InvestorProfileForm(request.POST, instance=profile)
-        if form.is_valid():
-            form.save()
+        profile_form = InvestorProfileForm(request.POST, instance=profile)
+        if profile_form.is_valid():
+            profile_form.save()
             return redirect('investor_dashboard')
     else:
-        form = InvestorProfileForm(instance=profile)
+        profile_form = InvestorProfileForm(instance=profile)
 
-    # --- Search and Filter Logic ---
-    all_pitches = Pitch.objects.select_related('entrepreneur__entrepreneur_profile').all().order_by('-created_at')
+    # New pitches matched to this investor's interests (see core/matching.py)
+    pitch_matches = (
+        PitchMatch.objects.filter(investor=request.user)
+        .select_related('pitch').only('pitch__title', 'pitch__summary').order_by('-created_at')[:10]
+    )
     
-    search_query = request.GET.get('q', '')
-    selected_industry = request.GET.get('industry', '')
+    context = {
+        'profile_form': profile_form,
+        'pitch_matches': pitch_matches,
+        'my_conversations': conversations_for(request.user),
+        'offers_made': offers_made_by(request.user),
+        'archived_offers': archived_offers_by(request.user),
+        **browse_pitches(request.GET),
+    }
+    return render(request, 'investor_dashboard.html', context)
 
-    if search_query:
-        all_pitches = all_pitches.filter(
-            Q(title__icontains=search_query) |
-            Q(summary__icontains=search_query) |
-            Q(details__icontains=search_query)
-        )
-    
-    if selected_industry:
-        all_pitches = all_pitches.filter(entrepreneur__entrepreneur_profile__industry=selected_industry)
+# --- Dashboard section views ---
+# GET renders the section as it is now. POST submits the section's form and
+# returns the section again: updated on success, with the form errors (and a
+# 400 status) otherwise. Users without a dashboard get a 403.
 
-    # Get a list of unique industries for the filter dropdown
-    industries = EntrepreneurProfile.objects.exclude(industry__exact='').values_list('industry', flat=True).distinct().order_by('industry')
-    
-    # --- Get all offers made by this specific investor ---
-    offers_made = Offer.objects.filter(investor=request.user).select_related('pitch').order_by('-created_at')
-    
-    my_conversations = Conversation.objects.filter(participants=request.user).order_by('-created_at')
-    
+@login_required
+def profile_section_view(request):
+    if request.user.user_type == 1:
+        profile, created = EntrepreneurProfile.objects.get_or_create(user=request.user)
+        form_class, template = EntrepreneurProfileForm, 'dashboard/entrepreneur_profile.html'
+    elif request.user.user_type == 2:
+        profile, created = InvestorProfile.objects.get_or_create(user=request.user)
+        form_class, template = InvestorProfileForm, 'dashboard/investor_profile.html'
+    else:
+        return HttpResponseForbidden("You do not have a dashboard.")
+
+    profile_form = form_class(instance=profile)
+    saved, status = False, 200
+    if request.method == 'POST':
+        profile_form = form_class(request.POST, request.FILES, instance=profile)
+        if profile_form.is_valid():
+            profile_form.save()
+            saved = True
+        else:
+            status = 400
+    return render(request, template, {'profile_form': profile_form, 'profile_saved': saved}, status=status)
+
+@login_required
+def pitches_section_view(request):
+    if request.user.user_type == 2:
+        return render(request, 'dashboard/investor_pitches.html', browse_pitches(request.GET))
+    if request.user.user_type != 1:
+        return HttpResponseForbidden("You do not have a dashboard.")
+
+    pitch_form, status = PitchForm(), 200
+    if request.method == 'POST':
+        pitch_form = PitchForm(request.POST)
+        if pitch_form.is_valid():
+            pitch_form.instance.entrepreneur = request.user
+            pitch_form.save()
+            pitch_form = PitchForm()
+        else:
+            status = 400
     context = {
-        'form': form,
-        'all_pitches': all_pitches,
-        'my_conversations': my_conversations,
-        'industries': industries,
-        'search_query': search_query,
-        'selected_industry': selected_industry,
-        'offers_made': offers_made,
+        'pitch_form': pitch_form,
+        'my_pitches': my_pitches_for(request.user),
+        'archived_pitches': archived_pitches_for(request.user),
+        'attachment_types': ','.join(settings.PITCH_ATTACHMENT_TYPES),
     }
-    return render(request, 'investor_dashboard.html', context)
+    return render(request, 'dashboard/entrepreneur_pitches.html', context, status=status)
+
+@login_required
+def offers_section_view(request):
+    if request.user.user_type == 2:
+        return render(request, 'dashboard/offers_made.html', {
+            'offers_made': offers_made_by(request.user),
+            'archived_offers': archived_offers_by(request.user),
+        })
+    if request.user.user_type != 1:
+        return HttpResponseForbidden("You do not have a dashboard.")
+
+    if request.method == 'POST':
+        error = respond_to_selected_offers(request)
+        if error:
+            return error
+    return render(request, 'dashboard/received_offers.html', {'received_offers': received_offers_for(request.user)})
+
+@login_required
+def questions_section_view(request):
+    if request.user.user_type != 1:
+        return HttpResponseForbidden("Only entrepreneurs receive questions.")
+    context = {
+        'unanswered_questions': unanswered_questions_for(request.user),
+        'answer_form': AnswerForm(),
+    }
+    return render(request, 'dashboard/unanswered_questions.html', context)
+
+@login_required
+def conversations_section_view(request):
+    if request.user.user_type not in (1, 2):
+        return HttpResponseForbidden("You do not have a dashboard.")
+    return render(request, 'dashboard/conversations.html', {'my_conversations': conversations_for(request.user)})
 
 
 # --- Pitch Detail View ---
@@ -227,7 +420,11 @@ def pitch_detail_view(request, pitch_id):
     if request.user.user_type != 2: # Must be an investor
         return redirect('dashboard')
 
-    pitch = get_object_or_404(Pitch, id=pitch_id)
+    # Pull the pitch together with its details, entrepreneur and their profile in one joined query
+    pitch = get_object_or_404(
+        Pitch.objects.select_related('content', 'entrepreneur__entrepreneur_profile'),
+        id=pitch_id
+    )
     offer_form = OfferForm()
     question_form = QuestionForm()
 
@@ -253,13 +450,21 @@ def pitch_detail_view(request, pitch_id):
         else:
             offer_form = o_form # Show errors if invalid
 
+    # Count the view in the buffered engagement tracker (no per-view write)
+    if request.method == 'GET':
+        record_event(pitch.id, 'views')
+
     # Check if this investor has already made an offer on this pitch
     existing_offer = Offer.objects.filter(pitch=pitch, investor=request.user).first()
 
-    questions = pitch.questions.order_by('-created_at')
+    # The Q&A thread is fragment-cached in the template (see core/signals.py for invalidation).
+    # This queryset is lazy, so it only hits the database on a cache miss, and then
+    # fetches every question together with its author, answer and answer author.
+    questions = pitch.questions.select_related('author', 'answer__author').order_by('-created_at')
 
     context = {
         'pitch': pitch,
+        'attachments': pitch.attachments.order_by('created_at'),
         'offer_form': offer_form,
         'existing_offer': existing_offer,
         'question_form': question_form,
@@ -273,41 +478,66 @@ def respond_to_offer_view(request, offer_id, new_status):
     """
     A single view to handle both accepting and rejecting an offer.
     """
-    offer = get_object_or_404(Offer, id=offer_id)
+    offer = get_object_or_404(Offer.objects.select_related('pitch'), id=offer_id)
     
     # Security check: ensure the logged-in user is the pitch owner
-    if offer.pitch.entrepreneur != request.user:
+    if offer.pitch.entrepreneur_id != request.user.id:
         return HttpResponseForbidden("You are not authorized to respond to this offer.")
     
-    # Validate the new status
+    # Validate the new status and apply it through the offer state machine
     if new_status in ['accepted', 'rejected']:
-        offer.status = new_status
-        offer.save()
-    
-    # If accepted, create a new conversation
-        if new_status == 'accepted':
-            conversation, created = Conversation.objects.get_or_create(offer=offer)
-            if created:
-                conversation.participants.add(offer.pitch.entrepreneur, offer.investor)
+        respond_to_offers(request.user, [offer.id], new_status)
 
     return redirect('entrepreneur_dashboard')
 
+@login_required
+@require_POST
+def bulk_respond_to_offers_view(request):
+    """
+    Accepts or rejects every selected offer in one transaction.
+    Offers that don't belong to the user's pitches or are no longer pending are skipped.
+    """
+    return respond_to_selected_offers(request) or redirect('entrepreneur_dashboard')
+
+def respond_to_selected_offers(request):
+    """
+    Applies the bulk offer form: the ticked offer_ids and the clicked new_status.
+    Returns a 400 response if the status is invalid, otherwise None.
+    """
+    new_status = request.POST.get('new_status')
+    if new_status not in ['accepted', 'rejected']:
+        return HttpResponseBadRequest("Invalid offer status.")
+
+    offer_ids = [int(offer_id) for offer_id in request.POST.getlist('offer_ids') if offer_id.isdigit()]
+    if offer_ids:
+        respond_to_offers(request.user, offer_ids, new_status)
+    return None
+
 # --- NEW view for submitting an answer ---
 @login_required
 def submit_answer_view(request, question_id):
-    question = get_object_or_404(Question, id=question_id)
+    """
+    Saves the entrepreneur's answer. Requests from dashboard_fragments.js get
+    back just the question's row, answered (or with the form errors).
+    """
+    question = get_object_or_404(Question.objects.select_related('pitch'), id=question_id)
     # Security check: only the pitch owner can answer
-    if request.user != question.pitch.entrepreneur:
+    if request.user.id != question.pitch.entrepreneur_id:
         return HttpResponseForbidden("You are not authorized to answer this question.")
 
-    if request.method == 'POST':
+    answer = Answer.objects.filter(question=question).first()
+    form = AnswerForm()
+    if request.method == 'POST' and answer is None:
         form = AnswerForm(request.POST)
         if form.is_valid():
             answer = form.save(commit=False)
             answer.question = question
             answer.author = request.user
             answer.save()
-    
+
+    if wants_fragment(request):
+        status = 400 if form.errors else 200
+        return render(request, 'dashboard/question_row.html', {'q': question, 'answer': answer, 'answer_form': form}, status=status)
     return redirect('entrepreneur_dashboard')
 
 # Views for static pages
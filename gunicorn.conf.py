@@ -0,0 +1,77 @@
+# Production server configuration for gunicorn.
+# The Procfile starts gunicorn with this file; every value can be overridden
+# from the environment so the fleet can be resized without a code change.
+#
+# SERVER_MODE picks what the workers serve:
+#   asgi      - uvicorn workers running invent.asgi:application (HTTP + websockets)
+#   combined  - uvicorn workers running invent.asgi:combined_application, where
+#               websockets are served natively and HTTP goes through the WSGI app
+#               on a thread pool (no per-middleware sync/async switching)
+#   wsgi      - threaded sync workers running invent.wsgi:application (HTTP only;
+#               websockets must be served by a separate asgi/combined process)
+
+import multiprocessing
+import os
+
+SERVER_MODE = os.environ.get('SERVER_MODE', 'asgi')
+
+APPS = {
+    'asgi': 'invent.asgi:application',
+    'combined': 'invent.asgi:combined_application',
+    'wsgi': 'invent.wsgi:application',
+}
+if SERVER_MODE not in APPS:
+    raise ValueError(f"SERVER_MODE must be one of {', '.join(APPS)}, not '{SERVER_MODE}'.")
+
+wsgi_app = APPS[SERVER_MODE]
+bind = f"0.0.0.0:{os.environ.get('PORT', '8000')}"
+
+# --- Workers ---
+
+cpu_count = multiprocessing.cpu_count()
+
+if SERVER_MODE == 'wsgi':
+    worker_class = 'gthread'
+    threads = int(os.environ.get('GUNICORN_THREADS', 4))
+    default_workers = cpu_count * 2 + 1
+else:
+    # Async workers keep many websockets open per process, so fewer are needed
+    worker_class = 'uvicorn_worker.UvicornWorker'
+    default_workers = cpu_count + 1
+
+workers = int(os.environ.get('WEB_CONCURRENCY', default_workers))
+
+# Import Django, the apps and settings once in the master and fork the workers
+# from it, instead of every worker repeating the whole boot.
+preload_app = os.environ.get('GUNICORN_PRELOAD', 'True').lower() == 'true'
+
+# --- Recycling ---
+
+# Restart each worker after this many requests (with jitter so they don't all
+# restart at once) to bound slow memory growth.
+max_requests = int(os.environ.get('GUNICORN_MAX_REQUESTS', 1000))
+max_requests_jitter = int(os.environ.get('GUNICORN_MAX_REQUESTS_JITTER', 100))
+
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 30))
+graceful_timeout = int(os.environ.get('GUNICORN_GRACEFUL_TIMEOUT', 30))
+keepalive = int(os.environ.get('GUNICORN_KEEPALIVE', 5))
+
+accesslog = '-'
+errorlog = '-'
+
+# --- Hooks ---
+
+def post_fork(server, worker):
+    # Never share a database connection opened in the master with forked workers
+    if server.cfg.preload_app:
+        from django.db import connections
+        connections.close_all()
+
+def post_worker_init(worker):
+    # Build the search autocomplete index before the worker takes requests
+    from django.db import connections
+    from core.autocomplete import autocomplete
+    try:
+        autocomplete.ensure_built()
+    finally:
+        connections.close_all()
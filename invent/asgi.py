@@ -3,23 +3,136 @@ ASGI config for invent project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+It also exposes ``combined_application`` for the "combined" server mode (see
+gunicorn.conf.py): websockets are served by Channels as usual, while HTTP
+requests are handed to the WSGI application on a thread pool.
+
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
 """
 
 import os
+import sys
+from tempfile import SpooledTemporaryFile
+
+from asgiref.sync import async_to_sync, sync_to_async
 from django.core.asgi import get_asgi_application
+from django.core.wsgi import get_wsgi_application
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'invent.settings')
+
+# Set up Django (and the app registry) before importing anything that loads models
+django_asgi_app = get_asgi_application()
+
 from channels.routing import ProtocolTypeRouter, URLRouter
 from channels.auth import AuthMiddlewareStack
 import chat.routing
 
-os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'invent.settings')
+websocket_app = AuthMiddlewareStack(
+    URLRouter(
+        chat.routing.websocket_urlpatterns
+    )
+)
 
 application = ProtocolTypeRouter({
-    "http": get_asgi_application(),
-    "websocket": AuthMiddlewareStack(
-        URLRouter(
-            chat.routing.websocket_urlpatterns
-        )
-    ),
+    "http": django_asgi_app,
+    "websocket": websocket_app,
+})
+
+
+def wsgi_environ(scope, body):
+    """
+    The WSGI environ for an ASGI HTTP scope and its request body.
+    """
+    script_name = scope.get('root_path', '').encode('utf8').decode('latin1')
+    path_info = scope['path'].encode('utf8').decode('latin1')
+    if script_name and path_info.startswith(script_name):
+        path_info = path_info[len(script_name):]
+    server_name, server_port = scope.get('server') or ('localhost', 80)
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': script_name,
+        'PATH_INFO': path_info,
+        'QUERY_STRING': scope['query_string'].decode('ascii'),
+        'SERVER_NAME': server_name,
+        'SERVER_PORT': str(server_port),
+        'SERVER_PROTOCOL': f"HTTP/{scope['http_version']}",
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': body,
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': True,
+        'wsgi.run_once': False,
+    }
+    if scope.get('client'):
+        environ['REMOTE_ADDR'] = scope['client'][0]
+    for name, value in scope.get('headers', []):
+        name = name.decode('latin1').upper().replace('-', '_')
+        if name not in ('CONTENT_LENGTH', 'CONTENT_TYPE'):
+            name = f'HTTP_{name}'
+        value = value.decode('latin1')
+        environ[name] = f'{environ[name]},{value}' if name in environ else value
+    return environ
+
+
+class ThreadPoolWsgiToAsgi:
+    """
+    Serves a WSGI application to an ASGI server. asgiref's WsgiToAsgi runs WSGI
+    apps with thread_sensitive=True, which funnels every request in the process
+    through one thread; our views don't rely on thread affinity, so each request
+    runs on the default thread pool instead. Response chunks are sent as the
+    application yields them.
+    """
+    def __init__(self, wsgi_application):
+        self.wsgi_application = wsgi_application
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            raise ValueError("The WSGI adapter only serves HTTP.")
+        with SpooledTemporaryFile(max_size=65536) as body:
+            while True:
+                message = await receive()
+                if message['type'] == 'http.disconnect':
+                    return
+                body.write(message.get('body', b''))
+                if not message.get('more_body'):
+                    break
+            body.seek(0)
+            await sync_to_async(self.run, thread_sensitive=False)(scope, body, async_to_sync(send))
+
+    def run(self, scope, body, send):
+        start = {}
+
+        def start_response(status, headers, exc_info=None):
+            if exc_info and start.get('sent'):
+                raise exc_info[1].with_traceback(exc_info[2])
+            start['message'] = {
+                'type': 'http.response.start',
+                'status': int(status.split(' ', 1)[0]),
+                'headers': [(name.lower().encode('latin1'), value.encode('latin1')) for name, value in headers],
+            }
+
+        def send_start():
+            if not start.get('sent'):
+                start['sent'] = True
+                send(start['message'])
+
+        output = self.wsgi_application(wsgi_environ(scope, body), start_response)
+        try:
+            for chunk in output:
+                send_start()
+                if chunk:
+                    send({'type': 'http.response.body', 'body': chunk, 'more_body': True})
+            send_start()
+            send({'type': 'http.response.body'})
+        finally:
+            # Django finishes the request (request_finished, closing connections) here
+            if hasattr(output, 'close'):
+                output.close()
+
+
+combined_application = ProtocolTypeRouter({
+    "http": ThreadPoolWsgiToAsgi(get_wsgi_application()),
+    "websocket": websocket_app,
 })
@@ -14,6 +14,7 @@ from dotenv import load_dotenv
 load_dotenv()
 
 import os
+import sys
 import dj_database_url
 
 from pathlib import Path
@@ -55,6 +56,8 @@ MIDDLEWARE = [
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'core.profiling.ProfilingMiddleware',
+    'core.ratelimit.RateLimitMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -91,6 +94,56 @@ DATABASES = {
     )
 }
 
+# SQLite under concurrent requests (see core/sqlite/base.py): WAL journaling so
+# reads never wait for a write, BEGIN IMMEDIATE transactions, a busy timeout of
+# SQLITE_BUSY_TIMEOUT seconds and every write queued behind a single writer.
+# The pragmas run on each new connection; SQLITE_CACHE_KB and SQLITE_MMAP_MB are
+# per connection. Off unless SQLITE_CONCURRENT_MODE=True is set: WAL mode is
+# stored in the database file and changes how it must be backed up (copy the
+# -wal file too, or use the sqlite3 .backup command).
+SQLITE_CONCURRENT_MODE = os.environ.get('SQLITE_CONCURRENT_MODE', 'False').lower() == 'true'
+SQLITE_BUSY_TIMEOUT = int(os.environ.get('SQLITE_BUSY_TIMEOUT', 20))
+SQLITE_CACHE_KB = int(os.environ.get('SQLITE_CACHE_KB', 20000))
+SQLITE_MMAP_MB = int(os.environ.get('SQLITE_MMAP_MB', 256))
+
+if DATABASES['default'].get('ENGINE') == 'django.db.backends.sqlite3':
+    # ssl_require adds an sslmode option, which sqlite3.connect() does not accept
+    DATABASES['default'].setdefault('OPTIONS', {}).pop('sslmode', None)
+    if SQLITE_CONCURRENT_MODE:
+        DATABASES['default']['ENGINE'] = 'core.sqlite'
+        DATABASES['default']['OPTIONS'].update({
+            'timeout': SQLITE_BUSY_TIMEOUT,
+            'transaction_mode': 'IMMEDIATE',
+            'init_command': ';'.join([
+                'PRAGMA journal_mode=WAL',
+                # With WAL, NORMAL only syncs at checkpoints; a power cut may lose the last commits but never corrupts
+                'PRAGMA synchronous=NORMAL',
+                f'PRAGMA cache_size=-{SQLITE_CACHE_KB}',
+                f'PRAGMA mmap_size={SQLITE_MMAP_MB * 1024 * 1024}',
+                'PRAGMA temp_store=MEMORY',
+            ]),
+        })
+
+
+# Cache configuration
+# Uses Redis when REDIS_URL is set so cached fragments are shared (and invalidated)
+# across all worker processes; falls back to a per-process memory cache otherwise.
+REDIS_URL = os.environ.get('REDIS_URL')
+
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -132,8 +185,21 @@ STATIC_URL = 'static/'
 STATICFILES_DIRS = [BASE_DIR / 'static']
 STATIC_ROOT = BASE_DIR / 'staticfiles'
 
-# Add this line for better production performance
-STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
+# The site font is self-hosted from static/fonts/ (see `manage.py buildcss`).
+# Pages never load fonts from a CDN unless WEB_FONTS_CDN_FALLBACK is set, in which
+# case the weights missing from static/fonts/ are loaded from Google Fonts.
+WEB_FONTS_CDN_FALLBACK = os.environ.get('WEB_FONTS_CDN_FALLBACK', 'False').lower() == 'true'
+
+# Serve content-hashed, precompressed (gzip/brotli) static files through WhiteNoise.
+# (STATICFILES_STORAGE was removed in Django 5.1; STORAGES replaces it.)
+STORAGES = {
+    'default': {
+        'BACKEND': 'django.core.files.storage.FileSystemStorage',
+    },
+    'staticfiles': {
+        'BACKEND': 'whitenoise.storage.CompressedManifestStaticFilesStorage',
+    },
+}
 
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
@@ -146,12 +212,144 @@ MEDIA_ROOT = BASE_DIR / 'media'
 
 AUTH_USER_MODEL = 'core.User'
 
-CHANNEL_LAYERS = {
-    'default': {
-        'BACKEND': 'channels.layers.InMemoryChannelLayer',
-    },
-}
+# Use Redis for the channel layer when available so events published by one
+# process (e.g. dashboard notifications) reach websockets held by another.
+if REDIS_URL:
+    CHANNEL_LAYERS = {
+        'default': {
+            'BACKEND': 'channels_redis.core.RedisChannelLayer',
+            'CONFIG': {
+                'hosts': [REDIS_URL],
+            },
+        },
+    }
+else:
+    CHANNEL_LAYERS = {
+        'default': {
+            'BACKEND': 'channels.layers.InMemoryChannelLayer',
+        },
+    }
 
 ASGI_APPLICATION = 'invent.asgi.application'
 
-LOGIN_URL = 'login'
\ No newline at end of file
+LOGIN_URL = 'login'
+
+# Pitch analytics (see core/analytics.py): buffered view/engagement counters are
+# flushed to the daily PitchViewStats table every PITCH_STATS_FLUSH_INTERVAL
+# seconds, or as soon as PITCH_STATS_MAX_BUFFERED keys are buffered. 0 disables
+# the background flush and the flush at exit, and is always used by the test
+# runner so it never writes to the real database.
+TESTING = sys.argv[1:2] == ['test']
+PITCH_STATS_FLUSH_INTERVAL = 0 if TESTING else int(os.environ.get('PITCH_STATS_FLUSH_INTERVAL', 30))
+PITCH_STATS_MAX_BUFFERED = int(os.environ.get('PITCH_STATS_MAX_BUFFERED', 1000))
+
+# Rate limiting (see core/ratelimit.py): token buckets per user/IP and rule.
+# 'rate' is the sustained requests per second, 'burst' the bucket size.
+RATE_LIMITS = {
+    'search': {'rate': 1.0, 'burst': 20},
+    'chat_send': {'rate': 2.0, 'burst': 10},
+    'autocomplete': {'rate': 5.0, 'burst': 30},
+    'api': {'rate': 5.0, 'burst': 50},
+}
+
+# URL name -> rule applied by RateLimitMiddleware
+RATE_LIMITED_ROUTES = {
+    'search_results': 'search',
+    'chat:search': 'search',
+    'autocomplete': 'autocomplete',
+    'api_list': 'api',
+    'api_detail': 'api',
+}
+
+# 'cache' shares buckets across processes through CACHES; 'memory' is per process
+RATELIMIT_BACKEND = 'cache' if REDIS_URL else 'memory'
+RATELIMIT_TRUST_X_FORWARDED_FOR = os.environ.get('RATELIMIT_TRUST_X_FORWARDED_FOR', 'False').lower() == 'true'
+
+# Archival (see core/archive.py): rows older than this many days are moved to
+# the archive tables by `manage.py archivedata`.
+ARCHIVE_RETENTION_DAYS = {
+    'messages': int(os.environ.get('ARCHIVE_MESSAGES_AFTER_DAYS', 365)),
+    'rejected_offers': int(os.environ.get('ARCHIVE_REJECTED_OFFERS_AFTER_DAYS', 90)),
+    'stale_pitches': int(os.environ.get('ARCHIVE_STALE_PITCHES_AFTER_DAYS', 365)),
+}
+
+# Chat sockets (see chat/consumers.py). Clients ping every CHAT_HEARTBEAT_INTERVAL
+# seconds; sockets silent for CHAT_IDLE_TIMEOUT seconds are closed. A reconnecting
+# client is sent at most CHAT_GAP_FILL_LIMIT missed messages, otherwise it reloads.
+CHAT_HEARTBEAT_INTERVAL = int(os.environ.get('CHAT_HEARTBEAT_INTERVAL', 25))
+CHAT_IDLE_TIMEOUT = int(os.environ.get('CHAT_IDLE_TIMEOUT', 75))
+CHAT_GAP_FILL_LIMIT = int(os.environ.get('CHAT_GAP_FILL_LIMIT', 200))
+
+# Search-box autocomplete (see core/autocomplete.py): an in-memory index per process,
+# capped at AUTOCOMPLETE_MAX_ENTRIES labels (the oldest are evicted first) and rebuilt every AUTOCOMPLETE_REBUILD_INTERVAL
+# seconds (0 disables) to pick up changes made by other processes.
+AUTOCOMPLETE_MAX_ENTRIES = int(os.environ.get('AUTOCOMPLETE_MAX_ENTRIES', 100000))
+AUTOCOMPLETE_REBUILD_INTERVAL = int(os.environ.get('AUTOCOMPLETE_REBUILD_INTERVAL', 600))
+
+# Pitch attachments (see core/attachments.py). Files are uploaded in chunks of at
+# most PITCH_ATTACHMENT_CHUNK_SIZE bytes and stored under PITCH_ATTACHMENT_ROOT,
+# which is deliberately outside MEDIA_ROOT. Uploads idle for longer than
+# PITCH_ATTACHMENT_UPLOAD_EXPIRY_HOURS are removed by `manage.py purgeuploads`.
+PITCH_ATTACHMENT_ROOT = Path(os.environ.get('PITCH_ATTACHMENT_ROOT', BASE_DIR / 'private' / 'attachments'))
+PITCH_ATTACHMENT_MAX_SIZE = int(os.environ.get('PITCH_ATTACHMENT_MAX_SIZE', 500 * 1024 * 1024))
+PITCH_ATTACHMENT_CHUNK_SIZE = int(os.environ.get('PITCH_ATTACHMENT_CHUNK_SIZE', 8 * 1024 * 1024))
+PITCH_ATTACHMENT_UPLOAD_EXPIRY_HOURS = int(os.environ.get('PITCH_ATTACHMENT_UPLOAD_EXPIRY_HOURS', 24))
+PITCH_ATTACHMENT_TYPES = {
+    '.pdf': 'application/pdf',
+    '.ppt': 'application/vnd.ms-powerpoint',
+    '.pptx': 'application/vnd.openxmlformats-officedocument.presentationml.presentation',
+    '.key': 'application/vnd.apple.keynote',
+    '.mp4': 'video/mp4',
+    '.mov': 'video/quicktime',
+    '.webm': 'video/webm',
+}
+# When a reverse proxy such as nginx fronts the app, set this to an internal location
+# aliased to PITCH_ATTACHMENT_ROOT (e.g. /protected-attachments/): downloads are then
+# handed to the proxy with X-Accel-Redirect after the access check.
+PITCH_ATTACHMENT_ACCEL_REDIRECT = os.environ.get('PITCH_ATTACHMENT_ACCEL_REDIRECT', '')
+
+# JSON API (see core/api.py): page sizes for list endpoints. Pages of up to
+# API_BUFFERED_PAGE_SIZE objects are sent with an ETag; larger ones are streamed.
+API_PAGE_SIZE = int(os.environ.get('API_PAGE_SIZE', 50))
+API_MAX_PAGE_SIZE = int(os.environ.get('API_MAX_PAGE_SIZE', 5000))
+API_BUFFERED_PAGE_SIZE = int(os.environ.get('API_BUFFERED_PAGE_SIZE', 200))
+
+# Request profiler (see core/profiling.py). Staff profile a request with an
+# `X-Profile: 1` header or `?profile=1`; anyone holding PROFILING_TOKEN can with
+# `X-Profile-Token` / `?profile_token=`. PROFILING_SAMPLE_RATE (0-1) profiles that
+# share of all requests, or only of PROFILING_USER_IDS' requests when it is set.
+# The newest PROFILING_MAX_PROFILES profiles are kept under PROFILING_ROOT.
+# Off unless PROFILING_ENABLED=True is set, so no request pays for it by default.
+PROFILING_ENABLED = os.environ.get('PROFILING_ENABLED', 'False').lower() == 'true'
+PROFILING_TOKEN = os.environ.get('PROFILING_TOKEN', '')
+PROFILING_SAMPLE_RATE = float(os.environ.get('PROFILING_SAMPLE_RATE', 0))
+PROFILING_USER_IDS = [int(user_id) for user_id in os.environ.get('PROFILING_USER_IDS', '').split(',') if user_id.strip()]
+PROFILING_INTERVAL_MS = int(os.environ.get('PROFILING_INTERVAL_MS', 5))
+PROFILING_MAX_SAMPLES = int(os.environ.get('PROFILING_MAX_SAMPLES', 20000))
+PROFILING_MAX_PROFILES = int(os.environ.get('PROFILING_MAX_PROFILES', 200))
+PROFILING_ROOT = Path(os.environ.get('PROFILING_ROOT', BASE_DIR / 'private' / 'profiles'))
+
+# Search result cache (see core/resultcache.py): ordered id lists of search and
+# dashboard filter results, kept for RESULT_CACHE_TIMEOUT seconds (0 disables)
+# or until a pitch or profile changes. Searches matching more than RESULT_CACHE_MAX_IDS
+# rows are left to the database, as loading that many rows by id is slower.
+RESULT_CACHE_TIMEOUT = int(os.environ.get('RESULT_CACHE_TIMEOUT', 600))
+RESULT_CACHE_MAX_IDS = int(os.environ.get('RESULT_CACHE_MAX_IDS', 1000))
+
+# E-mail. Until a real backend is configured, messages are written to files
+# under EMAIL_FILE_PATH: one file per open connection, so one per `senddigest` run.
+EMAIL_BACKEND = os.environ.get('EMAIL_BACKEND', 'django.core.mail.backends.filebased.EmailBackend')
+EMAIL_FILE_PATH = Path(os.environ.get('EMAIL_FILE_PATH', BASE_DIR / 'private' / 'emails'))
+DEFAULT_FROM_EMAIL = os.environ.get('DEFAULT_FROM_EMAIL', 'InvEnt <no-reply@invent.local>')
+# Absolute links in e-mails
+SITE_URL = os.environ.get('SITE_URL', 'http://localhost:8000')
+
+# Daily activity digest (see core/digest.py): users are processed DIGEST_CHUNK_SIZE
+# at a time; a first digest covers the last DIGEST_FIRST_DAYS days.
+DIGEST_CHUNK_SIZE = int(os.environ.get('DIGEST_CHUNK_SIZE', 1000))
+DIGEST_FIRST_DAYS = int(os.environ.get('DIGEST_FIRST_DAYS', 1))
+# The runjobs workers queue the digest to go out every day at DIGEST_HOUR (0-23, in
+# TIME_ZONE). Set DIGEST_HOUR to an empty string to only send it with
+# `manage.py senddigest`, from cron for example.
+DIGEST_HOUR = os.environ.get('DIGEST_HOUR', '7').strip()
+DIGEST_HOUR = int(DIGEST_HOUR) if DIGEST_HOUR else None
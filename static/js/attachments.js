@@ -0,0 +1,113 @@
+// static/js/attachments.js
+// Uploads pitch attachments in chunks (see core/attachments.py). Each chunk is
+// PUT at the offset the server reports, so a dropped connection or a page
+// reload resumes where the upload stopped instead of starting over.
+
+(function() {
+    const MAX_RETRIES = 5;
+
+    function csrfToken() {
+        const input = document.querySelector('[name=csrfmiddlewaretoken]');
+        return input ? input.value : '';
+    }
+
+    function formatSize(bytes) {
+        return (bytes / (1024 * 1024)).toFixed(1) + ' MB';
+    }
+
+    // The upload url is remembered per file, so picking the same file again after
+    // a reload continues the earlier upload
+    function resumeKey(startUrl, file) {
+        return 'attachment-upload:' + startUrl + ':' + file.name + ':' + file.size + ':' + file.lastModified;
+    }
+
+    async function chunkChecksum(blob) {
+        if (!window.crypto || !window.crypto.subtle) return null;  // Only available over https
+        const digest = await window.crypto.subtle.digest('SHA-256', await blob.arrayBuffer());
+        return 'sha256 ' + btoa(String.fromCharCode.apply(null, new Uint8Array(digest)));
+    }
+
+    async function startOrResume(startUrl, file) {
+        const saved = localStorage.getItem(resumeKey(startUrl, file));
+        if (saved) {
+            const response = await fetch(saved, {cache: 'no-store'});
+            if (response.ok) return response.json();
+            localStorage.removeItem(resumeKey(startUrl, file));
+        }
+        const response = await fetch(startUrl, {
+            method: 'POST',
+            headers: {'Content-Type': 'application/json', 'X-CSRFToken': csrfToken()},
+            body: JSON.stringify({filename: file.name, size: file.size}),
+        });
+        const state = await response.json();
+        if (!response.ok) throw new Error(state.error);
+        localStorage.setItem(resumeKey(startUrl, file), state.url);
+        return state;
+    }
+
+    async function upload(input, file) {
+        const startUrl = input.dataset.attachmentUpload;
+        const container = input.closest('div');
+        const progress = container.querySelector('[data-attachment-progress]');
+        const state = await startOrResume(startUrl, file);
+        let offset = state.offset;
+        let retries = 0;
+
+        while (true) {
+            progress.textContent = 'Uploading… ' + formatSize(offset) + ' of ' + formatSize(file.size);
+            const chunk = file.slice(offset, offset + state.chunk_size);
+            const headers = {'Upload-Offset': String(offset), 'X-CSRFToken': csrfToken()};
+            const checksum = await chunkChecksum(chunk);
+            if (checksum) headers['Upload-Checksum'] = checksum;
+
+            let response;
+            try {
+                response = await fetch(state.url, {method: 'PUT', headers: headers, body: chunk});
+            } catch (e) {
+                response = null;  // Network error: retry below
+            }
+            if (response && response.status === 201) {
+                const result = await response.json();
+                localStorage.removeItem(resumeKey(startUrl, file));
+                const item = document.createElement('li');
+                const link = document.createElement('a');
+                link.href = result.attachment.url;
+                link.className = 'text-blue-600 hover:underline';
+                link.textContent = result.attachment.filename;
+                item.appendChild(link);
+                container.querySelector('[data-attachment-list]').appendChild(item);
+                progress.textContent = 'Uploaded.';
+                return;
+            }
+            if (response && (response.ok || response.status === 409)) {
+                // Accepted, or the server already has more than we thought: continue from its offset
+                offset = Number(response.headers.get('Upload-Offset'));
+                retries = 0;
+                continue;
+            }
+            if (response && response.status !== 400 && response.status < 500) {
+                localStorage.removeItem(resumeKey(startUrl, file));
+                throw new Error((await response.json()).error);
+            }
+            if (++retries > MAX_RETRIES) throw new Error('The upload keeps failing; pick the file again to resume.');
+            await new Promise(function(resolve) { setTimeout(resolve, 1000 * 2 ** retries); });
+        }
+    }
+
+    // Delegated, so inputs in a pitch list swapped in by dashboard_fragments.js work too
+    document.addEventListener('change', function(event) {
+        const input = event.target;
+        if (!input.matches('input[data-attachment-upload]')) return;
+        const file = input.files[0];
+        if (!file) return;
+        input.disabled = true;
+        upload(input, file)
+            .catch(function(error) {
+                input.closest('div').querySelector('[data-attachment-progress]').textContent = error.message;
+            })
+            .finally(function() {
+                input.disabled = false;
+                input.value = '';
+            });
+    });
+})();
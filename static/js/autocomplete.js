@@ -0,0 +1,101 @@
+// static/js/autocomplete.js
+// Search-box suggestions from core.autocomplete. Add data-autocomplete to a text
+// input (inside a `relative` container) and suggestions appear as the user types.
+
+(function() {
+    const DEBOUNCE_MS = 80;
+
+    function attach(input) {
+        const list = document.createElement('ul');
+        list.className = 'hidden absolute left-0 right-0 top-full mt-1 bg-white rounded-lg shadow-lg z-50 text-left overflow-hidden';
+        input.parentNode.appendChild(list);
+        input.setAttribute('autocomplete', 'off');
+
+        let timer = null;
+        let active = -1;
+        let latestRequest = 0;
+
+        function items() {
+            return list.querySelectorAll('a');
+        }
+
+        function highlight(index) {
+            const links = items();
+            links.forEach(function(link, i) {
+                link.classList.toggle('bg-gray-100', i === index);
+            });
+            active = index;
+        }
+
+        function close() {
+            list.classList.add('hidden');
+            active = -1;
+        }
+
+        function render(results) {
+            list.innerHTML = '';
+            results.forEach(function(result) {
+                const item = document.createElement('li');
+                const link = document.createElement('a');
+                link.href = result.url;
+                link.className = 'flex justify-between gap-4 px-4 py-2 text-gray-700 hover:bg-gray-100';
+                const label = document.createElement('span');
+                label.textContent = result.label;
+                const kind = document.createElement('span');
+                kind.className = 'text-xs text-gray-400 uppercase';
+                kind.textContent = result.kind;
+                link.appendChild(label);
+                link.appendChild(kind);
+                item.appendChild(link);
+                list.appendChild(item);
+            });
+            active = -1;
+            list.classList.toggle('hidden', results.length === 0);
+        }
+
+        function suggest() {
+            const query = input.value.trim();
+            if (query === '') {
+                close();
+                return;
+            }
+            // Responses can arrive out of order; only show the newest one
+            const request = ++latestRequest;
+            fetch('/search/autocomplete/?q=' + encodeURIComponent(query))
+                .then(function(response) { return response.ok ? response.json() : {results: []}; })
+                .then(function(data) {
+                    if (request === latestRequest) render(data.results);
+                })
+                .catch(close);
+        }
+
+        input.addEventListener('input', function() {
+            clearTimeout(timer);
+            timer = setTimeout(suggest, DEBOUNCE_MS);
+        });
+
+        input.addEventListener('keydown', function(e) {
+            const links = items();
+            if (list.classList.contains('hidden') || !links.length) return;
+            if (e.key === 'ArrowDown') {
+                e.preventDefault();
+                highlight((active + 1) % links.length);
+            } else if (e.key === 'ArrowUp') {
+                e.preventDefault();
+                highlight((active - 1 + links.length) % links.length);
+            } else if (e.key === 'Enter' && active >= 0) {
+                e.preventDefault();
+                window.location = links[active].href;
+            } else if (e.key === 'Escape') {
+                close();
+            }
+        });
+
+        input.addEventListener('blur', function() {
+            // Let a click on a suggestion land before the list disappears
+            setTimeout(close, 150);
+        });
+    }
+
+    document.querySelectorAll('input[data-autocomplete]').forEach(attach);
+})();
@@ -0,0 +1,54 @@
+// static/js/dashboard_fragments.js
+// Submits dashboard forms marked with data-fragment in the background and swaps
+// in the HTML fragment the server sends back (see the section views in
+// core/views.py), instead of a full-page POST and redirect. The element with the
+// id in data-fragment-target is replaced. Without JavaScript the forms still
+// post to their normal action.
+
+(function() {
+    function fragmentRequest(form, submitter) {
+        const headers = {'X-Fragment': 'true'};
+        // new FormData(form, submitter) includes the clicked button's name and value
+        const data = new FormData(form, submitter);
+        if (form.method.toLowerCase() === 'get') {
+            const query = new URLSearchParams(data).toString();
+            // Keep the address bar in step so a reload shows the same results
+            history.replaceState(null, '', form.action.split('?')[0] + '?' + query);
+            return fetch(form.dataset.fragment + '?' + query, {headers: headers});
+        }
+        headers['X-CSRFToken'] = data.get('csrfmiddlewaretoken');
+        return fetch(form.dataset.fragment, {method: 'POST', headers: headers, body: data});
+    }
+
+    document.addEventListener('submit', function(event) {
+        const form = event.target;
+        if (!form.dataset.fragment) return;
+        event.preventDefault();
+
+        const buttons = form.querySelectorAll('button[type=submit]');
+        buttons.forEach(button => { button.disabled = true; });
+
+        fragmentRequest(form, event.submitter)
+            .then(function(response) {
+                const type = response.headers.get('Content-Type') || '';
+                // Form errors come back as a 400 with the section re-rendered; anything else falls back to a normal submit
+                if (!type.startsWith('text/html') || response.status >= 500 || response.status === 403) {
+                    throw new Error('Unexpected response ' + response.status);
+                }
+                return response.text();
+            })
+            .then(function(html) {
+                // The live socket may already have removed the target (e.g. an answered question)
+                const target = document.getElementById(form.dataset.fragmentTarget);
+                if (!target) return;
+                const template = document.createElement('template');
+                template.innerHTML = html.trim();
+                target.replaceWith(template.content);
+            })
+            .catch(function() {
+                buttons.forEach(button => { button.disabled = false; });
+                form.removeAttribute('data-fragment');
+                form.requestSubmit(event.submitter);
+            });
+    });
+})();
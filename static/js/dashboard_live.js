@@ -0,0 +1,212 @@
+// static/js/dashboard_live.js
+// Listens on the user's notification websocket (chat.consumers.NotificationConsumer)
+// and applies dashboard events as small DOM updates instead of full-page reloads.
+
+(function() {
+    const STATUS_BADGE_CLASSES = {
+        accepted: ['bg-green-200', 'text-green-800'],
+        rejected: ['bg-red-200', 'text-red-800'],
+        pending: ['bg-yellow-200', 'text-yellow-800'],
+    };
+    const STATUS_CARD_CLASSES = {
+        accepted: ['border-green-400', 'bg-green-50'],
+        rejected: ['border-red-400', 'bg-red-50'],
+        pending: ['border-gray-200'],
+    };
+
+    // --- Small DOM helpers ---
+
+    function el(tag, className, text) {
+        const node = document.createElement(tag);
+        if (className) node.className = className;
+        if (text !== undefined) node.textContent = text;
+        return node;
+    }
+
+    function prependTo(listId, node) {
+        const list = document.getElementById(listId);
+        if (!list) return;
+        list.prepend(node);
+        // Hide the "nothing here yet" message now that the list has an item
+        const empty = document.getElementById(listId + '-empty');
+        if (empty) empty.remove();
+    }
+
+    function csrfToken() {
+        const input = document.querySelector('[name=csrfmiddlewaretoken]');
+        return input ? input.value : '';
+    }
+
+    function setStatusClasses(node, classMap, status) {
+        Object.values(classMap).forEach(classes => node.classList.remove(...classes));
+        node.classList.add(...classMap[status]);
+    }
+
+    // --- Event handlers ---
+
+    const handlers = {
+        // Entrepreneur: a new offer arrived on one of their pitches
+        offer_created(data) {
+            if (document.getElementById('offer-' + data.id)) return;
+
+            const card = el('div', 'p-6 border rounded-lg');
+            card.id = 'offer-' + data.id;
+            setStatusClasses(card, STATUS_CARD_CLASSES, data.status);
+
+            const header = el('div', 'flex justify-between items-start');
+            const left = el('div');
+            const select = el('label', 'inline-flex items-center gap-2 text-sm text-gray-600 mb-2');
+            select.setAttribute('data-pending-only', '');
+            const checkbox = el('input');
+            checkbox.type = 'checkbox';
+            checkbox.name = 'offer_ids';
+            checkbox.value = data.id;
+            select.append(checkbox, ' Select');
+            const pitchLine = el('p', 'text-sm text-gray-500', 'Offer for: ');
+            pitchLine.appendChild(el('span', 'font-bold', data.pitch_title));
+            const fromLine = el('p', 'text-sm text-gray-500', 'From: ');
+            fromLine.appendChild(el('span', 'font-semibold', data.investor_name));
+            left.append(select, pitchLine, fromLine);
+
+            const right = el('div', 'text-right');
+            right.appendChild(el('p', 'text-xl font-bold text-gray-800', '₹' + data.amount));
+            const badge = el('span', 'px-3 py-1 text-xs font-semibold rounded-full', data.status_display);
+            badge.setAttribute('data-offer-status', '');
+            setStatusClasses(badge, STATUS_BADGE_CLASSES, data.status);
+            right.appendChild(badge);
+            header.append(left, right);
+
+            const actions = el('div', 'mt-4 flex items-center gap-4');
+            actions.setAttribute('data-pending-only', '');
+            const accept = el('a', 'bg-green-500 hover:bg-green-600 text-white font-bold py-2 px-4 rounded-lg', 'Accept');
+            accept.href = data.accept_url;
+            const reject = el('a', 'bg-red-500 hover:bg-red-600 text-white font-bold py-2 px-4 rounded-lg', 'Reject');
+            reject.href = data.reject_url;
+            actions.append(accept, reject);
+
+            card.append(header, el('p', 'mt-3 text-gray-700 italic', '"' + data.message + '"'), actions);
+            prependTo('received-offers', card);
+        },
+
+        // Both sides: an offer was accepted or rejected
+        offer_status(data) {
+            const card = document.getElementById('offer-' + data.id);
+            if (!card) return;
+
+            const badge = card.querySelector('[data-offer-status]');
+            if (badge) {
+                badge.textContent = data.status_display;
+                setStatusClasses(badge, STATUS_BADGE_CLASSES, data.status);
+            }
+            if (card.classList.contains('offer-card')) {
+                // Investor dashboard cards are styled by a status-* class in custom.css
+                card.classList.remove('status-pending', 'status-accepted', 'status-rejected');
+                card.classList.add('status-' + data.status);
+            } else {
+                setStatusClasses(card, STATUS_CARD_CLASSES, data.status);
+            }
+            if (data.status !== 'pending') {
+                card.querySelectorAll('[data-pending-only]').forEach(node => node.remove());
+            }
+        },
+
+        // Entrepreneur: a new question was asked on one of their pitches
+        question_created(data) {
+            if (document.getElementById('question-' + data.id)) return;
+
+            const card = el('div', 'p-6 border border-yellow-400 bg-yellow-50 rounded-lg');
+            card.id = 'question-' + data.id;
+            const pitchLine = el('p', 'text-sm text-gray-500', 'Question on pitch: ');
+            pitchLine.appendChild(el('span', 'font-bold', data.pitch_title));
+
+            const form = el('form', 'mt-4');
+            form.method = 'post';
+            form.action = data.answer_url;
+            // Answered in the background by dashboard_fragments.js, like the rendered rows
+            form.dataset.fragment = data.answer_url;
+            form.dataset.fragmentTarget = 'question-' + data.id;
+            const csrf = el('input');
+            csrf.type = 'hidden';
+            csrf.name = 'csrfmiddlewaretoken';
+            csrf.value = csrfToken();
+            const label = el('label', '', 'Your Answer:');
+            label.htmlFor = 'id_text_' + data.id;
+            const textarea = el('textarea');
+            textarea.name = 'text';
+            textarea.rows = 3;
+            textarea.required = true;
+            textarea.id = 'id_text_' + data.id;
+            textarea.placeholder = 'Provide your answer...';
+            const field = el('p');
+            field.append(label, ' ', textarea);
+            const buttonRow = el('div', 'text-left mt-4');
+            const button = el('button', 'btn btn-dark', 'Submit Answer');
+            button.type = 'submit';
+            buttonRow.appendChild(button);
+            form.append(csrf, field, buttonRow);
+
+            card.append(pitchLine, el('p', 'mt-2 font-semibold text-gray-800', '"' + data.text + '"'), form);
+            prependTo('unanswered-questions', card);
+        },
+
+        // Entrepreneur: a question was answered (possibly from another tab)
+        question_answered(data) {
+            const card = document.getElementById('question-' + data.question_id);
+            if (card) card.remove();
+        },
+
+        // Investor: a new pitch matches their interests
+        pitch_matched(data) {
+            const item = el('li', 'p-4 border rounded-lg hover:bg-gray-50');
+            const link = el('a', 'block');
+            link.href = data.url;
+            const summary = data.summary.length > 140 ? data.summary.slice(0, 139) + '…' : data.summary;
+            link.append(
+                el('p', 'font-semibold text-blue-600', data.title),
+                el('p', 'text-sm text-gray-600', summary)
+            );
+            item.appendChild(link);
+            prependTo('matched-pitches', item);
+        },
+
+        // Both sides: an accepted offer opened a new conversation
+        conversation_created(data) {
+            const item = el('li', 'p-4 border rounded-lg hover:bg-gray-50');
+            const link = el('a', 'block');
+            link.href = data.url;
+            link.append(
+                el('p', 'font-semibold text-blue-600', 'Chat for: ' + data.pitch_title),
+                el('p', 'text-sm text-gray-600', 'With: ' + data.other_name)
+            );
+            item.appendChild(link);
+            prependTo('conversations', item);
+        },
+    };
+
+    // --- Socket with reconnect ---
+
+    let retryDelay = 1000;
+
+    function connect() {
+        const scheme = window.location.protocol === 'https:' ? 'wss://' : 'ws://';
+        const socket = new WebSocket(scheme + window.location.host + '/ws/notifications/');
+
+        socket.onopen = function() {
+            retryDelay = 1000;
+        };
+
+        socket.onmessage = function(e) {
+            const payload = JSON.parse(e.data);
+            const handler = handlers[payload.event];
+            if (handler) handler(payload.data);
+        };
+
+        socket.onclose = function() {
+            // Back off up to 30 seconds between reconnect attempts
+            setTimeout(connect, retryDelay);
+            retryDelay = Math.min(retryDelay * 2, 30000);
+        };
+    }
+
+    connect();
+})();